@@ -1,43 +1,175 @@
+import atexit
+import os
 import random
 import time
-from states import GameState, playable_cards
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from compact_state import CompactGameState, to_compact_state
+from cards import CARD_BIT, CARD_SUIT, HIGH_CARD_MASK, MID_CARD_MASK, NO_CARD, SUIT_MASKS, TRUMP_MASK, card_str, cards_to_mask, mask_to_cards
+from rollout import random_playout
+from transposition import TranspositionTable
 from util import get_valid_int_input, get_valid_input
-from mcts import MCTSNode
+from mcts import MCTSNode, ISMCTSNode
+from sampler import DealSampler
+
+try:
+    import numpy as np
+    from batch_rollout import batch_playouts_many, batch_random_playouts, batch_utilities
+    from array_tree import ArrayTree
+except ImportError:  # NumPy is optional; ExpectimaxAi falls back to scalar playouts
+    np = None
 
 NUM_SAMPLES = 500  # number of playouts per action
 MADE_BID = 10
+ROOT_PARALLEL_MARGIN = 0.05  # seconds kept back from root-parallel workers to ship their trees home
+
+_search_pools = {}
+
+def get_search_pool(workers):
+    """
+    The process pool of the root- and leaf-parallel searches with workers processes, shared by
+    every agent in this process and shut down at exit.
+    """
+    pool = _search_pools.get(workers)
+    if pool is None:
+        pool = _search_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return pool
+
+def close_search_pools():
+    for pool in _search_pools.values():
+        pool.shutdown(cancel_futures=True)
+    _search_pools.clear()
+
+atexit.register(close_search_pools)
+
+class SearchTimeout(Exception):
+    pass
+
+def estimate_tricks(hand_mask):
+    """
+    The bid heuristic: roughly how many tricks a hand (a card mask) will take.
+    """
+    total_cards = hand_mask.bit_count()
+    if total_cards == 0:
+        return 0.0
+    high_cards = (hand_mask & HIGH_CARD_MASK).bit_count()
+    trump_count = (hand_mask & TRUMP_MASK).bit_count()
+    strong_trumps = (hand_mask & TRUMP_MASK & HIGH_CARD_MASK).bit_count()
+    # 8s, 9s and 10s in suits that make up less than a fifth of the hand
+    non_high_cards_low_suit_ratio = sum(
+        (hand_mask & suit_mask & MID_CARD_MASK).bit_count() for suit_mask in SUIT_MASKS
+        if (hand_mask & suit_mask).bit_count() / total_cards < 0.2
+    )
+
+    # Heuristic: Estimate bid based on combined power
+    score = 0
+    score += 1 * strong_trumps  # strong trumps likely win tricks
+    score += 0.6 * (trump_count - strong_trumps)  # weak trumps are worth less
+    score += 0.4 * (high_cards - strong_trumps)  # non-trump high cards
+    score += .5 * non_high_cards_low_suit_ratio  # non-high cards in low-suit
+    return score
+
+def evaluate_state(gameState: CompactGameState):
+    """
+    Cheap stand-in for utility() at a depth cutoff. Shares the tricks still to be played out in
+    proportion to estimate_tricks of every remaining hand and scores each player's projected
+    total against their bid: MADE_BID on the bid, falling linearly to -1 one trick away and by
+    1 per trick after that, like utility().
+    """
+    num_players = gameState.getNumPlayers()
+    tricks_left = (sum(hand.bit_count() for hand in gameState.hands) + gameState.trick_size) // num_players
+    estimates = [estimate_tricks(hand) for hand in gameState.hands]
+    total_estimate = sum(estimates)
+    utilities = []
+    for i in range(num_players):
+        if total_estimate > 0:
+            share = estimates[i] * tricks_left / total_estimate
+        else:
+            share = tricks_left / num_players
+        distance = abs(gameState.tricks_won[i] + share - gameState.bids[i])
+        if distance < 1:
+            utilities.append(MADE_BID - (MADE_BID + 1) * distance)
+        else:
+            utilities.append(-distance)
+    return tuple(utilities)
 
 class AiAgent:
-    def play(self, state: GameState):
+    # Called with a dict of statistics after every decision when set; see record_decision
+    recorder = None
+    # Print the reasoning behind each decision
+    verbose = False
+    # A bidder.MonteCarloBidder to bid with instead of the estimate_tricks heuristic
+    bidder = None
+    # An endgame.EndgameTable that answers positions small enough to be in it, for agents that
+    # search the true hands (MaxN, Expectimax and MCTS)
+    endgame = None
+
+    def play(self, state: CompactGameState):
+        """
+        Returns the card to play as a string. state is the game's SpadesGame.snapshot(); agents
+        take a states.GameState too and convert it with to_compact_state.
+        """
         raise NotImplementedError("This method should be overridden by subclasses")
     def manual(self):
         return False
+
+    # Lifecycle hooks. A player keeps one agent for the whole game and the game calls these as
+    # it goes, so agents can hold state between decisions; by default they do nothing.
+    def new_game(self, num_players, seat):
+        pass
+
+    def new_round(self, round_num, hand):
+        pass
+
+    def card_observed(self, player_index, card, lead_card):
+        """
+        Called for every card played, including the agent's own. lead_card is None for a lead.
+        """
+        pass
+
+    def trick_completed(self, trick, starting_player_index, winner_index):
+        pass
+
+    def record_decision(self, state, action, start_time, **stats):
+        """
+        Passes the recorder one record for a decision: the agent, round, action and wall time
+        since start_time (a time.perf_counter() value) plus whatever search statistics the agent
+        gives (nodes, playouts, depth, tt_hits, tt_probes, visit_share). Agents only gather
+        those statistics when a recorder is set.
+        """
+        seconds = time.perf_counter() - start_time
+        record = {"agent": type(self).__name__, "round": state.round, "action": action, "seconds": seconds}
+        record.update(stats)
+        if record.get("playouts"):
+            record["playouts_per_second"] = record["playouts"] / seconds if seconds > 0 else 0.0
+        self.recorder(record)
+
+    def endgame_move(self, state, start_time):
+        """
+        The endgame table's move for state as a card string, or None when there is no table or
+        state is too big for it.
+        """
+        if self.endgame is None:
+            return None
+        scratch = to_compact_state(state)
+        if not self.endgame.covers(scratch):
+            return None
+        nodes, hits, misses = self.endgame.nodes, self.endgame.front_hits + self.endgame.table_hits, self.endgame.misses
+        card = card_str(self.endgame.best_move(scratch))
+        if self.recorder is not None:
+            found = self.endgame.front_hits + self.endgame.table_hits - hits
+            self.record_decision(state, card, start_time, nodes=self.endgame.nodes - nodes, tt_hits=found,
+                                 tt_probes=found + self.endgame.misses - misses)
+        return card
     # def bid(self, total_bid, total_bids, num_players, round):
     #     bid = (round - total_bid) // (num_players - total_bids)
     #     if total_bids == round - 1 and total_bid + bid == round:
     #         bid -= 1
     #     return bid
     def bid(self, hand, total_bid, total_bids, num_players, round_num):
-        trump_suit = 'S'
-
-        high_cards = sum(1 for c in hand if c[0] in ['A', 'K', 'Q', 'J'])
-        trump_count = sum(1 for c in hand if c[1] == trump_suit)
-        strong_trumps = sum(1 for c in hand if c[1] == trump_suit and c[0] in ['A', 'K', 'Q', 'J'])
-        # Calculate the ratio of each suit in the hand
-        suit_counts = {suit: sum(1 for c in hand if c[1] == suit) for suit in ['S', 'H', 'D', 'C']}
-        total_cards = len(hand)
-        non_high_cards_low_suit_ratio = sum(
-            1 for suit, count in suit_counts.items() if count / total_cards < 0.2
-            for c in hand if c[1] == suit and c[0] in ['8', '9', '10']
-        )
+        if self.bidder is not None:
+            return self.bidder.bid(cards_to_mask(hand), total_bid, total_bids, num_players, round_num)
+        score = estimate_tricks(cards_to_mask(hand))
 
-        # Heuristic: Estimate bid based on combined power
-        score = 0
-        score += 1 * strong_trumps  # strong trumps likely win tricks
-        score += 0.6 * (trump_count - strong_trumps)  # weak trumps are worth less
-        score += 0.4 * (high_cards - strong_trumps)  # non-trump high cards
-        score += .5 * non_high_cards_low_suit_ratio  # non-high cards in low-suit
-        
         # print("Score:", score)
 
         estimated_bid = round(score)
@@ -57,18 +189,26 @@ class AiAgent:
 
 
 class RandomAi(AiAgent):
-    def play(self, state: GameState):
-        playable = playable_cards(state)
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def play(self, state: CompactGameState):
+        start_time = time.perf_counter()
+        playable = to_compact_state(state).getLegalActions()
         if len(playable) > 0:
-            return random.choice(playable)
+            card = card_str(self.rng.choice(playable))
+            if self.recorder is not None:
+                self.record_decision(state, card, start_time)
+            return card
         else:
             print("No playable cards")
             return None
 
 class ManualAi(AiAgent):
-    def play(self, state: GameState):
-        player_hand = state.player_hands[state.curr_player_index]
-        playable = playable_cards(state)
+    def play(self, state: CompactGameState):
+        scratch = to_compact_state(state)
+        player_hand = mask_to_cards(scratch.hands[scratch.curr_player_index])
+        playable = [card_str(card) for card in scratch.getLegalActions()]
         print(f"Your hand: {player_hand}")
         print(f"Playable cards: {playable}")
         card_index = get_valid_int_input(f"Play a card (0-indexed): ", 0, len(playable) - 1)
@@ -88,13 +228,36 @@ class ManualAi(AiAgent):
     
 
 class MaxNAi(AiAgent):
-    def __init__(self, depth=5):
+    def __init__(self, depth=None, time_limit=1.0, tt_size_bits=18, distinct_moves=True, seed=None):
+        """
+        depth caps the search in plies (None searches to the end of the round) and positions at the
+        cutoff are scored by evaluationFunction. With a time_limit the search deepens one trick at a
+        time and plays the best move of the deepest iteration that finished in time; one that runs
+        out of time before its first iteration plays a random legal move drawn from self.rng,
+        seeded with seed.
+        distinct_moves searches only one card of each run of equivalent cards, which gives the same
+        result from a smaller tree.
+        """
         self.depth = depth
+        self.distinct_moves = distinct_moves
+        self.time_limit = time_limit
+        self.rng = random.Random(seed)
+        self.tt_size_bits = tt_size_bits
+        self._tt = None
+        self._deadline = None
+        self._nodes = 0
     
-    def evaluationFunction(self, gameState: GameState):
-        pass
+    @property
+    def tt(self):
+        # Allocated by the first search, so an agent that never searches costs nothing
+        if self._tt is None:
+            self._tt = TranspositionTable(self.tt_size_bits)
+        return self._tt
+
+    def evaluationFunction(self, gameState: CompactGameState):
+        return evaluate_state(gameState)
     
-    def utility(self, gameState: GameState):
+    def utility(self, gameState: CompactGameState):
         utilities = []
         for i in range(gameState.getNumPlayers()):
             if gameState.tricks_won[i] == gameState.bids[i]:
@@ -104,60 +267,126 @@ class MaxNAi(AiAgent):
                 utilities.append(-1 * distance)  # Utility decreases by -1 per trick away from bid
         return tuple(utilities)
 
-        
-    def play(self, state: GameState):
-        my_index = state.curr_player_index
+    def maxn(self, gameState, agentIndex, depth, cards_left):
+        assert(agentIndex == gameState.curr_player_index)
+        # Terminal node
+        if gameState.hands[agentIndex] == 0:
+            return self.utility(gameState)
+        if self.endgame is not None and self.endgame.covers(gameState):
+            return self.endgame.utilities(gameState)
+        if depth == 0:
+            return self.evaluationFunction(gameState)
+
+        self._nodes += 1
+        if self._deadline is not None and self._nodes & 1023 == 0 and time.time() > self._deadline:
+            raise SearchTimeout()
+
+        # Positions reached through different card orders share one entry. A search that
+        # reaches the end of the round is exact, whatever depth it was asked for.
+        draft = min(depth, cards_left)
+        key = gameState.zobrist
+        cached = self.tt.lookup(key, draft)
+        if cached is not None:
+            return cached
 
-        def maxn(gameState, agentIndex, currMaxUtilSum = [0] * state.getNumPlayers()):
-            assert(agentIndex == gameState.curr_player_index)
-            # Terminal node
-            if len(gameState.player_hands[agentIndex]) == 0:
-                return self.utility(gameState)
+        best_util = None
 
-            nextAgent = (agentIndex + 1) % gameState.getNumPlayers()
-            best_util = None
-            best_action = None
+        for action in gameState.getLegalActions(self.distinct_moves):
+            gameState.do_move(action)
+            utilities = self.maxn(gameState, gameState.curr_player_index, depth - 1, cards_left - 1)
+            gameState.undo_move()
 
-            for action in gameState.getLegalActions():
-                successor = gameState.generateSuccessor(action)
-                utilities = maxn(successor, nextAgent)
+            if best_util is None or utilities[agentIndex] > best_util[agentIndex]:
+                best_util = utilities
 
-                if best_util is None or utilities[agentIndex] > best_util[agentIndex]:
-                    best_util = utilities
-                    best_action = action
+        self.tt.store(key, best_util, draft)
+        return best_util
 
-            if agentIndex == my_index:
-                return best_util
-            else:
-                return best_util
+    def search_root(self, scratch, depth, first_action=None):
+        my_index = scratch.curr_player_index
+        cards_left = sum(scratch.hand_size(i) for i in range(scratch.getNumPlayers()))
+        legal_actions = scratch.getLegalActions(self.distinct_moves)
+        # Try the previous iteration's best move first so it wins ties the same way
+        if first_action in legal_actions:
+            legal_actions.remove(first_action)
+            legal_actions.insert(0, first_action)
 
-        # Root call: pick best action based on our utility
-        legal_actions = state.getLegalActions()
+        root_utilities = []
         best_score = float('-inf')
         best_action = None
-
         for action in legal_actions:
-            successor = state.generateSuccessor(action)
-            utilities = maxn(successor, (my_index + 1) % state.getNumPlayers())
-            print("Action:", action, "Utilities:", utilities)
+            scratch.do_move(action)
+            utilities = self.maxn(scratch, scratch.curr_player_index, depth - 1, cards_left - 1)
+            scratch.undo_move()
+            root_utilities.append((action, utilities))
             if utilities[my_index] > best_score:
                 best_score = utilities[my_index]
                 best_action = action
-
-        return best_action
+        return best_action, root_utilities
+
+    def play(self, state: CompactGameState):
+        start_time = time.perf_counter()
+        card = self.endgame_move(state, start_time)
+        if card is not None:
+            return card
+        hits, probes = self.tt.hits, self.tt.probes
+        root = to_compact_state(state)
+        root.enable_zobrist()
+        cards_left = sum(root.hand_size(i) for i in range(root.getNumPlayers()))
+        max_depth = cards_left if self.depth is None else min(self.depth, cards_left)
+        self.tt.new_search()
+        self._nodes = 0
+
+        if self.time_limit is None:
+            self._deadline = None
+            best_action, root_utilities = self.search_root(root, max_depth)
+            searched_depth = max_depth
+        else:
+            self._deadline = time.time() + self.time_limit
+            best_action, root_utilities = None, []
+            searched_depth = 0
+            # Deepen a trick at a time so every cutoff but the last falls on a trick boundary
+            num_players = root.getNumPlayers()
+            first_depth = num_players - root.trick_size
+            depths = list(range(first_depth, max_depth, num_players)) + [max_depth]
+            for depth in depths:
+                try:
+                    # An aborted iteration leaves its scratch state mid-line, so each one gets a copy
+                    scratch = root.clone()
+                    scratch.enable_zobrist()
+                    best_action, root_utilities = self.search_root(scratch, depth, best_action)
+                    searched_depth = depth
+                except SearchTimeout:
+                    break
+            if best_action is None:
+                best_action = self.rng.choice(root.getLegalActions())
+
+        if self.verbose:
+            for action, utilities in root_utilities:
+                print("Action:", card_str(action), "Utilities:", utilities)
+        if self.recorder is not None:
+            self.record_decision(state, card_str(best_action), start_time, nodes=self._nodes, depth=searched_depth,
+                                 tt_hits=self.tt.hits - hits, tt_probes=self.tt.probes - probes)
+        return card_str(best_action)
     
     def manual(self):
         return False
     
 
 class ExpectimaxAi(AiAgent):
-    def __init__(self, depth=5):
+    def __init__(self, depth=5, vectorized=True, distinct_moves=True, seed=None):
         self.depth = depth
+        # Every playout draws from self.rng, so a seeded agent replays its decisions exactly
+        self.rng = random.Random(seed)
+        # Sample only one card of each run of equivalent cards; the others have the same value
+        self.distinct_moves = distinct_moves
+        # Batched NumPy playouts when available, one scalar playout at a time otherwise
+        self.vectorized = vectorized and np is not None
     
-    def evaluationFunction(self, gameState: GameState):
-        pass
+    def evaluationFunction(self, gameState: CompactGameState):
+        return evaluate_state(gameState)
     
-    def utility(self, gameState: GameState):
+    def utility(self, gameState: CompactGameState):
         utilities = []
         for i in range(gameState.getNumPlayers()):
             if gameState.tricks_won[i] == gameState.bids[i]:
@@ -167,36 +396,38 @@ class ExpectimaxAi(AiAgent):
                 utilities.append(-1 * distance)  # Utility decreases by -1 per trick away from bid
         return tuple(utilities)
 
-    def simulate_random_playout(self, gameState: GameState):
+    def simulate_random_playout(self, gameState):
         """
-        Plays out the rest of the round randomly and returns the terminal state.
+        Plays out the rest of the round randomly in place and returns the utilities of the
+        terminal state. gameState must be a CompactGameState; it is restored before returning.
         """
-        state = gameState.clone()  # Assume you have a deep copy method
-
-        while not state.isTerminal():
-            current = state.curr_player_index
-            legal = state.getLegalActions()
-            random_action = random.choice(legal)
-            state = state.generateSuccessor(random_action)
-
-        return state
+        return random_playout(gameState, self.utility, self.rng)
 
-    def expectimax_maxn(self, gameState: GameState, agentIndex: int, depth: int):
+    def batch_expected_utilities(self, gameState, action):
+        """
+        Averages the utilities of NUM_SAMPLES random playouts after action, run as one NumPy batch.
+        """
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        gameState.do_move(action)
+        tricks_won = batch_random_playouts(gameState, NUM_SAMPLES, rng)
+        gameState.undo_move()
+        utilities = batch_utilities(tricks_won, gameState.bids, MADE_BID)
+        return tuple(float(value) for value in utilities.mean(axis=0))
+
+    def expectimax_maxn(self, gameState, agentIndex: int, depth: int):
         if gameState.isTerminal():
             return self.utility(gameState)
 
-        nextAgent = (agentIndex + 1) % gameState.getNumPlayers()
-        legal_actions = gameState.getLegalActions()
+        legal_actions = gameState.getLegalActions(self.distinct_moves)
         best_util = None
 
         for action in legal_actions:
             utilities_list = []
 
             for _ in range(NUM_SAMPLES):
-                sampled_state = gameState.generateSuccessor(action)
-                rollout_terminal = self.simulate_random_playout(sampled_state)
-                util = self.utility(rollout_terminal)
-                utilities_list.append(util)
+                gameState.do_move(action)
+                utilities_list.append(self.simulate_random_playout(gameState))
+                gameState.undo_move()
 
             avg_utilities = tuple(
                 sum(vals) / len(vals) for vals in zip(*utilities_list)
@@ -208,78 +439,506 @@ class ExpectimaxAi(AiAgent):
 
         return best_util if agentIndex != gameState.curr_player_index else best_action
 
-    def play(self, state: GameState):
+    def play(self, state: CompactGameState):
+        start_time = time.perf_counter()
+        card = self.endgame_move(state, start_time)
+        if card is not None:
+            return card
         my_index = state.curr_player_index
-        legal_actions = state.getLegalActions()
+        scratch = to_compact_state(state)
+        legal_actions = scratch.getLegalActions(self.distinct_moves)
 
         best_score = float('-inf')
         best_action = None
 
         for action in legal_actions:
-            expected_utilities = []
+            if self.vectorized:
+                avg_utilities = self.batch_expected_utilities(scratch, action)
+            else:
+                expected_utilities = []
 
-            for _ in range(NUM_SAMPLES):
-                successor = state.generateSuccessor(action)
-                terminal_state = self.simulate_random_playout(successor)
-                expected_utilities.append(self.utility(terminal_state))
+                for _ in range(NUM_SAMPLES):
+                    scratch.do_move(action)
+                    expected_utilities.append(self.simulate_random_playout(scratch))
+                    scratch.undo_move()
 
-            avg_utilities = tuple(
-                sum(vals) / len(vals) for vals in zip(*expected_utilities)
-            )
+                avg_utilities = tuple(
+                    sum(vals) / len(vals) for vals in zip(*expected_utilities)
+                )
 
-            # print(f"Action: {action}, Expected utilities: {avg_utilities}")
+            # print(f"Action: {card_str(action)}, Expected utilities: {avg_utilities}")
 
             if avg_utilities[my_index] > best_score:
                 best_score = avg_utilities[my_index]
                 best_action = action
 
-        return best_action
+        if self.recorder is not None:
+            self.record_decision(state, card_str(best_action), start_time, nodes=len(legal_actions),
+                                 playouts=NUM_SAMPLES * len(legal_actions), depth=1)
+        return card_str(best_action)
+
+    def play_many(self, states):
+        """
+        play() for several positions at once. The playouts after every legal action of every
+        position are coalesced into as few NumPy batches as possible, which is what makes
+        batching decision requests from many tables pay off.
+        """
+        if not self.vectorized:
+            return [self.play(state) for state in states]
+        start_time = time.perf_counter()
+        cards = [self.endgame_move(state, start_time) for state in states]
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        successors = []
+        moves = []
+        for position, state in enumerate(states):
+            if cards[position] is not None:
+                continue
+            scratch = to_compact_state(state)
+            for action in scratch.getLegalActions(self.distinct_moves):
+                successors.append(scratch.generateSuccessor(action))
+                moves.append((position, action))
+        outcomes = batch_playouts_many(successors, NUM_SAMPLES, rng)
+
+        best_scores = [float('-inf')] * len(states)
+        num_actions = [0] * len(states)
+        for (position, action), tricks_won in zip(moves, outcomes):
+            state = states[position]
+            score = float(batch_utilities(tricks_won, state.bids, MADE_BID)[:, state.curr_player_index].mean())
+            num_actions[position] += 1
+            if score > best_scores[position]:
+                best_scores[position] = score
+                cards[position] = card_str(action)
+
+        if self.recorder is not None:
+            for state, card, actions in zip(states, cards, num_actions):
+                if actions:
+                    self.record_decision(state, card, start_time, nodes=actions, playouts=NUM_SAMPLES * actions, depth=1)
+        return cards
 
 class MCTSAi(AiAgent):
-    def __init__(self, num_samples=NUM_SAMPLES, time_limit=1.0):
+    def __init__(self, num_samples=NUM_SAMPLES, time_limit=1.0, parallel=None, workers=None, leaf_batch=16, reuse_tree=True, tree='object',
+                 budget='time', seed=None, distinct_moves=True):
+        """
+        budget decides when a search stops: 'time' after time_limit seconds, 'iterations' after
+        num_samples iterations, 'rollouts' after num_samples rollouts (more than one per iteration
+        in leaf-parallel mode) and 'anytime' after num_samples iterations or time_limit seconds,
+        whichever comes later. All randomness comes from self.rng, seeded with seed, so a search
+        with a count budget replays exactly. last_search holds the counts and rate of the last search.
+        parallel picks a multi-process search: 'root' grows one independent tree per worker and sums
+        their root visit counts, 'leaf' runs leaf_batch rollouts per worker from every expanded node.
+        With reuse_tree the tree is kept after a move and the next search in the same round starts
+        from the node matching the cards played since.
+        tree='array' stores the tree in an ArrayTree (needs NumPy) instead of MCTSNode objects, for
+        long searches whose trees would not fit in memory as objects; it is not reused across moves.
+        distinct_moves gives nodes one child per run of equivalent cards instead of one per card.
+        """
         self.num_samples = num_samples
         self.time_limit = time_limit
+        self.budget = budget
+        self.seed = seed
+        self.distinct_moves = distinct_moves
+        self.rng = random.Random(seed)
+        self.last_search = None
+        self.parallel = parallel
+        self.workers = workers or os.cpu_count()
+        self.leaf_batch = leaf_batch
+        self.tree = tree
+        self.reuse_tree = reuse_tree and tree == 'object'
+        self._root_state = None
+        self._root_node = None
+        self._leaf_running = set()
+
+    def new_round(self, round_num, hand):
+        # A tree from the last round can never be rerooted into this one
+        self._root_state = self._root_node = None
+
+    def search_budget(self, time_limit):
+        """
+        Returns keep_going(iterations, rollouts), which tells a search loop whether it may run
+        another iteration under self.budget.
+        """
+        start_time = time.time()
+        limit = self.num_samples
+        if self.budget == 'iterations':
+            return lambda iterations, rollouts: iterations < limit
+        if self.budget == 'rollouts':
+            return lambda iterations, rollouts: rollouts < limit
+        if self.budget == 'anytime':
+            return lambda iterations, rollouts: iterations < limit or time.time() - start_time < time_limit
+        return lambda iterations, rollouts: time.time() - start_time < time_limit
+
+    def record_search(self, iterations, rollouts, start_time, nodes=0, depth=0):
+        seconds = time.time() - start_time
+        self.last_search = {
+            "iterations": iterations,
+            "rollouts": rollouts,
+            "nodes": nodes,
+            "depth": depth,
+            "seconds": seconds,
+            "iterations_per_second": iterations / seconds if seconds > 0 else 0.0,
+        }
+
+    def reroot(self, state):
+        """
+        Follows the cards played since the previous search down its tree and returns the node for
+        state, detached from its parent so the rest of the old tree can be collected. Returns None
+        when there is no previous tree, it was searched for another player or state cannot be
+        reached from its root.
+        With distinct_moves the tree only has a child for the lowest card of each run of equivalent
+        cards; a higher card of the run follows that child, whose subtree is relabelled to the
+        cards the player really holds.
+        """
+        walker, node = self._root_state, self._root_node
+        self._root_state = self._root_node = None
+        if walker is None or walker.round != state.round or walker.bids != state.bids:
+            return None
+        # Wins are counted for the player the tree was searched for, so it is no use to any other
+        if walker.curr_player_index != state.curr_player_index:
+            return None
+        if walker.getNumPlayers() != state.getNumPlayers() or walker.played_mask & ~state.played_mask:
+            return None
 
-    def simulate_random_playout(self, state):
-        # Random playout until end of round
-        while not state.isTerminal():
-            legal = state.getLegalActions()
-            action = random.choice(legal)
-            state = state.generateSuccessor(action)
-        return state
-
-    def mcts(self, root_state, time_limit=5.0):
-        root_node = MCTSNode(root_state)
-        my_index = root_state.curr_player_index
+        for _ in range((state.played_mask & ~walker.played_mask).bit_count()):
+            player = walker.curr_player_index
+            played = walker.hands[player] & ~state.hands[player]
+            if sum(walker.tricks_won) < sum(state.tricks_won) and state.trick[player] != NO_CARD:
+                # The walker is still in an earlier trick than the player's card on the table
+                played &= ~CARD_BIT[state.trick[player]]
+            if played.bit_count() != 1:
+                return None
+            card = played.bit_length() - 1
+            child = next((child for child in node.children if child.action == card), None)
+            if child is None and self.distinct_moves:
+                run = walker.legal_mask(True) & SUIT_MASKS[CARD_SUIT[card]] & ((CARD_BIT[card] << 1) - 1)
+                representative = run.bit_length() - 1
+                child = next((child for child in node.children if child.action == representative), None)
+                if child is not None:
+                    child.action = card
+                    child.relabel(card, representative)
+            if child is None:
+                return None
+            node = child
+            walker.do_move(card)
+
+        if (walker.hands != state.hands or walker.trick != state.trick
+                or walker.curr_player_index != state.curr_player_index or walker.tricks_won != state.tricks_won):
+            return None
+        node.parent = None
+        return node
+
+    def simulate_random_playout(self, state, my_index):
+        # Random playout until end of round, played and undone in place on the scratch state
+        return random_playout(state, lambda terminal: 1 if terminal.tricks_won[my_index] == terminal.bids[my_index] else 0, self.rng)
+
+    def search(self, scratch, time_limit, rollout=None, root_node=None):
+        """
+        Grows a tree from scratch (a CompactGameState) until the budget runs out and returns its root.
+        rollout(scratch) returns (visits, wins) for the leaf scratch is positioned at.
+        """
+        if root_node is None:
+            root_node = MCTSNode(scratch, distinct=self.distinct_moves)
+        my_index = scratch.curr_player_index
+        if rollout is None:
+            rollout = lambda leaf: (1, self.simulate_random_playout(leaf, my_index))
         start_time = time.time()
+        keep_going = self.search_budget(time_limit)
+        iterations = rollouts = nodes = max_depth = 0
 
-        while time.time() - start_time < time_limit:
+        while keep_going(iterations, rollouts):
             node = root_node
+            depth = 0
             # SELECTION
             while not node.is_terminal() and node.is_fully_expanded():
                 node = node.best_child()
+                scratch.do_move(node.action)
+                depth += 1
 
             # EXPANSION
             if not node.is_terminal() and node.untried_actions():
-                node = node.expand()
+                node = node.expand(scratch)
+                depth += 1
+                nodes += 1
+            if depth > max_depth:
+                max_depth = depth
 
             # SIMULATION
-            rollout_result = self.simulate_random_playout(node.state)
-            tricks = rollout_result.tricks_won[my_index]
-            bid = rollout_result.bids[my_index]
-            result = 1 if tricks == bid else 0
+            visits, wins = rollout(scratch)
+            for _ in range(depth):
+                scratch.undo_move()
 
             # BACKPROPAGATION
             while node is not None:
-                node.visits += 1
-                node.wins += result
+                node.visits += visits
+                node.wins += wins
                 node = node.parent
+            iterations += 1
+            rollouts += visits
 
-        # Choose best action from root
-        best = max(root_node.children, key=lambda c: c.visits)
-        return best.action
-    
-    def play(self, state: GameState):
+        self.record_search(iterations, rollouts, start_time, nodes, max_depth)
+        return root_node
+
+    def search_array(self, scratch, time_limit, rollout=None):
+        """
+        search() on an ArrayTree: returns the tree after time_limit.
+        """
+        tree = ArrayTree()
+        my_index = scratch.curr_player_index
+        if rollout is None:
+            rollout = lambda leaf: (1, self.simulate_random_playout(leaf, my_index))
+        hands = scratch.hands
+        start_time = time.time()
+        keep_going = self.search_budget(time_limit)
+        iterations = rollouts = max_depth = 0
+
+        while keep_going(iterations, rollouts):
+            node = 0
+            path = [0]
+            # SELECTION / EXPANSION: stop at the first child that has never been visited
+            while hands[scratch.curr_player_index]:
+                if not tree.is_expanded(node):
+                    tree.expand(node, scratch.getLegalActions(self.distinct_moves))
+                node = tree.select_child(node)
+                scratch.do_move(int(tree.action[node]))
+                path.append(node)
+                if tree.visits[node] == 0:
+                    break
+            if len(path) - 1 > max_depth:
+                max_depth = len(path) - 1
+
+            # SIMULATION
+            visits, wins = rollout(scratch)
+            for _ in range(len(path) - 1):
+                scratch.undo_move()
+
+            # BACKPROPAGATION
+            tree.backpropagate(path, visits, wins)
+            iterations += 1
+            rollouts += visits
+
+        self.record_search(iterations, rollouts, start_time, tree.size - 1, max_depth)
+        return tree
+
+    def root_parallel_visits(self, scratch, time_limit, root_node=None):
+        deadline = time.time() + time_limit
+        pool = get_search_pool(self.workers)
+        budget = max(0.0, time_limit - ROOT_PARALLEL_MARGIN)
+        futures = [
+            pool.submit(_root_search_worker, scratch.clone(), budget, self.num_samples, self.budget, self.rng.getrandbits(64),
+                        self.distinct_moves)
+            for _ in range(self.workers - 1)
+        ]
+        # The calling process grows a tree of its own while the workers run
+        root_node = self.search(scratch, budget, root_node=root_node)
+        visits = {child.action: child.visits for child in root_node.children}
+
+        if self.budget == 'time':
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.time()))
+            if not done and not visits:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        else:
+            # Count budgets are only reproducible if every worker's tree is merged
+            done = futures
+        for future in done:
+            for action, count in future.result().items():
+                visits[action] = visits.get(action, 0) + count
+        return visits, root_node
+
+    def leaf_parallel_rollout(self, my_index, deadline=None):
+        """
+        Returns a rollout for search() that runs leaf_batch playouts in this process and as many in
+        every worker. Past deadline (a time.time() value) it stops waiting for the workers and
+        counts only the playouts that are done. A batch that is already running cannot be
+        cancelled, so its worker gets no new batch until it finishes, and finish_leaf_rollouts
+        waits for any left when the search ends.
+        """
+        pool = get_search_pool(self.workers)
+        running = self._leaf_running
+
+        def rollout(leaf):
+            running.difference_update([future for future in running if future.done()])
+            futures = [
+                pool.submit(_leaf_rollouts_worker, leaf.clone(), my_index, self.leaf_batch, self.rng.getrandbits(64))
+                for _ in range(self.workers - 1 - len(running))
+            ]
+            wins = sum(self.simulate_random_playout(leaf, my_index) for _ in range(self.leaf_batch))
+            if deadline is None:
+                done = futures
+            else:
+                done, late = wait(futures, timeout=max(0.0, deadline - time.time()))
+                running.update(future for future in late if not future.cancel())
+            wins += sum(future.result() for future in done)
+            return (len(done) + 1) * self.leaf_batch, wins
+
+        return rollout
+
+    def finish_leaf_rollouts(self):
+        """
+        Waits out the leaf batches still running, so the next decision starts with idle workers.
+        """
+        wait(self._leaf_running)
+        self._leaf_running.clear()
+
+    def mcts(self, root_state, time_limit=None):
+        if time_limit is None:
+            time_limit = self.time_limit
+        scratch = to_compact_state(root_state)
+        root_node = self.reroot(scratch) if self.reuse_tree else None
+        if self.parallel == 'root':
+            visits, root_node = self.root_parallel_visits(scratch, time_limit, root_node)
+            # Count the workers' playouts too, one per root visit
+            self.last_search["rollouts"] = sum(visits.values())
+        else:
+            rollout = None
+            if self.parallel == 'leaf':
+                # Count budgets wait for every worker so that they replay exactly
+                deadline = time.time() + time_limit if self.budget == 'time' else None
+                rollout = self.leaf_parallel_rollout(scratch.curr_player_index, deadline)
+            try:
+                if self.tree == 'array':
+                    visits = self.search_array(scratch, time_limit, rollout).root_visits()
+                else:
+                    root_node = self.search(scratch, time_limit, rollout, root_node)
+                    visits = {child.action: child.visits for child in root_node.children}
+            finally:
+                self.finish_leaf_rollouts()
+        if self.reuse_tree:
+            self._root_state = scratch
+            self._root_node = root_node
+
+        # Choose best action from root; a search that ran out of time before its first iteration
+        # has none, and plays a random legal move
+        if not visits:
+            self.last_search["visit_share"] = 0.0
+            return card_str(self.rng.choice(scratch.getLegalActions()))
+        best_action = max(visits, key=visits.get)
+        self.last_search["visit_share"] = visits[best_action] / max(1, sum(visits.values()))
+        return card_str(best_action)
+
+    def record_mcts_decision(self, state, card, start_time):
+        search = self.last_search
+        self.record_decision(state, card, start_time, nodes=search["nodes"], playouts=search["rollouts"],
+                             depth=search["depth"], visit_share=search["visit_share"])
+
+    def play(self, state: CompactGameState):
+        start_time = time.perf_counter()
+        card = self.endgame_move(state, start_time)
+        if card is not None:
+            return card
         card = self.mcts(state, self.time_limit)
-        print("MCTS action:", card)
-        return card
\ No newline at end of file
+        if self.verbose:
+            print("MCTS action:", card)
+        if self.recorder is not None:
+            self.record_mcts_decision(state, card, start_time)
+        return card
+
+
+class ISMCTSAi(MCTSAi):
+    """
+    Information set MCTS: every iteration redeals the cards the player to move cannot see,
+    consistently with the cards already played and the suits opponents have shown they are out
+    of, and all determinizations share one tree. Only the own hand and public information of the
+    state passed in are used.
+    """
+    DEALS_PER_BATCH = 256
+
+    def __init__(self, num_samples=NUM_SAMPLES, time_limit=1.0, parallel=None, workers=None, leaf_batch=16, reuse_tree=False, tree='object',
+                 budget='time', seed=None, distinct_moves=True):
+        """
+        Takes MCTSAi's arguments, but the search is single-process over an object tree built
+        afresh for every decision, so parallel, tree='array' and reuse_tree are rejected.
+        """
+        if parallel is not None:
+            raise ValueError("ISMCTSAi has no parallel search")
+        if tree != 'object':
+            raise ValueError("ISMCTSAi only searches object trees")
+        if reuse_tree:
+            raise ValueError("ISMCTSAi does not reuse its tree across moves")
+        super().__init__(num_samples, time_limit, parallel, workers, leaf_batch, reuse_tree, tree, budget, seed, distinct_moves)
+
+    def search(self, root, time_limit, rollout=None):
+        observer = root.curr_player_index
+        num_players = root.getNumPlayers()
+        scratch = root.clone()
+        root_node = ISMCTSNode()
+        rewards = lambda terminal: tuple(
+            1 if terminal.tricks_won[i] == terminal.bids[i] else 0 for i in range(num_players)
+        )
+        sampler = DealSampler.from_state(root, observer, rng=self.rng)
+        opponents = sampler.seats
+        deals = []
+        start_time = time.time()
+        keep_going = self.search_budget(time_limit)
+        iterations = nodes = max_depth = 0
+
+        while keep_going(iterations, iterations):
+            if not deals:
+                deals = sampler.sample(self.DEALS_PER_BATCH)
+            deal = deals.pop()
+            for p in opponents:
+                scratch.hands[p] = deal[p]
+            node = root_node
+            depth = 0
+            # SELECTION / EXPANSION over the actions legal in this determinization
+            while scratch.hands[scratch.curr_player_index]:
+                legal_actions = scratch.getLegalActions(self.distinct_moves)
+                untried = node.untried_actions(legal_actions)
+                player = scratch.curr_player_index
+                if untried:
+                    action = self.rng.choice(untried)
+                    node = node.add_child(action, player)
+                    scratch.do_move(action)
+                    depth += 1
+                    nodes += 1
+                    break
+                node = node.select_child(legal_actions)
+                scratch.do_move(node.action)
+                depth += 1
+            if depth > max_depth:
+                max_depth = depth
+
+            # SIMULATION
+            result = random_playout(scratch, rewards, self.rng)
+            for _ in range(depth):
+                scratch.undo_move()
+
+            # BACKPROPAGATION
+            while node.parent is not None:
+                node.visits += 1
+                node.wins += result[node.player]
+                node = node.parent
+            node.visits += 1
+            iterations += 1
+
+        self.record_search(iterations, iterations, start_time, nodes, max_depth)
+        return root_node
+
+    def mcts(self, root_state, time_limit=None):
+        if time_limit is None:
+            time_limit = self.time_limit
+        root = to_compact_state(root_state)
+        root_node = self.search(root, time_limit)
+        if not root_node.children:
+            self.last_search["visit_share"] = 0.0
+            return card_str(self.rng.choice(root.getLegalActions()))
+        best = max(root_node.children.values(), key=lambda c: c.visits)
+        self.last_search["visit_share"] = best.visits / max(1, root_node.visits)
+        return card_str(best.action)
+
+    def play(self, state: CompactGameState):
+        start_time = time.perf_counter()
+        card = self.mcts(state, self.time_limit)
+        if self.verbose:
+            print("ISMCTS action:", card)
+        if self.recorder is not None:
+            self.record_mcts_decision(state, card, start_time)
+        return card
+
+
+def _root_search_worker(state, time_limit, num_samples, budget, seed, distinct_moves=True):
+    root_node = MCTSAi(num_samples, time_limit, budget=budget, seed=seed, distinct_moves=distinct_moves).search(state, time_limit)
+    return {child.action: child.visits for child in root_node.children}
+
+
+def _leaf_rollouts_worker(state, my_index, count, seed):
+    ai = MCTSAi(seed=seed)
+    return sum(ai.simulate_random_playout(state, my_index) for _ in range(count))
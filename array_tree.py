@@ -0,0 +1,77 @@
+import numpy as np
+
+UNEXPANDED = -1
+
+
+class ArrayTree:
+    """
+    MCTS tree stored as parallel preallocated arrays instead of MCTSNode objects. Node i's
+    children occupy the contiguous block first_child[i] : first_child[i] + num_children[i],
+    created all at once when i is first expanded, which lets UCB1 over a node's children run as
+    one vectorized expression. Nodes hold no state; the search replays actions from the root.
+    """
+    def __init__(self, capacity=1 << 14):
+        self.size = 0
+        self.visits = np.zeros(capacity, dtype=np.float64)
+        self.wins = np.zeros(capacity, dtype=np.float64)
+        self.parent = np.full(capacity, UNEXPANDED, dtype=np.int32)
+        self.first_child = np.full(capacity, UNEXPANDED, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int16)
+        self.action = np.full(capacity, UNEXPANDED, dtype=np.int8)
+        self.add_root()
+
+    def add_root(self):
+        self.size = 1
+        self.visits[0] = self.wins[0] = 0
+        self.parent[0] = self.first_child[0] = UNEXPANDED
+        self.num_children[0] = 0
+        return 0
+
+    def _grow(self, needed):
+        capacity = len(self.visits)
+        while capacity < needed:
+            capacity *= 2
+        for name, fill in (('visits', 0), ('wins', 0), ('parent', UNEXPANDED),
+                           ('first_child', UNEXPANDED), ('num_children', 0), ('action', UNEXPANDED)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def is_expanded(self, node):
+        return self.first_child[node] != UNEXPANDED
+
+    def expand(self, node, actions):
+        start = self.size
+        end = start + len(actions)
+        if end > len(self.visits):
+            self._grow(end)
+        self.parent[start:end] = node
+        self.action[start:end] = actions
+        self.first_child[node] = start
+        self.num_children[node] = len(actions)
+        self.size = end
+
+    def select_child(self, node, c=1.4):
+        """
+        Returns the first unvisited child of node, or else the child with the highest UCB1.
+        """
+        start = self.first_child[node]
+        end = start + self.num_children[node]
+        visits = self.visits[start:end]
+        unvisited = np.flatnonzero(visits == 0)
+        if len(unvisited):
+            return start + unvisited[0]
+        ucb = self.wins[start:end] / visits + c * np.sqrt(np.log(self.visits[node] + 1) / visits)
+        return start + int(ucb.argmax())
+
+    def backpropagate(self, path, visits, wins):
+        self.visits[path] += visits
+        self.wins[path] += wins
+
+    def root_visits(self):
+        start = self.first_child[0]
+        if start == UNEXPANDED:
+            return {}
+        end = start + self.num_children[0]
+        return {int(action): int(visits) for action, visits in zip(self.action[start:end], self.visits[start:end])}
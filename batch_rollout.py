@@ -0,0 +1,138 @@
+import numpy as np
+from cards import CARD_BIT, CARD_STRENGTH, CARD_SUIT, FULL_DECK_MASK, NO_CARD, SUIT_MASKS, TRUMP_MASK, TRUMP_SUIT
+from compact_state import CompactGameState
+
+CARD_SUIT_ARRAY = np.array(CARD_SUIT, dtype=np.int8)
+CARD_STRENGTH_ARRAY = np.array(CARD_STRENGTH, dtype=np.int16)  # (4, 52)
+CARD_BITS = np.array(CARD_BIT, dtype=np.uint64)
+SUIT_MASK_ARRAY = np.array(SUIT_MASKS, dtype=np.uint64)
+NON_TRUMP = np.uint64(FULL_DECK_MASK & ~TRUMP_MASK)
+ONE = np.uint64(1)
+
+if hasattr(np, "bitwise_count"):
+    popcount = np.bitwise_count
+else:
+    def popcount(masks):
+        masks = masks - ((masks >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        masks = (masks & np.uint64(0x3333333333333333)) + ((masks >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        masks = (masks + (masks >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return (masks * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def masks_to_array(masks):
+    """
+    Expands a list of hand masks into a (len(masks), 52) boolean array.
+    """
+    return (np.array(masks, dtype=np.uint64)[:, None] & CARD_BITS) != 0
+
+
+def random_cards(masks, rng):
+    """
+    Vectorized rollout.random_card: a uniformly random card id out of every non-empty mask of a
+    uint64 array, found by dropping a random number of its lowest cards and taking the lowest left.
+    """
+    skip = (rng.random(len(masks)) * popcount(masks)).astype(np.uint8)
+    for drop in range(int(skip.max(initial=0))):
+        masks = np.where(skip > drop, masks & (masks - ONE), masks)
+    return popcount((masks & (~masks + ONE)) - ONE).astype(np.intp)
+
+
+def batch_random_playouts(state: CompactGameState, num_playouts, rng=None):
+    """
+    Plays num_playouts random playouts of state in lockstep and returns their final
+    tricks_won as a (num_playouts, num_players) array. Every playout makes the same number
+    of moves and so is at the same point of a trick at every step; only who is to move
+    differs once tricks are won by different seats, so each step is a handful of whole-batch
+    array operations.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    num_players = state.getNumPlayers()
+
+    hands = np.tile(np.array(state.hands, dtype=np.uint64), (num_playouts, 1))
+    trick = np.tile(np.array(state.trick, dtype=np.int16), (num_playouts, 1))
+    tricks_won = np.tile(np.array(state.tricks_won, dtype=np.int16), (num_playouts, 1))
+    trump_broken = np.full(num_playouts, state.trump_broken)
+    lead_index = np.full(num_playouts, state.lead_index)
+    player = np.full(num_playouts, state.curr_player_index)
+
+    remaining = sum(state.hand_size(i) for i in range(num_players))
+    batch_play_random(hands, trick, tricks_won, trump_broken, state.trick_size, lead_index, player, remaining, rng)
+    return tricks_won
+
+
+def batch_playouts_many(states, num_playouts, rng=None):
+    """
+    batch_random_playouts for many states at once, returning a tricks_won array per state.
+    States with the same number of players, cards in the current trick and cards left make the
+    same moves in lockstep, so each such group is played out as one batch.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    groups = {}
+    for i, state in enumerate(states):
+        remaining = sum(state.hand_size(p) for p in range(state.getNumPlayers()))
+        groups.setdefault((state.getNumPlayers(), state.trick_size, remaining), []).append(i)
+
+    results = [None] * len(states)
+    for (num_players, trick_size, remaining), members in groups.items():
+        repeat = lambda values, dtype: np.repeat(np.array(values, dtype=dtype), num_playouts, axis=0)
+        hands = repeat([states[i].hands for i in members], np.uint64)
+        trick = repeat([states[i].trick for i in members], np.int16)
+        tricks_won = repeat([states[i].tricks_won for i in members], np.int16)
+        trump_broken = repeat([states[i].trump_broken for i in members], bool)
+        lead_index = repeat([states[i].lead_index for i in members], np.intp)
+        player = repeat([states[i].curr_player_index for i in members], np.intp)
+        batch_play_random(hands, trick, tricks_won, trump_broken, trick_size, lead_index, player, remaining, rng)
+        for k, i in enumerate(members):
+            results[i] = tricks_won[k * num_playouts:(k + 1) * num_playouts]
+    return results
+
+
+def batch_play_random(hands, trick, tricks_won, trump_broken, trick_size, lead_index, player, moves, rng):
+    """
+    Makes moves uniformly random legal moves in every row of a batch of positions, in place.
+    hands (uint64 card masks), trick and tricks_won are (rows, players) arrays; trump_broken,
+    lead_index and player are (rows,); trick_size, the number of cards in the current trick,
+    is the same in every row. Returns who is to move in every row afterwards.
+    """
+    num_rows, num_players = hands.shape
+    rows = np.arange(num_rows)
+    for _ in range(moves):
+        hand = hands[rows, player]
+        if trick_size == 0:
+            non_trump = hand & NON_TRUMP
+            legal = np.where(~trump_broken & (non_trump != 0), non_trump, hand)
+            lead_index = player
+        else:
+            lead_suit = CARD_SUIT_ARRAY[trick[rows, lead_index]]
+            follow = hand & SUIT_MASK_ARRAY[lead_suit]
+            legal = np.where(follow != 0, follow, hand)
+
+        card = random_cards(legal, rng)
+        hands[rows, player] = hand ^ CARD_BITS[card]
+        trick[rows, player] = card
+        trump_broken |= CARD_SUIT_ARRAY[card] == TRUMP_SUIT
+        trick_size += 1
+
+        if trick_size == num_players:
+            lead_suit = CARD_SUIT_ARRAY[trick[rows, lead_index]]
+            strength = CARD_STRENGTH_ARRAY[lead_suit[:, None], trick]
+            # The winner of a trick leads the next one
+            player = strength.argmax(axis=1)
+            tricks_won[rows, player] += 1
+            trick[:] = NO_CARD
+            trick_size = 0
+        else:
+            player = (player + 1) % num_players
+
+    return player
+
+
+def batch_utilities(tricks_won, bids, made_bid):
+    """
+    Vectorized counterpart of the agents' utility(): made_bid where tricks_won equals the bid,
+    minus the distance to the bid otherwise.
+    """
+    distance = np.abs(tricks_won - np.array(bids, dtype=np.int16))
+    return np.where(distance == 0, made_bid, -distance)
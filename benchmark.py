@@ -0,0 +1,288 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from ai import ExpectimaxAi, MCTSAi, estimate_tricks
+from cards import CARD_IDS, CARD_STRS, cards_to_mask, trick_winner
+from compact_state import CompactGameState, playable_mask
+from engine import batch_random_games
+from game import SpadesGame
+from rollout import random_card, random_playout
+from states import GameState, playable_cards
+
+NUM_PLAYERS = 4
+ROUND_SIZES = list(range(1, 14))
+POSITIONS_PER_ROUND = 8  # seeded deals per round size
+BATCH_GAMES = 10000  # games per batch_random_games run
+BENCHMARKS = ["successor", "compact_successor", "playable_cards", "score_trick", "compact_score_trick", "random_playout",
+              "mcts", "expectimax", "game", "batch_games"]
+
+
+def make_positions(round_size, seed, count=POSITIONS_PER_ROUND):
+    """
+    Deals count seeded rounds of round_size cards and plays each a random number of moves in,
+    so positions both lead and follow. Returns (GameState, CompactGameState) pairs.
+    """
+    rng = random.Random(seed * 1000 + round_size)
+    positions = []
+    for _ in range(count):
+        cards = rng.sample(CARD_STRS, NUM_PLAYERS * round_size)
+        hands = [cards[i * round_size:(i + 1) * round_size] for i in range(NUM_PLAYERS)]
+        bids = [round(estimate_tricks(cards_to_mask(hand))) for hand in hands]
+        state = GameState(round_size, hands, 1, set(), [None] * NUM_PLAYERS, False, bids, [0] * NUM_PLAYERS)
+        compact = CompactGameState.from_game_state(state)
+        for _ in range(rng.randrange(NUM_PLAYERS * round_size)):
+            compact.do_move(random_card(playable_mask(compact), rng))
+        positions.append((compact.to_game_state(), compact))
+    return positions
+
+
+def make_tricks(seed, count=256):
+    rng = random.Random(seed)
+    tricks = []
+    for _ in range(count):
+        trick = rng.sample(CARD_STRS, NUM_PLAYERS)
+        tricks.append((trick, [CARD_IDS[card] for card in trick], rng.randrange(NUM_PLAYERS)))
+    return tricks
+
+
+def time_per_op(func, ops, repeat):
+    """
+    Times func, which performs ops operations per call, with timeit and returns the best and
+    median seconds per operation over repeat runs.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    runs = [elapsed / (number * ops) for elapsed in timer.repeat(repeat, number)]
+    return min(runs), statistics.median(runs)
+
+
+def rate(best, median, unit="ops/s"):
+    return {"value": 1.0 / best, "median": 1.0 / median, "unit": unit, "higher_is_better": True}
+
+
+def latency(runs, unit="s"):
+    return {"value": min(runs), "median": statistics.median(runs), "unit": unit, "higher_is_better": False}
+
+
+def bench_successor(positions, repeat):
+    moves = [(state, action) for state, _ in positions for action in state.getLegalActions()]
+
+    def run():
+        for state, action in moves:
+            state.generateSuccessor(action)
+    return rate(*time_per_op(run, len(moves), repeat))
+
+
+def bench_compact_successor(positions, repeat):
+    moves = [(compact, action) for _, compact in positions for action in compact.getLegalActions()]
+
+    def run():
+        for compact, action in moves:
+            compact.generateSuccessor(action)
+    return rate(*time_per_op(run, len(moves), repeat))
+
+
+def bench_playable_cards(positions, repeat):
+    states = [state for state, _ in positions]
+
+    def run():
+        for state in states:
+            playable_cards(state)
+    return rate(*time_per_op(run, len(states), repeat))
+
+
+def bench_score_trick(tricks, repeat):
+    state = GameState(0, [[] for _ in range(NUM_PLAYERS)], 0, set(), [None] * NUM_PLAYERS, False, [0] * NUM_PLAYERS, [0] * NUM_PLAYERS)
+
+    def run():
+        for trick, _, start in tricks:
+            state.score_trick(trick, start)
+    return rate(*time_per_op(run, len(tricks), repeat))
+
+
+def bench_compact_score_trick(tricks, repeat):
+    def run():
+        for _, trick, start in tricks:
+            trick_winner(trick, start)
+    return rate(*time_per_op(run, len(tricks), repeat))
+
+
+def bench_random_playout(positions, repeat, seed):
+    rng = random.Random(seed)
+    states = [compact for _, compact in positions]
+    evaluate = lambda terminal: terminal.tricks_won[0]
+
+    def run():
+        for compact in states:
+            random_playout(compact, evaluate, rng)
+    return rate(*time_per_op(run, len(states), repeat), unit="playouts/s")
+
+
+def bench_mcts(positions, repeat, seed, iterations):
+    runs = []
+    for _ in range(repeat):
+        elapsed = 0.0
+        done = 0
+        for state, _ in positions:
+            ai = MCTSAi(num_samples=iterations, budget='iterations', seed=seed, reuse_tree=False)
+            ai.mcts(state)
+            elapsed += ai.last_search["seconds"]
+            done += ai.last_search["iterations"]
+        runs.append(elapsed / done)
+    return rate(min(runs), statistics.median(runs), unit="iterations/s")
+
+
+def bench_expectimax(positions, repeat, seed):
+    runs = []
+    for _ in range(repeat):
+        random.seed(seed)
+        ai = ExpectimaxAi(seed=seed)
+        start = time.perf_counter()
+        for state, _ in positions:
+            ai.play(state)
+        runs.append((time.perf_counter() - start) / len(positions))
+    return latency(runs, unit="s/move")
+
+
+def bench_game(round_sizes, repeat, seed, games):
+    runs = []
+    for _ in range(repeat):
+        random.seed(seed)
+        start = time.perf_counter()
+        for _ in range(games):
+            SpadesGame(0, NUM_PLAYERS, 0, 0, 0, max(round_sizes), min(round_sizes) - 1, True).play_game()
+        runs.append((time.perf_counter() - start) / games)
+    return rate(min(runs), statistics.median(runs), unit="games/s")
+
+
+def bench_batch_games(round_sizes, repeat, seed, games):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        batch_random_games(games, NUM_PLAYERS, max(round_sizes), min(round_sizes) - 1, seed)
+        runs.append((time.perf_counter() - start) / games)
+    return rate(min(runs), statistics.median(runs), unit="games/s")
+
+
+def run_benchmarks(names, round_sizes, seed=0, repeat=5, mcts_iterations=500, games=20, progress=None):
+    """
+    Runs the named benchmarks on seeded positions for every round size and returns the report:
+    results[name][round size] (or results["game"]["all"]) is a measurement with its value,
+    median, unit and whether higher is better.
+    """
+    results = {}
+    tricks = make_tricks(seed)
+    for name in names:
+        if progress:
+            progress(name)
+        if name == "score_trick":
+            results[name] = {"all": bench_score_trick(tricks, repeat)}
+            continue
+        if name == "compact_score_trick":
+            results[name] = {"all": bench_compact_score_trick(tricks, repeat)}
+            continue
+        if name == "game":
+            results[name] = {"all": bench_game(round_sizes, repeat, seed, games)}
+            continue
+        if name == "batch_games":
+            results[name] = {"all": bench_batch_games(round_sizes, repeat, seed, BATCH_GAMES)}
+            continue
+        results[name] = {}
+        for round_size in round_sizes:
+            positions = make_positions(round_size, seed)
+            if name == "successor":
+                measurement = bench_successor(positions, repeat)
+            elif name == "compact_successor":
+                measurement = bench_compact_successor(positions, repeat)
+            elif name == "playable_cards":
+                measurement = bench_playable_cards(positions, repeat)
+            elif name == "random_playout":
+                measurement = bench_random_playout(positions, repeat, seed)
+            elif name == "mcts":
+                measurement = bench_mcts(positions, max(1, repeat // 2), seed, mcts_iterations)
+            elif name == "expectimax":
+                measurement = bench_expectimax(positions, max(1, repeat // 2), seed)
+            else:
+                raise ValueError(f"Unknown benchmark {name}")
+            results[name][str(round_size)] = measurement
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seed": seed,
+            "repeat": repeat,
+            "round_sizes": round_sizes,
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, tolerance=0.05):
+    """
+    Returns (rows, regressions) comparing report against baseline. Each row is
+    (benchmark, round size, baseline value, new value, speedup) where a speedup above 1 is
+    an improvement whichever way the measurement points; regressions are the rows slower by
+    more than tolerance.
+    """
+    rows = []
+    for name, by_round in report["results"].items():
+        for key, new in by_round.items():
+            old = baseline.get("results", {}).get(name, {}).get(key)
+            if old is None:
+                continue
+            if new["higher_is_better"]:
+                speedup = new["value"] / old["value"]
+            else:
+                speedup = old["value"] / new["value"]
+            rows.append((name, key, old["value"], new["value"], speedup))
+    regressions = [row for row in rows if row[4] < 1 - tolerance]
+    return rows, regressions
+
+
+def print_comparison(rows, out=sys.stdout):
+    print(f"{'benchmark':<20} {'round':>5} {'baseline':>12} {'current':>12} {'speedup':>8}", file=out)
+    for name, key, old, new, speedup in rows:
+        print(f"{name:<20} {key:>5} {old:>12.4g} {new:>12.4g} {speedup:>7.2f}x", file=out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Spades state engine, rollouts, agents and games.")
+    parser.add_argument("-b", "--bench", nargs="+", choices=BENCHMARKS, default=BENCHMARKS, help="Benchmarks to run.")
+    parser.add_argument("-n", "--rounds", type=int, nargs="+", default=ROUND_SIZES, help="Round sizes (1-13).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for deals and searches.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing runs per measurement; the best is reported.")
+    parser.add_argument("--mcts-iterations", type=int, default=500, help="MCTS iterations per position.")
+    parser.add_argument("--games", type=int, default=20, help="Games per game-throughput run.")
+    parser.add_argument("-o", "--output", default=None, help="Write the JSON report here instead of stdout.")
+    parser.add_argument("-c", "--compare", default=None, help="Baseline JSON report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="Slowdown allowed before a comparison fails.")
+    args = parser.parse_args()
+
+    if any(not 1 <= round_size <= 13 for round_size in args.rounds):
+        parser.error("round sizes must be between 1 and 13")
+
+    report = run_benchmarks(args.bench, sorted(set(args.rounds)), args.seed, args.repeat, args.mcts_iterations, args.games,
+                            progress=lambda name: print(f"Running {name}...", file=sys.stderr))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows, regressions = compare(report, baseline, args.tolerance)
+        print_comparison(rows, sys.stderr)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
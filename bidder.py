@@ -0,0 +1,121 @@
+import json
+import time
+import numpy as np
+from batch_rollout import CARD_BITS, batch_play_random
+from cards import FULL_DECK_MASK, NUM_RANKS, SUIT_MASKS, TRUMP_SUIT, mask_to_ids
+
+MADE_BID_BONUS = 10  # as in SpadesGame.score_round
+SAMPLES = 512
+BATCH = 256
+HONOUR_SHIFT = NUM_RANKS - 4  # rank bits of J, Q, K and A
+
+
+def hand_shape(hand_mask, round_size, num_players):
+    """
+    Cache key for a hand: the length of each suit and which of its honours (J, Q, K, A) it holds,
+    the spot cards below them being taken as interchangeable. The non-trump suits are
+    interchangeable too, so they are sorted. An exact rank pattern would almost never repeat in
+    hands of more than a few cards.
+    """
+    suits = []
+    for suit, suit_mask in enumerate(SUIT_MASKS):
+        cards = (hand_mask & suit_mask) >> (suit * NUM_RANKS)
+        suits.append((cards.bit_count(), cards >> HONOUR_SHIFT))
+    trump = suits.pop(TRUMP_SUIT)
+    return (round_size, num_players) + trump + tuple(value for shape in sorted(suits, reverse=True) for value in shape)
+
+
+class MonteCarloBidder:
+    """
+    Bids by simulation: deals the unseen cards to the other players at random, plays each deal
+    out with random legal moves from a random leader in NumPy batches, and bids the allowed
+    number of tricks with the best expected score over the resulting trick distribution.
+    Distributions are cached by hand_shape, so a hand of a shape seen before costs a dict lookup
+    (hit_rate tells how often that happens). Each estimate stops after samples playouts or time_limit seconds, whichever comes first.
+    """
+    def __init__(self, samples=SAMPLES, time_limit=0.05, seed=None):
+        self.samples = samples
+        self.time_limit = time_limit
+        self.rng = np.random.default_rng(seed)
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+
+    def trick_distribution(self, hand_mask, round_size, num_players):
+        """
+        Probability of the hand winning 0..round_size tricks, as an array.
+        """
+        key = hand_shape(hand_mask, round_size, num_players)
+        distribution = self.cache.get(key)
+        if distribution is not None:
+            self.hits += 1
+            return distribution
+        self.misses += 1
+        distribution = self._simulate(hand_mask, round_size, num_players)
+        self.cache[key] = distribution
+        return distribution
+
+    def _simulate(self, hand_mask, round_size, num_players):
+        unseen = np.array(mask_to_ids(FULL_DECK_MASK & ~hand_mask), dtype=np.intp)
+        counts = np.zeros(round_size + 1)
+        deadline = time.perf_counter() + self.time_limit
+        done = 0
+        while done < self.samples and (done == 0 or time.perf_counter() < deadline):
+            rows = min(BATCH, self.samples - done)
+            # Seat 0 is the bidder; the others get round_size cards each of a shuffled unseen pile
+            dealt = unseen[self.rng.random((rows, len(unseen))).argsort(axis=1)]
+            hands = np.empty((rows, num_players), dtype=np.uint64)
+            hands[:, 0] = hand_mask
+            for seat in range(1, num_players):
+                hands[:, seat] = CARD_BITS[dealt[:, (seat - 1) * round_size:seat * round_size]].sum(axis=1)
+            trick = np.full((rows, num_players), -1, dtype=np.int16)
+            tricks_won = np.zeros((rows, num_players), dtype=np.int16)
+            leader = self.rng.integers(num_players, size=rows)
+            batch_play_random(hands, trick, tricks_won, np.zeros(rows, dtype=bool), 0, leader.copy(), leader,
+                              num_players * round_size, self.rng)
+            counts += np.bincount(tricks_won[:, 0], minlength=round_size + 1)
+            done += rows
+        return counts / done
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def expected_scores(self, distribution):
+        bids = np.arange(len(distribution))
+        # Made: bid + bonus; missed: -bid, whatever the distance
+        return distribution * (bids + MADE_BID_BONUS) - (1 - distribution) * bids
+
+    def bid(self, hand_mask, total_bid, total_bids, num_players, round_num):
+        expected = self.expected_scores(self.trick_distribution(hand_mask, round_num, num_players))
+        allowed_bids = [bid for bid in range(round_num + 1)
+                        if (total_bids < num_players - 1 or total_bid + bid != round_num)]
+        return max(allowed_bids, key=lambda bid: expected[bid])
+
+    def precompute(self, hands, round_size, num_players):
+        """
+        Fills the cache for every hand mask in hands ahead of play.
+        """
+        for hand_mask in hands:
+            self.trick_distribution(hand_mask, round_size, num_players)
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump([[list(key), distribution.tolist()] for key, distribution in self.cache.items()], f)
+
+    def load(self, path):
+        with open(path) as f:
+            for key, distribution in json.load(f):
+                self.cache[tuple(key)] = np.array(distribution)
+
+
+_shared_bidder = None
+
+def shared_bidder():
+    """
+    The process-wide MonteCarloBidder, so every player in a process shares one cache.
+    """
+    global _shared_bidder
+    if _shared_bidder is None:
+        _shared_bidder = MonteCarloBidder()
+    return _shared_bidder
@@ -0,0 +1,99 @@
+SUITS = ['S', 'H', 'D', 'C']
+RANKS = [str(n) for n in range(2, 11)] + ['J', 'Q', 'K', 'A']
+NUM_RANKS = len(RANKS)
+NUM_CARDS = len(SUITS) * NUM_RANKS
+
+TRUMP_SUIT = SUITS.index('S')
+NO_CARD = -1
+
+# Card ids are suit_index * 13 + (rank - 2), so every suit owns a contiguous
+# run of 13 bits in a hand mask and a higher id within a suit is a higher rank.
+CARD_STRS = [f"{rank}{suit}" for suit in SUITS for rank in RANKS]
+CARD_IDS = {card: card_id for card_id, card in enumerate(CARD_STRS)}
+CARD_RANK = [2 + card_id % NUM_RANKS for card_id in range(NUM_CARDS)]
+CARD_SUIT = [card_id // NUM_RANKS for card_id in range(NUM_CARDS)]
+CARD_BIT = [1 << card_id for card_id in range(NUM_CARDS)]
+# The same lookups keyed by card string, for code that still deals in "10H"-style cards
+CARD_STR_RANK = {card: CARD_RANK[card_id] for card_id, card in enumerate(CARD_STRS)}
+CARD_STR_SUIT = {card: SUITS[CARD_SUIT[card_id]] for card_id, card in enumerate(CARD_STRS)}
+
+# CARD_STRENGTH[lead_suit][card] orders the cards of a trick led in lead_suit: trumps beat the
+# lead suit, which beats everything else, and within a suit the higher rank wins. Off-suit
+# cards are 0 and never win, and no two cards tie, so the winner is the strongest card.
+CARD_STRENGTH = [
+    [2 * NUM_RANKS + CARD_RANK[card_id] if CARD_SUIT[card_id] == TRUMP_SUIT else
+     NUM_RANKS + CARD_RANK[card_id] if CARD_SUIT[card_id] == lead_suit else 0
+     for card_id in range(NUM_CARDS)]
+    for lead_suit in range(len(SUITS))
+]
+
+SUIT_MASKS = [((1 << NUM_RANKS) - 1) << (suit * NUM_RANKS) for suit in range(len(SUITS))]
+TRUMP_MASK = SUIT_MASKS[TRUMP_SUIT]
+RANK_MASKS = {rank: sum(1 << (suit * NUM_RANKS + rank - 2) for suit in range(len(SUITS))) for rank in range(2, 15)}
+HIGH_CARD_MASK = RANK_MASKS[11] | RANK_MASKS[12] | RANK_MASKS[13] | RANK_MASKS[14]
+MID_CARD_MASK = RANK_MASKS[8] | RANK_MASKS[9] | RANK_MASKS[10]
+FULL_DECK_MASK = (1 << NUM_CARDS) - 1
+
+# SUIT_PATTERN_IDS[suit][pattern] lists the card ids of a 13-bit rank pattern within suit, so
+# turning a hand mask into ids is four table lookups instead of a loop over its bits.
+_RANK_BITS = (1 << NUM_RANKS) - 1
+SUIT_PATTERN_IDS = [
+    [tuple(suit * NUM_RANKS + rank for rank in range(NUM_RANKS) if pattern >> rank & 1)
+     for pattern in range(1 << NUM_RANKS)]
+    for suit in range(len(SUITS))
+]
+_SPADE_IDS, _HEART_IDS, _DIAMOND_IDS, _CLUB_IDS = SUIT_PATTERN_IDS
+
+
+def card_id(card):
+    return CARD_IDS[card]
+
+
+def card_str(card_id):
+    return CARD_STRS[card_id]
+
+
+def cards_to_mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= CARD_BIT[CARD_IDS[card]]
+    return mask
+
+
+def mask_to_ids(mask):
+    return [*_SPADE_IDS[mask & _RANK_BITS], *_HEART_IDS[mask >> NUM_RANKS & _RANK_BITS],
+            *_DIAMOND_IDS[mask >> 2 * NUM_RANKS & _RANK_BITS], *_CLUB_IDS[mask >> 3 * NUM_RANKS]]
+
+
+def mask_to_cards(mask):
+    return [CARD_STRS[card_id] for card_id in mask_to_ids(mask)]
+
+
+def trick_winner(trick, starting_player_index):
+    """
+    Index of the winner of a complete trick of card ids led by starting_player_index.
+    """
+    strength = CARD_STRENGTH[CARD_SUIT[trick[starting_player_index]]]
+    winner_index = starting_player_index
+    best = strength[trick[starting_player_index]]
+    for i in range(len(trick)):
+        if strength[trick[i]] > best:
+            best = strength[trick[i]]
+            winner_index = i
+    return winner_index
+
+
+def drop_equivalent(legal_mask, out_mask):
+    """
+    Removes from legal_mask every card that is equivalent to the next lower one in it of the same
+    suit, leaving the lowest card of each run. Two cards held by the same player are equivalent
+    when every card ranked between them is in out_mask (played in a completed trick): whichever
+    is played, the same cards beat it and are beaten by it for the rest of the round.
+    """
+    kept = legal_mask
+    previous = NO_CARD
+    for card in mask_to_ids(legal_mask):
+        if previous != NO_CARD and CARD_SUIT[card] == CARD_SUIT[previous] and not (CARD_BIT[card] - CARD_BIT[previous + 1]) & ~out_mask:
+            kept ^= CARD_BIT[card]
+        previous = card
+    return kept
@@ -0,0 +1,308 @@
+from cards import (CARD_BIT, CARD_IDS, CARD_STRS, CARD_SUIT, NO_CARD, NUM_CARDS, SUITS, SUIT_MASKS, TRUMP_MASK,
+                   TRUMP_SUIT, cards_to_mask, drop_equivalent, mask_to_cards, mask_to_ids, trick_winner)
+from states import GameState
+from zobrist import HAND_KEYS, TRICK_KEYS, TRICKS_WON_KEYS, TRUMP_BROKEN_KEY, TURN_KEYS, zobrist_hash
+
+
+class CompactGameState:
+    """
+    Array-backed counterpart of states.GameState. Hands are 52-bit masks over card ids
+    (see cards.py) and the current trick is a fixed-size list of card ids, so successor
+    generation and legal move computation never touch card strings.
+    Actions are card ids; use cards.card_str to turn one back into the form SpadesGame expects.
+
+    Searches that walk a single scratch state use do_move/undo_move, which record what they
+    need to restore in history buffers allocated once per state instead of copying it.
+    After enable_zobrist() they also keep self.zobrist, the position's Zobrist key, up to date;
+    copies made by clone or generateSuccessor start with hashing off.
+
+    void_masks[p] is the union of the suit masks player p has been seen to be out of before this
+    state; it is what the game revealed and is not updated by moves made in a search.
+    """
+    __slots__ = ('round', 'hands', 'curr_player_index', 'played_mask', 'trick', 'trick_size',
+                 'lead_index', 'trump_broken', 'bids', 'tricks_won', 'void_masks', 'zobrist', '_history',
+                 '_trick_history', '_ply', '_tricks_done')
+
+    def __init__(self, round, hands, curr_player_index, played_mask, trick, trick_size, lead_index, trump_broken, bids, tricks_won, void_masks=None):
+        self.round = round
+        self.hands = hands
+        self.curr_player_index = curr_player_index
+        self.played_mask = played_mask
+        self.trick = trick
+        self.trick_size = trick_size
+        self.lead_index = lead_index
+        self.trump_broken = trump_broken
+        self.bids = bids
+        self.tricks_won = tricks_won
+        self.void_masks = void_masks if void_masks is not None else [0] * len(hands)
+        self.zobrist = None
+        self._history = None
+        self._trick_history = None
+        self._ply = 0
+        self._tricks_done = 0
+
+    @classmethod
+    def from_game_state(cls, state: GameState):
+        num_players = len(state.player_hands)
+        hands = [cards_to_mask(hand) for hand in state.player_hands]
+        trick = [NO_CARD if card is None else CARD_IDS[card] for card in state.cards_played_trick]
+        trick_size = sum(1 for card in trick if card != NO_CARD)
+        played_mask = cards_to_mask(state.cards_played_round)
+        for card in trick:
+            if card != NO_CARD:
+                played_mask |= CARD_BIT[card]
+        lead_index = (state.curr_player_index - trick_size) % num_players
+        void_masks = [0] * num_players
+        for player, voids in enumerate(state.voids):
+            for suit in voids:
+                void_masks[player] |= SUIT_MASKS[SUITS.index(suit)]
+        return cls(state.round, hands, state.curr_player_index, played_mask, trick, trick_size, lead_index,
+                   state.trump_broken, list(state.bids), list(state.tricks_won), void_masks)
+
+    def to_game_state(self):
+        return GameState(
+            self.round,
+            [mask_to_cards(hand) for hand in self.hands],
+            self.curr_player_index,
+            set(mask_to_cards(self.played_mask)),
+            [None if card == NO_CARD else CARD_STRS[card] for card in self.trick],
+            self.trump_broken,
+            list(self.bids),
+            list(self.tricks_won),
+            [{SUITS[suit] for suit in range(len(SUITS)) if voids & SUIT_MASKS[suit]} for voids in self.void_masks]
+        )
+
+    @property
+    def player_hands(self):
+        return [mask_to_ids(hand) for hand in self.hands]
+
+    def getNumPlayers(self):
+        return len(self.hands)
+
+    def hand_size(self, player_index):
+        return self.hands[player_index].bit_count()
+
+    def legal_mask(self, distinct=False):
+        if distinct:
+            return distinct_mask(self)
+        return playable_mask(self)
+
+    def getLegalActions(self, distinct=False):
+        """
+        Playable card ids in ascending order. With distinct, only the lowest of each run of
+        equivalent cards (see cards.drop_equivalent), which leaves any search's result unchanged.
+        """
+        if distinct:
+            return mask_to_ids(distinct_mask(self))
+        return mask_to_ids(playable_mask(self))
+
+    def isTerminal(self):
+        return self.hands[self.curr_player_index] == 0 and self.trick_size == 0
+
+    def generateSuccessor(self, cardPlayed):
+        # _play on a copy, computed straight into the copy's fields so none is written twice
+        player = self.curr_player_index
+        hands = self.hands[:]
+        hands[player] ^= CARD_BIT[cardPlayed]
+        num_players = len(hands)
+        tricks_won = self.tricks_won[:]
+        trick = self.trick[:]
+        trick[player] = cardPlayed
+        if self.trick_size == num_players - 1:
+            lead_index = self.lead_index
+            next_player = trick_winner(trick, lead_index)
+            tricks_won[next_player] += 1
+            trick = [NO_CARD] * num_players
+            trick_size = 0
+        else:
+            lead_index = self.lead_index if self.trick_size else player
+            next_player = player + 1 if player + 1 < num_players else 0
+            trick_size = self.trick_size + 1
+
+        successor = CompactGameState.__new__(CompactGameState)
+        successor.round = self.round
+        successor.hands = hands
+        successor.curr_player_index = next_player
+        successor.played_mask = self.played_mask | CARD_BIT[cardPlayed]
+        successor.trick = trick
+        successor.trick_size = trick_size
+        successor.lead_index = lead_index
+        successor.trump_broken = self.trump_broken or CARD_SUIT[cardPlayed] == TRUMP_SUIT
+        successor.bids = self.bids
+        successor.tricks_won = tricks_won
+        successor.void_masks = self.void_masks
+        successor.zobrist = None
+        successor._history = None
+        successor._trick_history = None
+        successor._ply = 0
+        successor._tricks_done = 0
+        return successor
+
+    def enable_zobrist(self):
+        self.zobrist = zobrist_hash(self)
+        return self.zobrist
+
+    def do_move(self, card):
+        """
+        Plays card in place. Every do_move must be matched by an undo_move, in reverse order.
+        """
+        history = self._history
+        if history is None:
+            history = self._history = [0] * (5 * NUM_CARDS)
+            self._trick_history = [NO_CARD] * NUM_CARDS
+        base = 5 * self._ply
+        history[base] = card
+        history[base + 1] = self.lead_index
+        history[base + 2] = self.trump_broken
+        history[base + 4] = self.zobrist
+        if self.zobrist is None:
+            history[base + 3] = self._play(card)
+        else:
+            history[base + 3] = self._play_hashed(card)
+        self._ply += 1
+
+    def play(self, card):
+        """
+        Plays card in place for good, without recording anything for undo_move. Returns the
+        index of the trick's winner if card completed it, else -1.
+        """
+        return self._play(card)
+
+    def _play_hashed(self, card):
+        player = self.curr_player_index
+        num_players = len(self.hands)
+        h = self.zobrist ^ HAND_KEYS[player][card] ^ TURN_KEYS[player]
+        if not self.trump_broken and CARD_SUIT[card] == TRUMP_SUIT:
+            h ^= TRUMP_BROKEN_KEY
+        if self.trick_size == num_players - 1:
+            # This card completes the trick, so every card in it leaves the position
+            trick = self.trick
+            for i in range(num_players):
+                if trick[i] != NO_CARD:
+                    h ^= TRICK_KEYS[i][trick[i]]
+        else:
+            h ^= TRICK_KEYS[player][card]
+        winner_index = self._play(card)
+        if winner_index >= 0:
+            won = self.tricks_won[winner_index]
+            h ^= TRICKS_WON_KEYS[winner_index][won - 1] ^ TRICKS_WON_KEYS[winner_index][won]
+        self.zobrist = h ^ TURN_KEYS[self.curr_player_index]
+        return winner_index
+
+    def undo_move(self):
+        self._ply -= 1
+        history = self._history
+        base = 5 * self._ply
+        card = history[base]
+        winner_index = history[base + 3]
+        num_players = len(self.hands)
+        lead_index = history[base + 1]
+        if winner_index >= 0:
+            # The card that completed the trick was played by the seat before its leader
+            player = (lead_index - 1) % num_players
+        else:
+            player = (self.curr_player_index - 1) % num_players
+
+        trick = self.trick
+        if winner_index >= 0:
+            self.tricks_won[winner_index] -= 1
+            self._tricks_done -= 1
+            saved = self._trick_history
+            offset = self._tricks_done * num_players
+            for i in range(num_players):
+                trick[i] = saved[offset + i]
+            self.trick_size = num_players
+        trick[player] = NO_CARD
+        self.trick_size -= 1
+
+        bit = CARD_BIT[card]
+        self.hands[player] |= bit
+        self.played_mask ^= bit
+        self.lead_index = lead_index
+        self.trump_broken = history[base + 2]
+        self.zobrist = history[base + 4]
+        self.curr_player_index = player
+
+    def _play(self, card):
+        player = self.curr_player_index
+        bit = CARD_BIT[card]
+        self.hands[player] ^= bit
+        self.played_mask |= bit
+        if self.trick_size == 0:
+            self.lead_index = player
+        self.trick[player] = card
+        self.trick_size += 1
+        if CARD_SUIT[card] == TRUMP_SUIT:
+            self.trump_broken = True
+
+        num_players = len(self.hands)
+        winner_index = -1
+        if self.trick_size == num_players:
+            trick = self.trick
+            winner_index = trick_winner(trick, self.lead_index)
+            self.tricks_won[winner_index] += 1
+            saved = self._trick_history
+            if saved is not None:
+                offset = self._tricks_done * num_players
+                for i in range(num_players):
+                    saved[offset + i] = trick[i]
+                self._tricks_done += 1
+            for i in range(num_players):
+                trick[i] = NO_CARD
+            self.trick_size = 0
+            # The winner of a trick leads the next one, as in SpadesGame.play_round
+            self.curr_player_index = winner_index
+        else:
+            self.curr_player_index = (player + 1) % num_players
+        return winner_index
+
+    def score_trick(self, trick, starting_player_index):
+        return trick_winner(trick, starting_player_index)
+
+    def clone(self):
+        return CompactGameState(
+            self.round,
+            self.hands[:],
+            self.curr_player_index,
+            self.played_mask,
+            self.trick[:],
+            self.trick_size,
+            self.lead_index,
+            self.trump_broken,
+            self.bids[:],
+            self.tricks_won[:],
+            self.void_masks[:]
+        )
+
+
+def to_compact_state(state):
+    """
+    Returns a CompactGameState the caller is free to mutate.
+    """
+    if isinstance(state, CompactGameState):
+        return state.clone()
+    return CompactGameState.from_game_state(state)
+
+
+def playable_mask(gameState: CompactGameState):
+    hand = gameState.hands[gameState.curr_player_index]
+    if gameState.trick_size == 0:
+        if not gameState.trump_broken and hand & ~TRUMP_MASK:
+            return hand & ~TRUMP_MASK
+        return hand
+    lead_suit = CARD_SUIT[gameState.trick[gameState.lead_index]]
+    return hand & SUIT_MASKS[lead_suit] or hand
+
+
+def distinct_mask(gameState: CompactGameState):
+    out = gameState.played_mask
+    # Cards in the current trick are still in play
+    for card in gameState.trick:
+        if card != NO_CARD:
+            out &= ~CARD_BIT[card]
+    return drop_equivalent(playable_mask(gameState), out)
+
+
+def playable_cards(gameState: CompactGameState):
+    return mask_to_ids(playable_mask(gameState))
+
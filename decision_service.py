@@ -0,0 +1,432 @@
+import asyncio
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import pickle
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from ai import ExpectimaxAi, RandomAi
+from cards import NO_CARD, NUM_CARDS, mask_to_cards
+from compact_state import CompactGameState
+from game import BID, PLAY
+from player import Player, PlayerType
+
+BATCH_SIZE = 32  # most batchable requests handed to a worker at once
+PENDING_PER_WORKER = 8  # back-pressure: requests in flight per worker before submit waits
+DEADLINE_MARGIN = 0.02  # seconds kept back from a search for getting its answer home
+MIN_THINK = 0.01  # shortest search a request close to its deadline still gets
+WARM_TIME_LIMIT = 0.01
+WATCH_INTERVAL = 0.5  # seconds between checks that every worker process is still alive
+
+
+class ServiceBusy(Exception):
+    """
+    Raised by DecisionService.submit when no request slot frees up in time.
+    """
+    pass
+
+
+class WorkerLost(Exception):
+    """
+    Set on the futures of the requests a worker process was answering when it died.
+    """
+    pass
+
+
+def configured_agent(player_type, mc_bidding=False, endgame=None, num_players=4):
+    """
+    A fresh agent for player_type with the shared bidder and endgame table of this process, for
+    serving many tables and seats at once. Such an agent is kept stateless: it does not reuse
+    its MCTS tree between decisions or get the game's lifecycle hooks, and its only state is
+    what caches results by position (the bidder's hand shapes, the endgame and transposition
+    tables), which holds for any game.
+    """
+    agent = Player("", player_type, 0).getAI()
+    if hasattr(agent, "reuse_tree"):
+        agent.reuse_tree = False
+    if mc_bidding:
+        from bidder import shared_bidder
+        agent.bidder = shared_bidder()
+    if endgame is not None:
+        from endgame import shared_table
+        agent.endgame = shared_table(endgame, num_players)
+    return agent
+
+
+def _warm_position(num_players, round_size=5):
+    deck = random.sample(range(NUM_CARDS), num_players * round_size)
+    hands = [sum(1 << card for card in deck[seat * round_size:(seat + 1) * round_size]) for seat in range(num_players)]
+    return CompactGameState(round_size, hands, 0, 0, [NO_CARD] * num_players, 0, 0, False, [1] * num_players, [0] * num_players)
+
+
+class _Worker:
+    """
+    State of one worker process: a stateless agent per player type (see configured_agent), each
+    built and run once on a small position at start, so the first real request pays for no
+    imports or cold caches.
+    """
+    def __init__(self, index, warm_types, mc_bidding, endgame, num_players):
+        self.index = index
+        self.agents = {}
+        self.time_limits = {}
+        self.mc_bidding = mc_bidding
+        self.endgame = endgame
+        self.num_players = num_players
+        self.fallback = RandomAi()
+        for player_type in warm_types:
+            agent = self.agent(player_type)
+            if getattr(agent, "time_limit", None) is not None:
+                agent.time_limit = WARM_TIME_LIMIT
+            position = _warm_position(num_players)
+            agent.bid(mask_to_cards(position.hands[0]), 0, 0, num_players, position.round)
+            agent.play(position)
+            if player_type in self.time_limits:
+                agent.time_limit = self.time_limits[player_type]
+
+    def agent(self, player_type):
+        agent = self.agents.get(player_type)
+        if agent is None:
+            agent = self.agents[player_type] = configured_agent(player_type, self.mc_bidding, self.endgame, self.num_players)
+            if getattr(agent, "time_limit", None) is not None:
+                self.time_limits[player_type] = agent.time_limit
+        return agent
+
+    def answer(self, request):
+        """
+        Answers one request, within its deadline: searches with a time limit are cut to the time
+        left, and a request that is already late gets a random legal move instead.
+        """
+        request_id, player_type, kind, args, deadline = request
+        start = time.time()
+        if deadline is not None and start >= deadline:
+            fallback = self.fallback.bid(*args) if kind == BID else self.fallback.play(*args)
+            return request_id, fallback, {"worker": self.index, "seconds": 0.0, "expired": True, "batch": 1}
+        agent = self.agent(player_type)
+        if player_type in self.time_limits:
+            limit = self.time_limits[player_type]
+            if deadline is not None:
+                limit = min(limit, max(MIN_THINK, deadline - start - DEADLINE_MARGIN))
+            agent.time_limit = limit
+        answer = agent.bid(*args) if kind == BID else agent.play(*args)
+        return request_id, answer, {"worker": self.index, "seconds": time.time() - start, "expired": False, "batch": 1}
+
+    def safe_answer(self, request):
+        """
+        answer(), with an exception raised on the way sent back as the answer, stats["error"] set,
+        so one bad request fails its own future and leaves the worker serving.
+        """
+        start = time.time()
+        try:
+            return self.answer(request)
+        except Exception as error:
+            return request[0], _portable(error), {"worker": self.index, "seconds": time.time() - start,
+                                                  "expired": False, "batch": 1, "error": True}
+
+    def answer_batch(self, requests):
+        """
+        Answers a batch of requests. Batchable ones that are not yet late are coalesced into one
+        ExpectimaxAi.play_many call; everything else is answered in order. If the coalesced call
+        fails, its requests are answered one at a time, so only the bad one gets the error.
+        """
+        now = time.time()
+        coalesce = [request for request in requests if batchable(request) and (request[4] is None or request[4] > now)]
+        replies = []
+        if len(coalesce) > 1:
+            agent = self.agent(PlayerType.EXPECTIMAX)
+            if isinstance(agent, ExpectimaxAi) and agent.vectorized:
+                try:
+                    cards = agent.play_many([request[3][0] for request in coalesce])
+                except Exception:
+                    cards = []
+                seconds = time.time() - now
+                replies = [(request[0], card, {"worker": self.index, "seconds": seconds, "expired": False,
+                                               "batch": len(coalesce)})
+                           for request, card in zip(coalesce, cards)]
+        done = {reply[0] for reply in replies}
+        replies += [self.safe_answer(request) for request in requests if request[0] not in done]
+        return replies
+
+
+def _portable(error):
+    # The exception goes back through a multiprocessing queue, which cannot carry one that does
+    # not pickle
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def batchable(request):
+    # Expectimax plays share their playout batches; see _Worker.answer_batch
+    return request[2] == PLAY and request[1] == PlayerType.EXPECTIMAX
+
+
+def _serve(index, generation, core, tasks, results, warm_types, mc_bidding, endgame, num_players):
+    if core is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {core})
+    worker = _Worker(index, warm_types, mc_bidding, endgame, num_players)
+    results.put((index, generation, []))
+    while True:
+        batch = tasks.get()
+        if batch is None:
+            break
+        results.put((index, generation, worker.answer_batch(batch)))
+
+
+class DecisionService:
+    """
+    A fixed pool of pre-warmed worker processes, one pinned to each core it is given, that
+    answers AiAgent.bid and AiAgent.play requests from any number of tables or games.
+
+    Requests wait in the service, not in the workers: whenever a worker is idle it is handed
+    the request with the earliest deadline (requests without one come after, oldest first), or,
+    when that request is batchable, up to batch_size batchable ones to coalesce. At most
+    max_pending requests are in flight; submit waits for a slot, so callers slow down instead
+    of the machine oversubscribing. A deadline (time.time() seconds) cuts a search short or,
+    once passed, gets the request a random legal move. A request whose answer raises gets that
+    exception on its future; one whose worker process dies gets WorkerLost, and the worker is
+    replaced.
+    """
+    def __init__(self, workers=None, cores=None, batch_size=BATCH_SIZE, max_pending=None,
+                 warm_types=(PlayerType.MCTS, PlayerType.EXPECTIMAX), mc_bidding=False, endgame=None, num_players=4):
+        if cores is None:
+            cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else [None] * (os.cpu_count() or 1)
+        workers = workers or len(cores)
+        self.context = multiprocessing.get_context("spawn")
+        self.cores = cores
+        self.worker_args = (tuple(warm_types), mc_bidding, endgame, num_players)
+        self.batch_size = batch_size
+        self.fallback = RandomAi()
+        self.results = self.context.Queue()
+        self.slots = threading.BoundedSemaphore(max_pending or workers * PENDING_PER_WORKER)
+        self.pending = {}
+        self.waiters = deque()  # (event loop, asyncio future) of coroutines waiting for a slot
+        self.queued = []  # heap of (deadline or inf, request id, request)
+        self.queued_batchable = []
+        self.idle = []
+        self.assigned = [[] for _ in range(workers)]  # ids of the requests each worker is answering
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.closing = False
+        self.submitted = self.completed = self.expired = self.batched = self.failed = self.restarts = 0
+        self.task_queues = [None] * workers
+        self.processes = [None] * workers
+        self.generations = [0] * workers
+        for index in range(workers):
+            self._start_worker(index)
+        # Hand out work only once every worker is warm
+        ready = 0
+        while ready < workers:
+            try:
+                index, _, _ = self.results.get(timeout=WATCH_INTERVAL)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    for process in self.processes:
+                        process.terminate()
+                    raise RuntimeError("a DecisionService worker died while warming up")
+                continue
+            self.idle.append(index)
+            ready += 1
+        self.collector = threading.Thread(target=self._collect, daemon=True)
+        self.collector.start()
+
+    def _start_worker(self, index):
+        # A fresh task queue too, so a replacement never picks up a batch meant for the dead worker
+        self.generations[index] += 1
+        self.task_queues[index] = self.context.Queue()
+        self.processes[index] = self.context.Process(
+            target=_serve, args=(index, self.generations[index], self.cores[index % len(self.cores)],
+                                 self.task_queues[index], self.results) + self.worker_args, daemon=True)
+        self.processes[index].start()
+
+    def submit(self, player_type, kind, args, deadline=None, timeout=None):
+        """
+        Queues a decision and returns a concurrent.futures.Future of (answer, stats). kind is
+        game.BID or game.PLAY and args the arguments of that AiAgent method. Waits up to timeout
+        seconds (forever when None) for a free slot and raises ServiceBusy if none frees up; a
+        request whose deadline passes first gets a random legal move straight away.
+        """
+        wait = self._slot_wait(deadline, timeout)
+        if not self.slots.acquire(timeout=wait):
+            if deadline is not None and time.time() >= deadline:
+                return self._expired(kind, args)
+            raise ServiceBusy()
+        return self._enqueue(player_type, kind, args, deadline)
+
+    def _enqueue(self, player_type, kind, args, deadline):
+        future = Future()
+        request_id = next(self.ids)
+        request = (request_id, player_type, kind, args, deadline)
+        with self.lock:
+            self.pending[request_id] = (future, time.time())
+            self.submitted += 1
+            heapq.heappush(self.queued_batchable if batchable(request) else self.queued,
+                           (math.inf if deadline is None else deadline, request_id, request))
+            self._dispatch()
+        return future
+
+    async def request(self, player_type, kind, args, deadline=None):
+        """
+        submit() for coroutines: waits for a slot without blocking the event loop. Waiting
+        coroutines are handed freed slots first, in the order they started waiting.
+        """
+        if not self.slots.acquire(blocking=False):
+            loop = asyncio.get_running_loop()
+            granted = loop.create_future()
+            with self.lock:
+                self.waiters.append((loop, granted))
+            try:
+                await asyncio.wait_for(granted, self._slot_wait(deadline, None))
+            except asyncio.TimeoutError:
+                # A slot granted just as the wait timed out is still ours
+                if not granted.done() or granted.cancelled():
+                    return self._expired(kind, args).result()
+        return await asyncio.wrap_future(self._enqueue(player_type, kind, args, deadline))
+
+    def _release(self):
+        with self.lock:
+            while self.waiters:
+                loop, granted = self.waiters.popleft()
+                if not granted.done():
+                    loop.call_soon_threadsafe(self._grant, granted)
+                    return
+        self.slots.release()
+
+    def _grant(self, granted):
+        if granted.done():
+            # The waiter gave up before the slot reached it; pass the slot on
+            self._release()
+        else:
+            granted.set_result(None)
+
+    @staticmethod
+    def _slot_wait(deadline, timeout):
+        if deadline is None:
+            return timeout
+        left = max(0.0, deadline - time.time())
+        return left if timeout is None else min(left, timeout)
+
+    def _expired(self, kind, args):
+        future = Future()
+        answer = self.fallback.bid(*args) if kind == BID else self.fallback.play(*args)
+        with self.lock:
+            self.submitted += 1
+            self.completed += 1
+            self.expired += 1
+        future.set_result((answer, {"worker": None, "seconds": 0.0, "expired": True, "batch": 1, "latency": 0.0}))
+        return future
+
+    def decide(self, player_type, kind, args, deadline=None):
+        return self.submit(player_type, kind, args, deadline).result()[0]
+
+    def _dispatch(self):
+        # Called with self.lock held
+        while self.idle and (self.queued or self.queued_batchable):
+            if self.queued_batchable and (not self.queued or self.queued_batchable[0] < self.queued[0]):
+                count = min(self.batch_size, len(self.queued_batchable))
+                batch = [heapq.heappop(self.queued_batchable)[2] for _ in range(count)]
+            else:
+                batch = [heapq.heappop(self.queued)[2]]
+            index = self.idle.pop()
+            self.assigned[index] = [request[0] for request in batch]
+            self.task_queues[index].put(batch)
+
+    def _collect(self):
+        # Workers are checked on a timer of their own: replies from the live ones must not keep
+        # a dead one from being noticed
+        next_check = time.monotonic() + WATCH_INTERVAL
+        while True:
+            try:
+                message = self.results.get(timeout=max(0.0, next_check - time.monotonic()))
+            except queue.Empty:
+                message = ()
+            if time.monotonic() >= next_check:
+                self._replace_dead_workers()
+                next_check = time.monotonic() + WATCH_INTERVAL
+            if message is None:
+                break
+            if not message:
+                continue
+            index, generation, replies = message
+            resolved = []
+            with self.lock:
+                # Replies of a worker replaced since were already failed
+                if generation == self.generations[index]:
+                    self.assigned[index] = []
+                    self.idle.append(index)
+                    self._dispatch()
+                for request_id, answer, stats in replies:
+                    entry = self.pending.pop(request_id, None)
+                    if entry is None:
+                        continue
+                    future, submitted = entry
+                    self.completed += 1
+                    self.expired += stats["expired"]
+                    self.batched += stats["batch"] > 1
+                    self.failed += stats.get("error", False)
+                    stats["latency"] = time.time() - submitted
+                    resolved.append((future, answer, stats))
+            for future, answer, stats in resolved:
+                self._release()
+                if stats.get("error"):
+                    future.set_exception(answer)
+                else:
+                    future.set_result((answer, stats))
+
+    def _replace_dead_workers(self):
+        """
+        Fails the requests of every worker process that died and starts a replacement for it,
+        which joins the idle workers once it is warm.
+        """
+        lost = []
+        with self.lock:
+            if self.closing:
+                return
+            for index, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                for request_id in self.assigned[index]:
+                    entry = self.pending.pop(request_id, None)
+                    if entry is not None:
+                        lost.append((entry[0], process.exitcode))
+                        self.completed += 1
+                        self.failed += 1
+                self.assigned[index] = []
+                if index in self.idle:
+                    self.idle.remove(index)
+                self.restarts += 1
+                self._start_worker(index)
+        for future, exitcode in lost:
+            self._release()
+            future.set_exception(WorkerLost(f"worker process exited with code {exitcode}"))
+
+    def metrics(self):
+        with self.lock:
+            return {"submitted": self.submitted, "completed": self.completed, "in_flight": len(self.pending),
+                    "queued": len(self.queued) + len(self.queued_batchable), "expired": self.expired,
+                    "batched": self.batched, "failed": self.failed, "restarts": self.restarts}
+
+    def close(self):
+        with self.lock:
+            self.closing = True
+        for tasks in self.task_queues:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+        self.results.put(None)
+        self.collector.join()
+        # Whatever is left was queued behind the shutdown or held by a worker that died
+        with self.lock:
+            futures = [future for future, _ in self.pending.values()]
+            self.pending.clear()
+            self.queued.clear()
+            self.queued_batchable.clear()
+        for future in futures:
+            future.set_exception(RuntimeError("DecisionService closed"))
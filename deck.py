@@ -1,14 +1,15 @@
 import random
+from cards import CARD_STRS, RANKS, SUITS
 
 class Deck:
-    SUITS = ['S', 'H', 'D', 'C']
-    RANKS = [str(n) for n in range(2, 11)] + ['J', 'Q', 'K', 'A']
+    SUITS = SUITS
+    RANKS = RANKS
 
     def __init__(self):
         self.reset()
 
     def reset(self):
-        self.cards = [f"{rank}{suit}" for suit in self.SUITS for rank in self.RANKS]
+        self.cards = CARD_STRS[:]
         self.shuffle()
 
     def shuffle(self):
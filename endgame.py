@@ -0,0 +1,321 @@
+import os
+import struct
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+import numpy as np
+from cards import CARD_BIT, CARD_SUIT, NO_CARD, NUM_CARDS, NUM_RANKS, SUIT_MASKS, TRUMP_SUIT, mask_to_ids
+from compact_state import CompactGameState
+
+MADE_BID = 10  # as in ai.MADE_BID
+ENDGAME_TRICKS = 4  # rounds 1 to 4 of SpadesGame.play_game
+TABLE_SIZE_BITS = 20
+FRONT_SIZE = 1 << 16
+PROBES = 4
+NON_TRUMP_SUITS = [suit for suit in range(len(SUIT_MASKS)) if suit != TRUMP_SUIT]
+
+
+def table_dtype(num_players):
+    """
+    One slot of the on-disk table: a 64-bit fingerprint of the canonical position (0 marks an
+    empty slot) and the tricks each seat, counted from the player to move, wins from there on.
+    """
+    return np.dtype([("key", np.uint64), ("tricks", np.int8, (num_players,))])
+
+
+def tricks_left(state):
+    cards = state.trick_size
+    for hand in state.hands:
+        cards += hand.bit_count()
+    return cards // len(state.hands)
+
+
+def canonical_key(state):
+    """
+    Fingerprint of everything that decides the rest of the round up to symmetry: seats are
+    counted from the player to move, cards already out of play are dropped and the rest ranked
+    within their suit, the non-trump suits are put in a fixed order, and each seat's bid is
+    reduced to the tricks it still needs, clamped to one past what is reachable (beyond that
+    every outcome only shifts its utility by a constant, so the best play is the same).
+    """
+    n = len(state.hands)
+    me = state.curr_player_index
+    owners = {}
+    for r in range(n):
+        p = (me + r) % n
+        for card in mask_to_ids(state.hands[p]):
+            owners[card] = r
+        if state.trick[p] != NO_CARD:
+            owners[state.trick[p]] = n + r
+    patterns = [[0] * n for _ in SUIT_MASKS]
+    trick_ranks = [[-1] * n for _ in SUIT_MASKS]
+    counts = [0] * len(SUIT_MASKS)
+    live_trumps = False
+    for card in sorted(owners):
+        suit = CARD_SUIT[card]
+        rank = counts[suit]
+        counts[suit] += 1
+        owner = owners[card]
+        if owner < n:
+            patterns[suit][owner] |= 1 << rank
+        else:
+            trick_ranks[suit][owner - n] = rank
+        live_trumps = live_trumps or suit == TRUMP_SUIT
+
+    order = sorted(NON_TRUMP_SUITS, key=lambda suit: (patterns[suit], trick_ranks[suit]), reverse=True)
+    hands = [0] * n
+    trick = [NO_CARD] * n
+    for canonical_suit, suit in zip(NON_TRUMP_SUITS, order):
+        shift = canonical_suit * NUM_RANKS
+        for r in range(n):
+            hands[r] |= patterns[suit][r] << shift
+            if trick_ranks[suit][r] >= 0:
+                trick[r] = shift + trick_ranks[suit][r]
+    shift = TRUMP_SUIT * NUM_RANKS
+    for r in range(n):
+        hands[r] |= patterns[TRUMP_SUIT][r] << shift
+        if trick_ranks[TRUMP_SUIT][r] >= 0:
+            trick[r] = shift + trick_ranks[TRUMP_SUIT][r]
+
+    left = len(owners) // n
+    needs = [max(-1, min(state.bids[p] - state.tricks_won[p], left + 1)) for p in ((me + r) % n for r in range(n))]
+    lead = (state.lead_index - me) % n if state.trick_size else -1
+    # With no trumps left the flag cannot change a legal move
+    trump_broken = state.trump_broken or not live_trumps
+    packed = struct.pack(f"<{n}Q{2 * n + 2}b", *hands, *trick, *needs, lead, trump_broken)
+    return int.from_bytes(blake2b(packed, digest_size=8).digest(), "little") or 1
+
+
+def position_key(state):
+    """
+    Exact (non-canonical) key of a position, for the in-memory front.
+    """
+    lead = state.lead_index if state.trick_size else -1
+    return (*state.hands, *state.trick, state.curr_player_index, lead, state.trump_broken, *state.bids, *state.tricks_won)
+
+
+class EndgameTable:
+    """
+    Exact MaxN results for positions with at most max_tricks tricks left, shared by every
+    position that is the same up to canonical_key's symmetries. Results live in an open-
+    addressing hash table in a memory-mapped .npy file, so they persist across games and
+    processes, behind an LRU dict of recently used positions keyed exactly, so a repeated
+    lookup skips canonicalization. Positions missing from the table are solved on demand, and
+    every trick boundary of the search is stored on the way; fill() does the same offline.
+
+    Values are the tricks each seat wins from a position on, which together with the bids give
+    the utilities; ties between equally good moves may be broken differently than a direct
+    search of the same position would. Several processes may share a table file; a slot
+    written by two of them at once can lose one of the entries.
+    """
+    def __init__(self, path, num_players=4, max_tricks=ENDGAME_TRICKS, size_bits=TABLE_SIZE_BITS,
+                 front_size=FRONT_SIZE, read_only=False):
+        self.path = path
+        if os.path.exists(path):
+            self.table = np.load(path, mmap_mode="r" if read_only else "r+")
+        else:
+            tmp = path + ".tmp"
+            np.lib.format.open_memmap(tmp, mode="w+", dtype=table_dtype(num_players), shape=(1 << size_bits,)).flush()
+            os.replace(tmp, path)
+            self.table = np.load(path, mmap_mode="r" if read_only else "r+")
+        self.num_players = self.table.dtype["tricks"].shape[0]
+        self.keys = self.table["key"]
+        self.values = self.table["tricks"]
+        self.mask = len(self.table) - 1
+        self.max_tricks = max_tricks
+        self.read_only = read_only
+        self.front = OrderedDict()
+        self.front_size = front_size
+        self.front_hits = 0
+        self.table_hits = 0
+        self.misses = 0
+        self.nodes = 0
+
+    def covers(self, state):
+        return len(state.hands) == self.num_players and tricks_left(state) <= self.max_tricks
+
+    def lookup(self, state):
+        """
+        Tricks every seat wins from state on, by absolute seat, or None if state is not stored.
+        """
+        raw = position_key(state)
+        future = self.front.get(raw)
+        if future is not None:
+            self.front_hits += 1
+            self.front.move_to_end(raw)
+            return future
+        key = canonical_key(state)
+        index = key & self.mask
+        for _ in range(PROBES):
+            stored = int(self.keys[index])
+            if stored == key:
+                self.table_hits += 1
+                n = self.num_players
+                relative = self.values[index]
+                me = state.curr_player_index
+                future = tuple(int(relative[(p - me) % n]) for p in range(n))
+                self._remember(raw, future)
+                return future
+            if stored == 0:
+                break
+            index = (index + 1) & self.mask
+        self.misses += 1
+        return None
+
+    def store(self, state, future):
+        self._remember(position_key(state), future)
+        if self.read_only:
+            return
+        key = canonical_key(state)
+        index = key & self.mask
+        # Take the first free or matching slot of the probe window, else evict its first slot
+        target = index
+        for _ in range(PROBES):
+            stored = int(self.keys[index])
+            if stored == 0 or stored == key:
+                target = index
+                break
+            index = (index + 1) & self.mask
+        n = self.num_players
+        me = state.curr_player_index
+        # The value goes in before the key, so a reader never matches a half-written slot
+        self.keys[target] = 0
+        self.values[target] = [future[(me + r) % n] for r in range(n)]
+        self.keys[target] = key
+
+    def _remember(self, raw, future):
+        self.front[raw] = future
+        if len(self.front) > self.front_size:
+            self.front.popitem(last=False)
+
+    def tricks(self, state):
+        """
+        Tricks every seat wins from state on under MaxN play, solving and storing it if needed.
+        state must be covered; it is restored before returning.
+        """
+        future = self.lookup(state)
+        if future is None:
+            future, _ = self._search(state)
+            self.store(state, future)
+        return future
+
+    def utilities(self, state):
+        future = self.tricks(state)
+        return tuple(MADE_BID if won + future[i] == state.bids[i] else -abs(won + future[i] - state.bids[i])
+                     for i, won in enumerate(state.tricks_won))
+
+    def best_move(self, state):
+        """
+        The card id MaxN plays in state, out of the stored results of its successors.
+        """
+        _, action = self._search(state)
+        return action
+
+    def _solve(self, state):
+        if state.hands[state.curr_player_index] == 0:
+            return (0,) * len(state.hands)
+        if state.trick_size:
+            future, _ = self._search(state)
+            return future
+        future = self.lookup(state)
+        if future is None:
+            future, _ = self._search(state)
+            self.store(state, future)
+        return future
+
+    def _search(self, state):
+        self.nodes += 1
+        player = state.curr_player_index
+        bid = state.bids[player]
+        won = state.tricks_won[:]
+        best, best_utility, best_action = None, None, None
+        # Equivalent cards lead to equivalent positions, so one of each run is enough
+        for action in state.getLegalActions(distinct=True):
+            state.do_move(action)
+            future = self._solve(state)
+            after = state.tricks_won
+            total = tuple(after[i] - won[i] + future[i] for i in range(len(won)))
+            state.undo_move()
+            final = won[player] + total[player]
+            utility = MADE_BID if final == bid else -abs(final - bid)
+            if best is None or utility > best_utility:
+                best, best_utility, best_action = total, utility, action
+        return best, best_action
+
+    def fill(self, num_positions, num_tricks=None, rng=None):
+        """
+        Solves num_positions random deals of num_tricks cards a seat (max_tricks by default)
+        with random bids, a random leader and trump broken or not, storing every trick boundary
+        reached. Returns the number of positions searched.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        num_tricks = self.max_tricks if num_tricks is None else num_tricks
+        n = self.num_players
+        nodes = self.nodes
+        for _ in range(num_positions):
+            deck = rng.permutation(NUM_CARDS)
+            hands = [sum(CARD_BIT[int(card)] for card in deck[seat * num_tricks:(seat + 1) * num_tricks]) for seat in range(n)]
+            leader = int(rng.integers(n))
+            state = CompactGameState(num_tricks, hands, leader, 0, [NO_CARD] * n, 0, leader,
+                                     bool(rng.integers(2)), [int(bid) for bid in rng.integers(num_tricks + 1, size=n)], [0] * n)
+            self.tricks(state)
+        return self.nodes - nodes
+
+    def entries(self):
+        return int(np.count_nonzero(self.keys))
+
+    def flush(self):
+        if not self.read_only:
+            self.table.flush()
+
+
+_shared_tables = {}
+
+def shared_table(path, num_players=4):
+    """
+    The process-wide EndgameTable for path, so every player in a process shares one front.
+    """
+    table = _shared_tables.get(path)
+    if table is None:
+        table = _shared_tables[path] = EndgameTable(path, num_players)
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fill an endgame table offline and time lookups in it.")
+    parser.add_argument("path", help="Table file (.npy), created if missing.")
+    parser.add_argument("-g", "--positions", type=int, default=1000, help="Random deals to solve.")
+    parser.add_argument("-t", "--tricks", type=int, default=ENDGAME_TRICKS, help="Cards per seat in each deal.")
+    parser.add_argument("-p", "--players", type=int, default=4, help="Number of players.")
+    parser.add_argument("--size-bits", type=int, default=TABLE_SIZE_BITS, help="log2 of the number of slots for a new table.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the deals.")
+    args = parser.parse_args()
+
+    table = EndgameTable(args.path, args.players, max(args.tricks, ENDGAME_TRICKS), args.size_bits)
+    start = time.perf_counter()
+    nodes = table.fill(args.positions, args.tricks, np.random.default_rng(args.seed))
+    table.flush()
+    elapsed = time.perf_counter() - start
+    print(f"{args.positions} deals solved in {elapsed:.2f}s ({nodes} nodes searched), "
+          f"{table.entries()} of {len(table.table)} slots used")
+
+    # Time cold (canonicalize and probe the file) and warm (in-memory front) lookups
+    rng = np.random.default_rng(args.seed)
+    states = []
+    for _ in range(min(args.positions, 1000)):
+        deck = rng.permutation(NUM_CARDS)
+        n = table.num_players
+        hands = [sum(CARD_BIT[int(card)] for card in deck[seat * args.tricks:(seat + 1) * args.tricks]) for seat in range(n)]
+        states.append(CompactGameState(args.tricks, hands, 0, 0, [NO_CARD] * n, 0, 0, False, [1] * n, [0] * n))
+    for state in states:
+        table.tricks(state)
+    for label in ("cold", "warm"):
+        if label == "cold":
+            table.front.clear()
+        start = time.perf_counter()
+        for state in states:
+            table.tricks(state)
+        elapsed = time.perf_counter() - start
+        print(f"{label} lookups: {elapsed / len(states) * 1e6:.1f} us each")
@@ -0,0 +1,113 @@
+import random
+import time
+from game import SpadesGame
+
+try:
+    import numpy as np
+    from batch_rollout import CARD_BITS, SUIT_MASK_ARRAY, batch_play_random, popcount
+    from cards import HIGH_CARD_MASK, MID_CARD_MASK, NUM_CARDS, TRUMP_MASK
+except ImportError:  # NumPy is optional; only batch_random_games needs it
+    np = None
+
+MADE_BID_BONUS = 10
+
+
+def run_game(num_random=4, num_rounds=10, observers=None, seed=None, num_agents_min_max=0, num_agents_expectimax=0,
+             num_agents_mcts=0, num_agents_ismcts=0, skip_rounds_below=0):
+    """
+    Plays one game with no console output and returns SpadesGame.result(). observers receive
+    every game event (see observers.GameObserver).
+    """
+    if seed is not None:
+        random.seed(seed)
+    game = SpadesGame(0, num_random, num_agents_min_max, num_agents_expectimax, num_agents_mcts, num_rounds,
+                      skip_rounds_below, True, num_agents_ismcts, observers=observers)
+    game.play_game()
+    return game.result()
+
+
+def batch_estimate_tricks(hands):
+    """
+    ai.estimate_tricks over an array of uint64 hand masks.
+    """
+    total = popcount(hands)
+    high = popcount(hands & np.uint64(HIGH_CARD_MASK))
+    trumps = popcount(hands & np.uint64(TRUMP_MASK))
+    strong_trumps = popcount(hands & np.uint64(TRUMP_MASK & HIGH_CARD_MASK))
+    low_suit_mid = 0
+    for suit_mask in SUIT_MASK_ARRAY:
+        short = popcount(hands & suit_mask) < 0.2 * total
+        low_suit_mid = low_suit_mid + np.where(short, popcount(hands & suit_mask & np.uint64(MID_CARD_MASK)), 0)
+    score = strong_trumps + 0.6 * (trumps - strong_trumps) + 0.4 * (high - strong_trumps) + 0.5 * low_suit_mid
+    return np.where(total > 0, score, 0.0)
+
+
+def batch_random_games(num_games, num_players=4, num_rounds=10, skip_rounds_below=0, seed=None):
+    """
+    Plays num_games games between random agents (AiAgent.bid bidding, uniformly random legal
+    cards) in lockstep with NumPy, following SpadesGame's rules: rounds of num_rounds cards
+    down to skip_rounds_below + 1, the dealer moving one seat per round and the winner of a
+    round's last trick leading the next round. Returns a dict of arrays: "bids" and "tricks" of
+    shape (games, rounds, players) and the final "scores" (games, players).
+    """
+    rng = np.random.default_rng(seed)
+    round_sizes = list(range(num_rounds, skip_rounds_below, -1))
+    bids = np.zeros((num_games, len(round_sizes), num_players), dtype=np.int16)
+    tricks = np.zeros((num_games, len(round_sizes), num_players), dtype=np.int16)
+    scores = np.zeros((num_games, num_players), dtype=np.int32)
+    starting_player = np.full(num_games, 1)
+    dealer = 0
+
+    for r, round_size in enumerate(round_sizes):
+        # Deal: a random permutation of the deck per game, round_size cards per seat
+        order = rng.random((num_games, NUM_CARDS)).argsort(axis=1)
+        hands = np.stack([CARD_BITS[order[:, seat * round_size:(seat + 1) * round_size]].sum(axis=1)
+                          for seat in range(num_players)], axis=1)
+
+        round_bids = np.clip(np.round(batch_estimate_tricks(hands)), 0, round_size).astype(np.int16)
+        # The dealer bids last and may not make the bids sum to the number of tricks; the
+        # closest allowed bid is one lower, or one higher when that would be negative
+        others = round_bids.sum(axis=1) - round_bids[:, dealer]
+        forbidden = round_size - others
+        clash = round_bids[:, dealer] == forbidden
+        round_bids[:, dealer] = np.where(clash & (forbidden > 0), forbidden - 1,
+                                         np.where(clash, forbidden + 1, round_bids[:, dealer]))
+
+        trick = np.full((num_games, num_players), -1, dtype=np.int16)
+        won = np.zeros((num_games, num_players), dtype=np.int16)
+        trump_broken = np.zeros(num_games, dtype=bool)
+        starting_player = batch_play_random(hands, trick, won, trump_broken, 0, starting_player.copy(),
+                                            starting_player, num_players * round_size, rng)
+
+        bids[:, r] = round_bids
+        tricks[:, r] = won
+        scores += np.where(won == round_bids, round_bids + MADE_BID_BONUS, -round_bids)
+        dealer = (dealer + 1) % num_players
+
+    return {"bids": bids, "tricks": tricks, "scores": scores}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Play random-agent Spades games headlessly.")
+    parser.add_argument("-g", "--games", type=int, default=10000, help="Number of games.")
+    parser.add_argument("-n", "--rounds", type=int, default=10, help="Number of rounds (1-13).")
+    parser.add_argument("-b", "--batch", type=int, default=10000, help="Games played in lockstep at a time.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the games.")
+    args = parser.parse_args()
+
+    seed_rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    totals = np.zeros(4)
+    wins = np.zeros(4)
+    played = 0
+    while played < args.games:
+        batch = min(args.batch, args.games - played)
+        scores = batch_random_games(batch, num_rounds=args.rounds, seed=seed_rng.integers(1 << 63))["scores"]
+        totals += scores.sum(axis=0)
+        wins += np.bincount(scores.argmax(axis=1), minlength=4)
+        played += batch
+    elapsed = time.perf_counter() - start
+    print(f"{played} games in {elapsed:.2f}s ({played / elapsed:.0f} games/s)")
+    for seat in range(4):
+        print(f"Seat {seat}: Average Score: {totals[seat] / played:.2f}, Wins: {wins[seat] / played:.1%}")
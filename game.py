@@ -1,14 +1,21 @@
 from player import Player, PlayerType
 from deck import Deck
-from util import get_valid_int_input, card_to_rank, card_to_suit
-from states import create_game_state
+from util import get_valid_int_input
+from cards import CARD_IDS, CARD_STR_SUIT, NO_CARD, SUITS, SUIT_MASKS, cards_to_mask, trick_winner
+from compact_state import CompactGameState
+from profiling import DecisionProfile
+from observers import TextObserver
 import argparse
 import random
 
+# Kinds of decision game_turns asks for
+BID = "bid"
+PLAY = "play"
+
 class SpadesGame:
-    def __init__(self, num_manual, num_random, num_agents_min_max, num_agents_expectimax, num_agents_mcts, num_rounds, skip_rounds_below=0, text_disable=False):
+    def __init__(self, num_manual, num_random, num_agents_min_max, num_agents_expectimax, num_agents_mcts, num_rounds, skip_rounds_below=0, text_disable=False, num_agents_ismcts=0, profile=False, mc_bidding=False, endgame=None, observers=None):
         self.round = num_rounds
-        self.num_players = num_manual + num_random + num_agents_min_max + num_agents_expectimax + num_agents_mcts
+        self.num_players = num_manual + num_random + num_agents_min_max + num_agents_expectimax + num_agents_mcts + num_agents_ismcts
         self.players = [
             Player(
             f"Player {i}",
@@ -16,28 +23,48 @@ class SpadesGame:
             PlayerType.RANDOM if i < num_manual + num_random else
             PlayerType.MAXN if i < num_manual + num_random + num_agents_min_max else
             PlayerType.EXPECTIMAX if i < num_manual + num_random + num_agents_min_max + num_agents_expectimax else
-            PlayerType.MCTS,
+            PlayerType.MCTS if i < num_manual + num_random + num_agents_min_max + num_agents_expectimax + num_agents_mcts else
+            PlayerType.ISMCTS,
             i
             )
             for i in range(self.num_players)
         ]
         random.shuffle(self.players)
+        # Per-player DecisionProfile of every AI decision when profiling
+        self.profiles = {}
+        if profile:
+            for player in self.players:
+                player.recorder = self.profiles[player.id] = DecisionProfile()
         self.deck = Deck()
         self.trump_suit = 'S'
 
         # Round specific
-        self.cards_played_round = set()
-        self.trump_broken_round = False
+        # Canonical state of the round, created once bids are in and advanced card by card
+        self.state = None
         self.dealer_index = 0
         self.starting_player_index = 1
 
         # Options
         self.skip_rounds_below = skip_rounds_below
         self.text_disable = text_disable
+        # Everything the game reports goes through observers; text output is one of them
+        self.observers = list(observers) if observers is not None else []
+        if not text_disable:
+            self.observers.insert(0, TextObserver())
+        for player in self.players:
+            player.verbose = not text_disable
+        if mc_bidding:
+            from bidder import shared_bidder
+            for player in self.players:
+                player.bidder = shared_bidder()
+        if endgame is not None:
+            # endgame is the path of an endgame table file, shared by the whole process
+            from endgame import shared_table
+            for player in self.players:
+                player.endgame = shared_table(endgame, self.num_players)
 
     def reset_round(self):
-        self.cards_played_round = set()
-        self.trump_broken_round = False
+        self.state = None
         self.dealer_index = (self.dealer_index + 1) % self.num_players
         self.deck.reset()
 
@@ -45,118 +72,125 @@ class SpadesGame:
         self.deck.shuffle()
         for player in self.players:
             player.hand = self.deck.deal(num_cards)
+
+    def start_round_state(self):
+        n = self.num_players
+        self.state = CompactGameState(
+            self.round,
+            [cards_to_mask(player.hand) for player in self.players],
+            self.starting_player_index,
+            0,
+            [NO_CARD] * n,
+            0,
+            self.starting_player_index,
+            False,
+            [player.bid_amount for player in self.players],
+            [0] * n,
+        )
+
+    def snapshot(self):
+        """
+        The state handed to agents: a copy of the canonical state they are free to mutate or
+        send to another process.
+        """
+        return self.state.clone()
+
+    def local_players(self):
+        """
+        The players whose agents live in this process and get the lifecycle hooks.
+        """
+        return [player for player in self.players if not player.remote]
+
+    def record_card(self, player_index, card, lead_card):
+        state = self.state
+        if lead_card is not None and CARD_STR_SUIT[card] != CARD_STR_SUIT[lead_card]:
+            state.void_masks[player_index] |= SUIT_MASKS[SUITS.index(CARD_STR_SUIT[lead_card])]
+        state.play(CARD_IDS[card])
     
     def score_trick(self, trick, starting_player_index):
-        starting_card = trick[starting_player_index]
-        starting_rank = card_to_rank(starting_card)
-
-        winning_suit = card_to_suit(starting_card)
-        winner_index = starting_player_index
-        winning_rank = starting_rank
-
-        for i in range(len(trick) - 1):
-            player_index = (starting_player_index + i + 1) % self.num_players
-            card = trick[player_index]
-            card_rank = card_to_rank(card)
-            card_suit = card_to_suit(card)
-
-            if card_suit == self.trump_suit:
-                if winning_suit != self.trump_suit or card_rank > winning_rank:
-                    winner_index = player_index
-                    winning_suit = self.trump_suit
-                    winning_rank = card_rank
-            elif card_suit == winning_suit and card_rank > winning_rank:
-                winner_index = player_index
-                winning_rank = card_rank
-        winner = self.players[winner_index]
-        winner.increment_trick_amount()
-        if not self.text_disable:
-            print(f"{winner.name} wins the trick")
+        winner_index = trick_winner([CARD_IDS[card] for card in trick], starting_player_index)
+        self.players[winner_index].increment_trick_amount()
         return winner_index
 
     ## Phases
+    # The phases are generators: every decision is yielded as (player, BID or PLAY, arguments of
+    # AiAgent.bid or AiAgent.play) and the answer is sent back in, so the same game flow runs
+    # synchronously in play_game or from an event loop (see server.py).
 
     def bidding_phase(self):
-        if not self.text_disable:
-            print()
-            print("-" * 25 + " Starting bidding phase " + "-" * 25)
+        for observer in self.observers:
+            observer.bidding_started(self)
         total_bid = 0
         total_bids = 0
         for i in range(self.num_players):
             player_index = (self.dealer_index + 1 + i) % self.num_players
             player = self.players[player_index]
-            if player.type == PlayerType.MANUAL:
-                if not self.text_disable:
-                    self.print_board(show_hands=True)
-                    print(f"{player.name} is bidding")
-            bid = player.getAI().bid(self.players[player_index].hand, total_bid, total_bids, self.num_players, self.round)
+            for observer in self.observers:
+                observer.turn_started(self, player, None)
+            bid = yield player, BID, (self.players[player_index].hand, total_bid, total_bids, self.num_players, self.round)
             player.set_bid_amount(bid)
             total_bid += bid
             total_bids += 1
-            if not self.text_disable:
-                print(f"{player.name} bids {bid}")
-        if not self.text_disable:
-            print("-" * 25 + " Ending bidding phase " + "-" * 25)
+            for observer in self.observers:
+                observer.bid_made(self, player, bid)
+        for observer in self.observers:
+            observer.bidding_ended(self)
 
 
     def play_trick(self, starting_player_index):
-        if not self.text_disable:
-            print()
-            print("*" * 25 + " Starting trick " + "*" * 25)
+        for observer in self.observers:
+            observer.trick_started(self)
         trick = [None] * self.num_players
         for i in range(self.num_players):
             player_index = (starting_player_index + i) % self.num_players
             player = self.players[player_index]
-            if player.type == PlayerType.MANUAL:
-                if not self.text_disable:
-                    self.print_board(show_hands=True, tricks=trick)
-                    print(f"{player.name} is playing")
-            game_state = create_game_state(self, trick, player_index, self.trump_broken_round)
-            card = player.getAI().play(game_state)
+            for observer in self.observers:
+                observer.turn_started(self, player, trick)
+            card = yield player, PLAY, (self.snapshot(),)
             player.hand.remove(card)
             trick[player_index] = card
-            self.cards_played_round.add(card)
-            if not self.text_disable:
-                print(f"{player.name} plays {card}")
+            lead_card = None if i == 0 else trick[starting_player_index]
+            self.record_card(player_index, card, lead_card)
+            for other in self.local_players():
+                other.getAI().card_observed(player_index, card, lead_card)
+            for observer in self.observers:
+                observer.card_played(self, player, card)
 
         winner_index = self.score_trick(trick, starting_player_index)
-        if not self.text_disable:
-            print("*" * 25 + " Ending trick " + "*" * 25)
+        for player in self.local_players():
+            player.getAI().trick_completed(trick, starting_player_index, winner_index)
+        for observer in self.observers:
+            observer.trick_won(self, self.players[winner_index], trick)
         return winner_index
 
     def play_round(self):
-        if not self.text_disable:
-            print()
-            print("$" * 25 + " Starting round " + str(self.round) + " " + "$" * 25)
-            for player in self.players:
-                print(f"{player.name} has {player.total_score} points")
+        for observer in self.observers:
+            observer.round_started(self)
         num_cards = self.round
         self.deal_cards(num_cards)
-        self.bidding_phase()
+        for player in self.local_players():
+            player.getAI().new_round(num_cards, player.hand[:])
+        yield from self.bidding_phase()
+        self.start_round_state()
 
         for _ in range(num_cards):
-            if not self.text_disable:
-                self.print_board(show_hands=True)
-            self.starting_player_index = self.play_trick(self.starting_player_index)
+            self.starting_player_index = yield from self.play_trick(self.starting_player_index)
 
-        if not self.text_disable:
-            self.print_board()
         self.reset_round()
-        if not text_disable:
-            print("$" * 25 + " Ending round " + str(self.round) + " " + "$" * 25)
+        for observer in self.observers:
+            observer.round_ended(self)
     
     def score_round(self):
         for player in self.players:
             trick_amount = player.trick_amount
-            str = f"{player.name} bid {player.bid_amount} and won {trick_amount}"
             if trick_amount == player.bid_amount:
                 score = player.bid_amount + 10
             else:
                 score = -1 * player.bid_amount
             player.total_score += score
+            for observer in self.observers:
+                observer.round_scored(self, player, player.bid_amount, trick_amount, score)
             player.reset_for_new_round()
-            if not self.text_disable:
-                print(f"{str} scoring {score} points")
     
     def print_board(self, show_hands=False, tricks=None):
         print()
@@ -175,22 +209,48 @@ class SpadesGame:
         print()
 
 
-    def play_game(self):
+    def game_turns(self):
+        """
+        The whole game as a generator of decisions (see Phases); returns the players from first
+        to last.
+        """
+        for seat, player in enumerate(self.players):
+            if not player.remote:
+                player.getAI().new_game(self.num_players, seat)
         while self.round > self.skip_rounds_below:
-            if not self.text_disable:
-                self.print_board()
-            self.play_round()
+            yield from self.play_round()
             self.score_round()
             self.round -= 1
 
-        winner = max(self.players, key=lambda player: player.total_score)
-        print("Final Scores:")
-        for player in self.players:
-            print(f"{player.name}: {player.total_score} points")
-        print(f"The winner is {winner.name} with {winner.total_score} points")
         sorted_players = sorted(self.players, key=lambda player: player.total_score, reverse=True)
+        for observer in self.observers:
+            observer.game_ended(self, sorted_players)
         return sorted_players
 
+    def decide(self, player, kind, args):
+        agent = player.getAI()
+        return agent.bid(*args) if kind == BID else agent.play(*args)
+
+    def play_game(self):
+        turns = self.game_turns()
+        answer = None
+        while True:
+            try:
+                player, kind, args = turns.send(answer)
+            except StopIteration as done:
+                return done.value
+            answer = self.decide(player, kind, args)
+
+    def result(self):
+        """
+        The outcome of a finished game: every player's id, agent type and score by seat, and
+        player ids from first to last.
+        """
+        return {
+            "players": [{"id": player.id, "type": player.type.value, "score": player.total_score} for player in self.players],
+            "standings": [player.id for player in sorted(self.players, key=lambda player: player.total_score, reverse=True)],
+        }
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play a game of Spades.")
     parser.add_argument("-m", "--manual", type=int, default=0, help="Number of manual players (0-4).")
@@ -198,9 +258,16 @@ if __name__ == "__main__":
     parser.add_argument("-x", "--maxn", type=int, default=0, help="Number of AI agents (MaxN) (0-4).")
     parser.add_argument("-e", "--expectimax", type=int, default=0, help="Number of AI agents (Expectimax) (0-4).")
     parser.add_argument("-mcts", "--montecarlo", type=int, default=0, help="Number of AI agents (Monte Carlo Tree Search) (0-4).")
+    parser.add_argument("-is", "--ismcts", type=int, default=0, help="Number of AI agents (Information Set MCTS) (0-4).")
     parser.add_argument("-n", "--rounds", type=int, default=10, help="Number of rounds (1-100).")
     parser.add_argument("-s", "--sim", type=int, default=None, help="Simulation mode (1-1000).")
     parser.add_argument("-d", "--disable-text", action="store_true", help="Disable text output.")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes for simulation mode.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for simulation mode.")
+    parser.add_argument("-b", "--mc-bid", action="store_true", help="AI agents bid by Monte Carlo simulation (needs NumPy).")
+    parser.add_argument("--endgame", default=None, help="Endgame table file answering the last rounds by lookup, filled as games go (needs NumPy).")
+    parser.add_argument("-p", "--profile", action="store_true", help="Report per-decision search statistics per player and round size.")
+    parser.add_argument("--profile-json", default=None, help="Also write the profile summary to this JSON file.")
     args = parser.parse_args()
 
     num_manual_players = args.manual
@@ -208,33 +275,39 @@ if __name__ == "__main__":
     num_agents_max_n = args.maxn
     num_agents_expectimax = args.expectimax
     num_agents_mcts = args.montecarlo
+    num_agents_ismcts = args.ismcts
     text_disable = args.disable_text
-    total_players = num_manual_players + num_agents_rand + num_agents_max_n + num_agents_expectimax + num_agents_mcts
+    total_players = num_manual_players + num_agents_rand + num_agents_max_n + num_agents_expectimax + num_agents_mcts + num_agents_ismcts
     num_rounds = args.rounds 
+    profile = args.profile or args.profile_json is not None
+    if args.endgame:
+        # Create the table before any simulation worker opens it
+        from endgame import shared_table
+        shared_table(args.endgame, total_players)
 
     if args.sim:
-        stats = []
-        for _ in range(args.sim):
-            print("Game:", _ + 1)
-            game = SpadesGame(num_manual_players, num_agents_rand, num_agents_max_n, num_agents_expectimax, num_agents_mcts , num_rounds, 0, text_disable)
-            sorted_score_players = game.play_game()
-            single_game_stats = {player.id: (i + 1, player.total_score) for i, player in enumerate(sorted_score_players)}
-            stats.append(single_game_stats)
+        from tournament import run_tournament
+        game_args = (num_manual_players, num_agents_rand, num_agents_max_n, num_agents_expectimax, num_agents_mcts, num_rounds, 0, text_disable, num_agents_ismcts, profile, args.mc_bid, args.endgame)
+        aggregated_stats = run_tournament(game_args, args.sim, args.workers, args.seed)
         print("Simulation results:")
-        aggregated_stats = {}
-        for game_stats in stats:
-            for player_id, (standing, score) in game_stats.items():
-                if player_id not in aggregated_stats:
-                    aggregated_stats[player_id] = {"total_standing": 0, "total_score": 0, "games_played": 0}
-                aggregated_stats[player_id]["total_standing"] += standing
-                aggregated_stats[player_id]["total_score"] += score
-                aggregated_stats[player_id]["games_played"] += 1
 
         for player_id, data in aggregated_stats.items():
             avg_standing = data["total_standing"] / data["games_played"]
             avg_score = data["total_score"] / data["games_played"]
             print(f"Player {player_id}: Average Standing: {avg_standing:.2f}, Average Score: {avg_score:.2f}")
+        profiles = {player_id: data["profile"] for player_id, data in aggregated_stats.items() if "profile" in data}
 
     else:
-        game = SpadesGame(num_manual_players, num_agents_rand, num_agents_max_n,num_agents_expectimax , num_agents_mcts, num_rounds, 0, text_disable)
-        game.play_game()
\ No newline at end of file
+        game = SpadesGame(num_manual_players, num_agents_rand, num_agents_max_n,num_agents_expectimax , num_agents_mcts, num_rounds, 0, text_disable, num_agents_ismcts, profile, args.mc_bid, args.endgame)
+        game.play_game()
+        profiles = game.profiles
+
+    if profile:
+        from profiling import print_profiles
+        print("Decision profile:")
+        print_profiles(profiles)
+        if args.profile_json:
+            import json
+            with open(args.profile_json, "w") as f:
+                json.dump({str(player_id): {"agent": p.agent, "rounds": {str(k): v for k, v in p.summary().items()}}
+                           for player_id, p in profiles.items()}, f, indent=2)
\ No newline at end of file
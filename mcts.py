@@ -2,11 +2,18 @@ import math
 from collections import defaultdict
 
 class MCTSNode:
-    def __init__(self, state, parent=None, action=None):
-        self.state = state
+    """
+    Nodes don't keep a copy of their state. The search walks one scratch state down the tree
+    with do_move and passes it to expand, so the state at a node is only ever materialised
+    while the search is standing on it. With distinct, a node and its descendants get one child
+    per run of equivalent cards (see CompactGameState.getLegalActions).
+    """
+    def __init__(self, state, parent=None, action=None, distinct=False):
         self.parent = parent
         self.action = action
-        self._untried_actions = state.getLegalActions().copy()
+        self.distinct = distinct
+        self._untried_actions = state.getLegalActions(distinct)
+        self._terminal = state.hands[state.curr_player_index] == 0
         self.children = []
         self.visits = 0
         self.wins = 0  # Number of times tricks_won == bid
@@ -28,25 +35,76 @@ class MCTSNode:
     def best_child(self, c=1.4):
         return max(self.children, key=lambda child: child.ucb1(c))
 
-    def expand(self):
-        # self.print_state()
+    def expand(self, state):
+        # state must be the scratch state positioned at this node; it is left at the new child
         action = self._untried_actions.pop()
         # print(f"Expanding node with action: {action}")
-        next_state = self.state.generateSuccessor(action)
-        child_node = MCTSNode(next_state, parent=self, action=action)
+        state.do_move(action)
+        child_node = MCTSNode(state, parent=self, action=action, distinct=self.distinct)
         self.children.append(child_node)
         return child_node
 
+    def relabel(self, old, new):
+        """
+        Renames action old to new everywhere below this node, for a subtree whose player turned
+        out to hold new instead of the equivalent card old.
+        """
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            if node.action == old:
+                node.action = new
+            node._untried_actions = [new if action == old else action for action in node._untried_actions]
+            stack.extend(node.children)
+        self._untried_actions = [new if action == old else action for action in self._untried_actions]
+
     def is_fully_expanded(self):
         return len(self._untried_actions) == 0
 
     def is_terminal(self):
-        return len(self.state.player_hands[self.state.curr_player_index]) == 0
-    
-    def print_state(self):
-        print(f"Current player index: {self.state.curr_player_index}")
-        print(f"Player hand: {self.state.player_hands}")
-        print(f"Cards played round: {self.state.cards_played_round}")
-        print(f"Cards played trick: {self.state.cards_played_trick}")
-        print(f"Trump broken: {self.state.trump_broken}")
+        return self._terminal
+
+    def print_state(self, state):
+        print(f"Current player index: {state.curr_player_index}")
+        print(f"Player hand: {state.player_hands}")
+        print(f"Cards played round: {state.played_mask}")
+        print(f"Cards played trick: {state.trick}")
+        print(f"Trump broken: {state.trump_broken}")
         print(f"Untried actions: {self._untried_actions}")
+
+
+class ISMCTSNode:
+    """
+    Node of a single-observer information set MCTS tree. Children are keyed by action because
+    a different determinization may make a different subset of them legal; avail counts the
+    iterations in which a child was legal and stands in for the parent's visits in UCB1.
+    wins are counted for player, the player who played action to reach this node.
+    """
+    def __init__(self, parent=None, action=None, player=None):
+        self.parent = parent
+        self.action = action
+        self.player = player
+        self.children = {}
+        self.visits = 0
+        self.wins = 0
+        self.avail = 0
+
+    def untried_actions(self, legal_actions):
+        return [action for action in legal_actions if action not in self.children]
+
+    def ucb1(self, c=1.4):
+        if self.visits == 0:
+            return float('inf')
+        return self.wins / self.visits + c * math.sqrt(math.log(self.avail) / self.visits)
+
+    def select_child(self, legal_actions, c=1.4):
+        children = [self.children[action] for action in legal_actions]
+        for child in children:
+            child.avail += 1
+        return max(children, key=lambda child: child.ucb1(c))
+
+    def add_child(self, action, player):
+        child_node = ISMCTSNode(parent=self, action=action, player=player)
+        child_node.avail = 1
+        self.children[action] = child_node
+        return child_node
@@ -0,0 +1,96 @@
+from player import PlayerType
+
+
+class GameObserver:
+    """
+    Receives SpadesGame events. Every method is a no-op, so observers override only the events
+    they care about. game is the SpadesGame sending the event.
+    """
+    def round_started(self, game):
+        pass
+
+    def bidding_started(self, game):
+        pass
+
+    def turn_started(self, game, player, trick):
+        """
+        Called before player bids (trick is None) or plays a card.
+        """
+        pass
+
+    def bid_made(self, game, player, bid):
+        pass
+
+    def bidding_ended(self, game):
+        pass
+
+    def trick_started(self, game):
+        pass
+
+    def card_played(self, game, player, card):
+        pass
+
+    def trick_won(self, game, winner, trick):
+        pass
+
+    def round_ended(self, game):
+        pass
+
+    def round_scored(self, game, player, bid, tricks_won, score):
+        pass
+
+    def game_ended(self, game, standings):
+        pass
+
+
+class TextObserver(GameObserver):
+    """
+    The console output of an interactive game.
+    """
+    def round_started(self, game):
+        game.print_board()
+        print()
+        print("$" * 25 + " Starting round " + str(game.round) + " " + "$" * 25)
+        for player in game.players:
+            print(f"{player.name} has {player.total_score} points")
+
+    def bidding_started(self, game):
+        print()
+        print("-" * 25 + " Starting bidding phase " + "-" * 25)
+
+    def turn_started(self, game, player, trick):
+        if player.type == PlayerType.MANUAL:
+            game.print_board(show_hands=True, tricks=trick)
+            print(f"{player.name} is {'bidding' if trick is None else 'playing'}")
+
+    def bid_made(self, game, player, bid):
+        print(f"{player.name} bids {bid}")
+
+    def bidding_ended(self, game):
+        print("-" * 25 + " Ending bidding phase " + "-" * 25)
+
+    def trick_started(self, game):
+        game.print_board(show_hands=True)
+        print()
+        print("*" * 25 + " Starting trick " + "*" * 25)
+
+    def card_played(self, game, player, card):
+        print(f"{player.name} plays {card}")
+
+    def trick_won(self, game, winner, trick):
+        print(f"{winner.name} wins the trick")
+        print("*" * 25 + " Ending trick " + "*" * 25)
+
+    def round_ended(self, game):
+        game.print_board()
+        print("$" * 25 + " Ending round " + str(game.round) + " " + "$" * 25)
+
+    def round_scored(self, game, player, bid, tricks_won, score):
+        print(f"{player.name} bid {bid} and won {tricks_won} scoring {score} points")
+
+    def game_ended(self, game, standings):
+        winner = standings[0]
+        print("Final Scores:")
+        for player in game.players:
+            print(f"{player.name}: {player.total_score} points")
+        print(f"The winner is {winner.name} with {winner.total_score} points")
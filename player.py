@@ -1,4 +1,5 @@
-from ai import RandomAi, ManualAi, MaxNAi, ExpectimaxAi, MCTSAi
+import random
+from ai import RandomAi, ManualAi, MaxNAi, ExpectimaxAi, MCTSAi, ISMCTSAi
 from enum import Enum
 
 class PlayerType(Enum):
@@ -7,6 +8,7 @@ class PlayerType(Enum):
     MAXN = "MaxN"
     EXPECTIMAX = "Expectimax"
     MCTS = "MCTS"
+    ISMCTS = "ISMCTS"
 class Player:
     def __init__(self, name, type, id):
         self.id = id
@@ -16,6 +18,14 @@ class Player:
         self.trick_amount = 0
         self.total_score = 0
         self.type = type
+        self.ai = None
+        self.recorder = None  # handed to the player's agent, see AiAgent.recorder
+        self.verbose = False  # whether the player's agent prints its reasoning
+        self.bidder = None  # handed to the player's agent, see AiAgent.bidder
+        self.endgame = None  # handed to the player's agent, see AiAgent.endgame
+        # Decided outside this process (by a worker pool or a remote client): the game builds no
+        # agent for the player and skips its lifecycle hooks
+        self.remote = False
 
     def add_card_to_hand(self, card):
         self.hand.append(card)
@@ -44,16 +54,30 @@ class Player:
         self.trick_amount = 0
 
     def getAI(self):
+        # One agent per player, kept for the whole game so it can carry state between decisions
+        if self.ai is None:
+            self.ai = self._create_ai()
+            self.ai.recorder = self.recorder
+            self.ai.verbose = self.verbose
+            self.ai.bidder = self.bidder
+            self.ai.endgame = self.endgame
+        return self.ai
+
+    def _create_ai(self):
+        # Seeded from the global RNG, so a seeded tournament or self-play run replays the agents too
+        seed = random.getrandbits(64)
         if self.type == PlayerType.RANDOM:
-            return RandomAi()
+            return RandomAi(seed)
         elif self.type == PlayerType.MANUAL:
             return ManualAi()
         elif self.type == PlayerType.MAXN:
-            return MaxNAi()
+            return MaxNAi(seed=seed)
         elif self.type == PlayerType.EXPECTIMAX:
-            return ExpectimaxAi()
+            return ExpectimaxAi(seed=seed)
         elif self.type == PlayerType.MCTS:
-            return MCTSAi()
+            return MCTSAi(seed=seed)
+        elif self.type == PlayerType.ISMCTS:
+            return ISMCTSAi(seed=seed)
         else:
-            return RandomAi()
+            return RandomAi(seed)
         
\ No newline at end of file
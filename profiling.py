@@ -0,0 +1,116 @@
+import json
+
+TOTAL_FIELDS = ("seconds", "nodes", "playouts", "tt_hits", "tt_probes", "visit_share")
+
+
+def merge_entry(entry, other):
+    for field, value in other.items():
+        entry[field] = max(entry[field], value) if field.startswith("max_") else entry[field] + value
+
+
+class DecisionProfile:
+    """
+    Recorder for AiAgent.recorder that aggregates decision records by round size. Optionally
+    keeps every raw record or forwards each one to a callback (e.g. a structured log writer).
+    Profiles hold plain dicts, so they pickle back from simulation workers and merge.
+    """
+    def __init__(self, keep_records=False, callback=None):
+        self.agent = None
+        self.by_round = {}
+        self.records = [] if keep_records else None
+        self.callback = callback
+
+    def __call__(self, record):
+        self.agent = record["agent"]
+        entry = self.by_round.get(record["round"])
+        if entry is None:
+            entry = self.by_round[record["round"]] = dict.fromkeys(TOTAL_FIELDS, 0)
+            entry.update(decisions=0, max_seconds=0.0, max_depth=0, visit_share_decisions=0)
+        entry["decisions"] += 1
+        for field in TOTAL_FIELDS:
+            entry[field] += record.get(field, 0)
+        entry["max_seconds"] = max(entry["max_seconds"], record["seconds"])
+        entry["max_depth"] = max(entry["max_depth"], record.get("depth", 0))
+        if "visit_share" in record:
+            entry["visit_share_decisions"] += 1
+        if self.records is not None:
+            self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def __getstate__(self):
+        # Callbacks such as open log files stay in the process that made them
+        state = self.__dict__.copy()
+        state["callback"] = None
+        return state
+
+    def merge(self, other):
+        if other.agent is not None:
+            self.agent = other.agent
+        for round_size, other_entry in other.by_round.items():
+            entry = self.by_round.get(round_size)
+            if entry is None:
+                self.by_round[round_size] = dict(other_entry)
+                continue
+            merge_entry(entry, other_entry)
+        if self.records is not None and other.records is not None:
+            self.records.extend(other.records)
+        return self
+
+    def summary(self):
+        """
+        Returns {round size: averages per decision}, plus "all" over every round size.
+        """
+        rows = {round_size: self._averages(entry) for round_size, entry in sorted(self.by_round.items())}
+        if self.by_round:
+            rows["all"] = self._averages(self._total())
+        return rows
+
+    def _total(self):
+        entries = list(self.by_round.values())
+        total = dict(entries[0])
+        for entry in entries[1:]:
+            merge_entry(total, entry)
+        return total
+
+    @staticmethod
+    def _averages(entry):
+        decisions = entry["decisions"]
+        seconds = entry["seconds"]
+        return {
+            "decisions": decisions,
+            "total_seconds": seconds,
+            "mean_seconds": seconds / decisions,
+            "max_seconds": entry["max_seconds"],
+            "nodes": entry["nodes"] / decisions,
+            "playouts": entry["playouts"] / decisions,
+            "playouts_per_second": entry["playouts"] / seconds if seconds > 0 else 0.0,
+            "max_depth": entry["max_depth"],
+            "tt_hit_rate": entry["tt_hits"] / entry["tt_probes"] if entry["tt_probes"] else None,
+            "visit_share": entry["visit_share"] / entry["visit_share_decisions"] if entry["visit_share_decisions"] else None,
+        }
+
+
+def json_lines_writer(file):
+    """
+    Returns a DecisionProfile callback that writes every record to file as one JSON line.
+    """
+    def write(record):
+        file.write(json.dumps(record) + "\n")
+    return write
+
+
+def print_profiles(profiles):
+    """
+    Prints one table per player of a {player id: DecisionProfile} mapping.
+    """
+    for player_id, profile in sorted(profiles.items()):
+        print(f"Player {player_id} ({profile.agent}):")
+        print(f"  {'round':>5} {'moves':>6} {'mean ms':>9} {'max ms':>9} {'nodes':>9} {'playouts':>9} "
+              f"{'playouts/s':>11} {'depth':>5} {'tt hits':>7} {'share':>6}")
+        for round_size, row in profile.summary().items():
+            tt_hits = "-" if row["tt_hit_rate"] is None else f"{row['tt_hit_rate']:.0%}"
+            share = "-" if row["visit_share"] is None else f"{row['visit_share']:.0%}"
+            print(f"  {round_size:>5} {row['decisions']:>6} {row['mean_seconds'] * 1000:>9.2f} {row['max_seconds'] * 1000:>9.2f} "
+                  f"{row['nodes']:>9.0f} {row['playouts']:>9.0f} {row['playouts_per_second']:>11.0f} "
+                  f"{row['max_depth']:>5} {tt_hits:>7} {share:>6}")
@@ -0,0 +1,146 @@
+import json
+import os
+import numpy as np
+from cards import CARD_IDS, NO_CARD, SUIT_MASKS
+from compact_state import CompactGameState
+from selfplay import AGENT_TYPES, MANIFEST
+
+
+class ReplayDataset:
+    """
+    Read-only view of one dataset ("plays" or "bids") written by selfplay.generate. Every shard
+    is memory-mapped, so opening a corpus reads only the manifest and .npy headers; records,
+    columns and batches are NumPy views or small gathers out of the page cache.
+    """
+    def __init__(self, directory, name="plays"):
+        self.directory = directory
+        self.name = name
+        with open(os.path.join(directory, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.shards = [np.load(os.path.join(directory, shard["file"]), mmap_mode="r")
+                       for shard in self.manifest["datasets"][name]["shards"]]
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+        self.dtype = self.shards[0].dtype if self.shards else None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def agent_indices(self, player_type):
+        """
+        Dataset-wide indices of the records of decisions made by agents of player_type, e.g. to
+        imitate or relabel one agent's moves.
+        """
+        code = AGENT_TYPES.index(player_type)
+        return np.concatenate([np.flatnonzero(agents == code) + offset
+                               for agents, offset in zip(self.column("agent"), self.offsets)] or [np.zeros(0, dtype=np.intp)])
+
+    def locate(self, index):
+        """
+        Returns (shard number, row in shard) of a dataset-wide index.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        shard = int(np.searchsorted(self.offsets, index, side="right")) - 1
+        return shard, index - int(self.offsets[shard])
+
+    def __getitem__(self, index):
+        shard, row = self.locate(index)
+        return self.shards[shard][row]
+
+    def column(self, field):
+        """
+        Yields field of every shard in turn, each a view into its memory map.
+        """
+        for shard in self.shards:
+            yield shard[field]
+
+    def batches(self, batch_size, shuffle=True, seed=None, drop_last=False):
+        """
+        Yields structured arrays of batch_size records. Shuffling visits the shards in a random
+        order and the rows of each in a random permutation, so memory is bounded by one shard's
+        index rather than the corpus; batches straddle shard boundaries to stay full.
+        """
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.shards)) if shuffle else range(len(self.shards))
+        pending = []
+        pending_rows = 0
+        for shard_number in order:
+            shard = self.shards[shard_number]
+            rows = rng.permutation(len(shard)) if shuffle else np.arange(len(shard))
+            start = 0
+            while start < len(rows):
+                take = min(batch_size - pending_rows, len(rows) - start)
+                chunk = rows[start:start + take]
+                # Shuffled rows are a gather; in-order rows stay a view until concatenated
+                pending.append(shard[chunk] if shuffle else shard[chunk[0]:chunk[-1] + 1])
+                pending_rows += take
+                start += take
+                if pending_rows == batch_size:
+                    yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+                    pending = []
+                    pending_rows = 0
+        if pending and not drop_last:
+            yield np.concatenate(pending)
+
+    def state(self, index):
+        """
+        Rebuilds the CompactGameState the player to move saw for a play record. Hands are the
+        true hands at the time; agents only use the ones they are entitled to.
+        """
+        return record_to_state(self[index])
+
+    def game_state(self, index):
+        return self.state(index).to_game_state()
+
+    def relabel(self, agent, indices):
+        """
+        Replays the positions of the given play records through agent (any AiAgent) and
+        returns the card id it picks for each.
+        """
+        return np.array([CARD_IDS[agent.play(self.state(int(index)))] for index in indices], dtype=np.int8)
+
+
+def record_to_state(record):
+    if "trick" not in record.dtype.names:
+        raise ValueError("Only play records hold a game position")
+    trick = [int(card) for card in record["trick"]]
+    player = int(record["player"])
+    trick_size = sum(1 for card in trick if card != NO_CARD)
+    void_masks = [0] * len(trick)
+    for p, voids in enumerate(record["voids"]):
+        for suit, suit_mask in enumerate(SUIT_MASKS):
+            if int(voids) >> suit & 1:
+                void_masks[p] |= suit_mask
+    return CompactGameState(
+        int(record["round"]),
+        [int(hand) for hand in record["hands"]],
+        player,
+        int(record["played"]),
+        trick,
+        trick_size,
+        int(record["lead"]) if trick_size else player,
+        bool(record["trump_broken"]),
+        [int(bid) for bid in record["bids"]],
+        [int(won) for won in record["tricks_won"]],
+        void_masks,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Summarize a self-play corpus and time reading it back.")
+    parser.add_argument("directory", help="Directory written by selfplay.py.")
+    parser.add_argument("-b", "--batch-size", type=int, default=4096, help="Records per batch.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for shuffling.")
+    args = parser.parse_args()
+
+    for name in ("plays", "bids"):
+        dataset = ReplayDataset(args.directory, name)
+        start = time.perf_counter()
+        rows = sum(len(batch) for batch in dataset.batches(args.batch_size, seed=args.seed))
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {len(dataset)} records in {len(dataset.shards)} shards, "
+              f"shuffled pass in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} records/s)")
@@ -0,0 +1,29 @@
+import random
+from compact_state import CompactGameState, playable_mask
+
+
+def random_card(mask, rng=random):
+    """
+    Picks a uniformly random card id out of a non-empty card mask.
+    """
+    for _ in range(int(rng.random() * mask.bit_count())):
+        mask &= mask - 1
+    return (mask & -mask).bit_length() - 1
+
+
+def random_playout(state: CompactGameState, evaluate, rng=random):
+    """
+    Plays the rest of the round randomly on state in place, returns evaluate(terminal state)
+    and then undoes every move so state is left exactly as it was passed in.
+    """
+    hands = state.hands
+    plies = 0
+    while hands[state.curr_player_index] or state.trick_size:
+        state.do_move(random_card(playable_mask(state), rng))
+        plies += 1
+
+    result = evaluate(state)
+
+    for _ in range(plies):
+        state.undo_move()
+    return result
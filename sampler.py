@@ -0,0 +1,166 @@
+import math
+import random
+from cards import CARD_BIT, FULL_DECK_MASK, SUIT_MASKS, mask_to_ids
+
+MAX_TABLES = 50000  # suit-count tables enumerated before falling back to greedy dealing
+
+
+class DealSampler:
+    """
+    Draws deals of the cards an observer has not seen to the other players, uniformly among
+    all deals consistent with their hand sizes and known voids.
+
+    A deal is fixed by how many cards of each suit every seat gets (a suit-count table) plus
+    which cards of each suit those are. The constructor enumerates every feasible table once,
+    weighted by the number of deals it stands for, so drawing a deal is a weighted table pick
+    followed by one shuffle per suit. Without voids every deal of the pool is allowed and a
+    single shuffle is enough.
+    """
+    def __init__(self, unseen_mask, hand_sizes, void_masks, observer, rng=random):
+        self.rng = rng
+        self.num_players = len(hand_sizes)
+        self.observer = observer
+        self.seats = [p for p in range(self.num_players) if p != observer and hand_sizes[p] > 0]
+        self.hand_sizes = [hand_sizes[p] for p in self.seats]
+        self.void_masks = [void_masks[p] for p in self.seats]
+        self.unseen = mask_to_ids(unseen_mask)
+        undealt = len(self.unseen) - sum(self.hand_sizes)
+        if undealt < 0:
+            raise ValueError("Fewer unseen cards than cards left in the other players' hands")
+        self.suit_cards = [mask_to_ids(unseen_mask & suit_mask) for suit_mask in SUIT_MASKS]
+
+        self.tables = None
+        self.cum_weights = None
+        self.constrained = any(void & unseen_mask for void in self.void_masks)
+        if self.constrained:
+            self._enumerate_tables(undealt)
+
+    @classmethod
+    def from_state(cls, state, observer=None, void_masks=None, rng=random):
+        """
+        Builds a sampler for observer (default: the player to move) of a CompactGameState.
+        """
+        if observer is None:
+            observer = state.curr_player_index
+        unseen = FULL_DECK_MASK & ~state.played_mask & ~state.hands[observer]
+        hand_sizes = [state.hand_size(p) for p in range(state.getNumPlayers())]
+        return cls(unseen, hand_sizes, state.void_masks if void_masks is None else void_masks, observer, rng)
+
+    def _enumerate_tables(self, undealt):
+        suit_counts = [len(cards) for cards in self.suit_cards]
+        # The last seat holds the unseen cards nobody was dealt this round and can take any suit
+        capacities = self.hand_sizes + [undealt]
+        allowed = [[not void & SUIT_MASKS[suit] for suit in range(len(SUIT_MASKS))] for void in self.void_masks]
+        allowed.append([True] * len(SUIT_MASKS))
+        num_seats = len(capacities)
+        # Cards of suits >= suit each seat could still take, to prune tables that cannot be finished
+        reachable = [[sum(suit_counts[t] for t in range(suit, len(SUIT_MASKS)) if allowed[seat][t])
+                      for suit in range(len(SUIT_MASKS) + 1)] for seat in range(num_seats)]
+
+        tables, weights = [], []
+        columns = [None] * len(SUIT_MASKS)
+
+        def split_suit(suit, seat, left, capacities, column, weight):
+            if seat == num_seats - 1:
+                if left <= capacities[seat]:
+                    column.append(left)
+                    caps = capacities[:]
+                    caps[seat] -= left
+                    assign_suit(suit + 1, caps, weight // math.factorial(left), column)
+                    column.pop()
+                return
+            top = min(left, capacities[seat]) if allowed[seat][suit] else 0
+            for count in range(top + 1):
+                caps = capacities[:]
+                caps[seat] -= count
+                column.append(count)
+                split_suit(suit, seat + 1, left - count, caps, column, weight // math.factorial(count))
+                column.pop()
+
+        def assign_suit(suit, capacities, weight, column=None):
+            if column is not None:
+                columns[suit - 1] = tuple(column)
+            if len(tables) > MAX_TABLES:
+                return
+            if any(capacities[seat] > reachable[seat][suit] for seat in range(num_seats)):
+                return
+            if suit == len(SUIT_MASKS):
+                tables.append(tuple(columns))
+                weights.append(weight)
+                return
+            split_suit(suit, 0, suit_counts[suit], capacities, [], weight * math.factorial(suit_counts[suit]))
+
+        assign_suit(0, capacities, 1)
+        if len(tables) > MAX_TABLES:
+            return
+        if not tables:
+            raise ValueError("No deal is consistent with the observed voids")
+        cum_weights = []
+        total = 0
+        for weight in weights:
+            total += weight
+            cum_weights.append(total)
+        self.tables = tables
+        self.cum_weights = cum_weights
+
+    def sample(self, count=1):
+        """
+        Returns count deals, each a list with a hand mask for every seat. The observer's entry
+        and the entries of players with no cards left are 0.
+        """
+        if self.tables is not None:
+            picks = self.rng.choices(self.tables, cum_weights=self.cum_weights, k=count)
+            return [self._deal_table(table) for table in picks]
+        if self.constrained:
+            return [self._greedy_deal() for _ in range(count)]
+        return [self._deal_unconstrained() for _ in range(count)]
+
+    def _deal_unconstrained(self):
+        cards = self.rng.sample(self.unseen, len(self.unseen))
+        deal = [0] * self.num_players
+        start = 0
+        for seat, hand_size in zip(self.seats, self.hand_sizes):
+            hand = 0
+            for card in cards[start:start + hand_size]:
+                hand |= CARD_BIT[card]
+            deal[seat] = hand
+            start += hand_size
+        return deal
+
+    def _deal_table(self, table):
+        deal = [0] * self.num_players
+        for suit, column in enumerate(table):
+            cards = self.suit_cards[suit]
+            if not cards:
+                continue
+            cards = self.rng.sample(cards, len(cards))
+            start = 0
+            for seat, count in zip(self.seats, column):
+                for card in cards[start:start + count]:
+                    deal[seat] |= CARD_BIT[card]
+                start += count
+        return deal
+
+    def _greedy_deal(self, attempts=100):
+        # Only used when there are too many tables to enumerate: deals the most constrained
+        # seats first, which is close to but not exactly uniform.
+        order = sorted(range(len(self.seats)), key=lambda i: len(self._candidates(FULL_DECK_MASK, i)))
+        unseen_mask = sum(CARD_BIT[card] for card in self.unseen)
+        for _ in range(attempts):
+            deal = [0] * self.num_players
+            pool = unseen_mask
+            for i in order:
+                candidates = self._candidates(pool, i)
+                if len(candidates) < self.hand_sizes[i]:
+                    break
+                hand = 0
+                for card in self.rng.sample(candidates, self.hand_sizes[i]):
+                    hand |= CARD_BIT[card]
+                deal[self.seats[i]] = hand
+                pool &= ~hand
+            else:
+                return deal
+        raise ValueError("Could not find a deal consistent with the observed voids")
+
+    def _candidates(self, pool, i):
+        return [card for card in self.unseen if pool & CARD_BIT[card] and not self.void_masks[i] & CARD_BIT[card]]
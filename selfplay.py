@@ -0,0 +1,219 @@
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from cards import CARD_IDS, SUIT_MASKS, cards_to_mask
+from compact_state import playable_mask
+from game import SpadesGame
+from observers import GameObserver
+from player import PlayerType
+
+ROWS_PER_SHARD = 1 << 18
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 2
+AGENT_TYPES = list(PlayerType)  # the agent column is an index into this list
+
+
+def play_dtype(num_players):
+    """
+    One row per card played. player is the mover's seat, agent the index of its PlayerType in
+    AGENT_TYPES and player_id its Player.id, which stays with the agent across games while
+    seats are shuffled. hands holds every player's hand (consumers hide what the player
+    to move could not see), voids a bitmask of suits per player, trick -1 for seats yet to play.
+    tricks, bid and score are the mover's outcome for the round.
+    """
+    return np.dtype([
+        ("game", np.uint64), ("round", np.int8), ("player", np.int8), ("agent", np.int8), ("player_id", np.int8),
+        ("lead", np.int8), ("trump_broken", np.bool_),
+        ("hands", np.uint64, (num_players,)), ("played", np.uint64), ("trick", np.int8, (num_players,)),
+        ("bids", np.int8, (num_players,)), ("tricks_won", np.int8, (num_players,)), ("voids", np.uint8, (num_players,)),
+        ("legal", np.uint64), ("action", np.int8),
+        ("tricks", np.int8), ("bid", np.int8), ("score", np.int16),
+    ])
+
+
+def bid_dtype():
+    """
+    One row per bid. player, agent and player_id are as in play_dtype, order is the bidder's
+    place in the bidding (0 first), total_bid the sum of the bids before it and legal a bitmask
+    of the allowed bids.
+    """
+    return np.dtype([
+        ("game", np.uint64), ("round", np.int8), ("player", np.int8), ("agent", np.int8), ("player_id", np.int8),
+        ("order", np.int8), ("total_bid", np.int8),
+        ("hand", np.uint64), ("legal", np.uint16), ("action", np.int8),
+        ("tricks", np.int8), ("bid", np.int8), ("score", np.int16),
+    ])
+
+
+def count_players(game_args):
+    # Manual, random, MaxN, expectimax and MCTS counts lead SpadesGame's arguments; ISMCTS is ninth
+    return sum(game_args[:5]) + (game_args[8] if len(game_args) > 8 else 0)
+
+
+class ShardWriter:
+    """
+    Buffers rows of one dtype in a preallocated array and writes it out as a numbered .npy
+    shard each time it fills, so memory stays bounded by rows_per_shard. Shards are written to
+    a temporary name and renamed, so a reader never sees a partial file.
+    """
+    def __init__(self, directory, prefix, dtype, rows_per_shard=ROWS_PER_SHARD):
+        self.directory = directory
+        self.prefix = prefix
+        self.buffer = np.zeros(rows_per_shard, dtype=dtype)
+        self.size = 0
+        self.shards = []
+
+    def append(self, row):
+        self.buffer[self.size] = row
+        self.size += 1
+        if self.size == len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        if self.size == 0:
+            return
+        name = f"{self.prefix}-{len(self.shards):05d}.npy"
+        path = os.path.join(self.directory, name)
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, self.buffer[:self.size])
+        os.replace(path + ".tmp", path)
+        self.shards.append({"file": name, "rows": self.size})
+        self.size = 0
+
+
+class SelfPlayRecorder(GameObserver):
+    """
+    Observer that turns every bid and card of a game into rows for a pair of ShardWriters.
+    A round's rows are held back until it is scored, so they carry its outcome.
+    """
+    def __init__(self, plays, bids):
+        self.plays = plays
+        self.bids = bids
+        self.game_id = 0
+        self._pending = []
+        self._outcomes = {}
+
+    def turn_started(self, game, player, trick):
+        seat = game.players.index(player)
+        agent = AGENT_TYPES.index(player.type)
+        if trick is None:
+            placed = [p.bid_amount for p in game.players if p.bid_amount is not None]
+            total_bid = sum(placed)
+            legal = 0
+            for bid in range(game.round + 1):
+                if len(placed) < game.num_players - 1 or total_bid + bid != game.round:
+                    legal |= 1 << bid
+            self._pending.append((self.bids, seat, [self.game_id, game.round, seat, agent, player.id, len(placed),
+                                                    total_bid, cards_to_mask(player.hand), legal]))
+            return
+        state = game.state
+        voids = [sum(1 << suit for suit, suit_mask in enumerate(SUIT_MASKS) if void & suit_mask) for void in state.void_masks]
+        self._pending.append((self.plays, seat, [
+            self.game_id, game.round, seat, agent, player.id, state.lead_index if state.trick_size else -1, state.trump_broken,
+            state.hands[:], state.played_mask, state.trick[:], state.bids[:], state.tricks_won[:], voids, playable_mask(state)]))
+
+    def bid_made(self, game, player, bid):
+        self._pending[-1][2].append(bid)
+
+    def card_played(self, game, player, card):
+        self._pending[-1][2].append(CARD_IDS[card])
+
+    def round_scored(self, game, player, bid, tricks_won, score):
+        self._outcomes[game.players.index(player)] = (tricks_won, bid, score)
+        if len(self._outcomes) < game.num_players:
+            return
+        for writer, seat, row in self._pending:
+            writer.append(tuple(row) + self._outcomes[seat])
+        self._pending = []
+        self._outcomes = {}
+
+
+def generate_games(directory, game_args, num_games, seed, first_game=0, worker=0, rows_per_shard=ROWS_PER_SHARD):
+    """
+    Plays num_games games with SpadesGame(*game_args), recording them into shards named after
+    worker in directory. Game ids run from first_game. Runs inside a worker process, so it seeds
+    the global RNG used by the deck and agents. Returns the shards written per dataset.
+    """
+    random.seed(seed)
+    num_players = count_players(game_args)
+    plays = ShardWriter(directory, f"plays-w{worker:03d}", play_dtype(num_players), rows_per_shard)
+    bids = ShardWriter(directory, f"bids-w{worker:03d}", bid_dtype(), rows_per_shard)
+    recorder = SelfPlayRecorder(plays, bids)
+    for i in range(num_games):
+        recorder.game_id = first_game + i
+        SpadesGame(*game_args, observers=[recorder]).play_game()
+    plays.flush()
+    bids.flush()
+    return {"plays": plays.shards, "bids": bids.shards}
+
+
+def generate(directory, game_args, num_games, workers=1, seed=None, rows_per_shard=ROWS_PER_SHARD):
+    """
+    Shards num_games of self-play across a process pool, each worker streaming its own .npy
+    shards into directory, and writes a manifest listing them. Seeding is as in
+    tournament.run_tournament. Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    seed_rng = random.Random(seed)
+    workers = max(1, min(workers, num_games))
+    shard_sizes = [num_games // workers + (1 if i < num_games % workers else 0) for i in range(workers)]
+    shard_starts = [sum(shard_sizes[:i]) for i in range(workers)]
+    shard_seeds = [seed_rng.getrandbits(64) for _ in range(workers)]
+    jobs = [(directory, game_args, size, shard_seed, start, worker, rows_per_shard)
+            for worker, (size, shard_seed, start) in enumerate(zip(shard_sizes, shard_seeds, shard_starts))]
+
+    if workers == 1:
+        results = [generate_games(*jobs[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(generate_games, *zip(*jobs)))
+
+    num_players = count_players(game_args)
+    manifest = {
+        "format": FORMAT_VERSION,
+        "games": num_games,
+        "num_players": num_players,
+        "game_args": list(game_args),
+        "agent_types": [agent_type.value for agent_type in AGENT_TYPES],
+        "datasets": {
+            name: {
+                "dtype": np.lib.format.dtype_to_descr(dtype),
+                "rows": sum(shard["rows"] for result in results for shard in result[name]),
+                "shards": [shard for result in results for shard in result[name]],
+            }
+            for name, dtype in (("plays", play_dtype(num_players)), ("bids", bid_dtype()))
+        },
+    }
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Record self-play games as .npy shards.")
+    parser.add_argument("output", help="Directory for the shards and manifest.")
+    parser.add_argument("-g", "--games", type=int, default=100, help="Number of games.")
+    parser.add_argument("-r", "--random", type=int, default=0, help="Number of AI agents (Random).")
+    parser.add_argument("-x", "--maxn", type=int, default=0, help="Number of AI agents (MaxN).")
+    parser.add_argument("-e", "--expectimax", type=int, default=0, help="Number of AI agents (Expectimax).")
+    parser.add_argument("-mcts", "--montecarlo", type=int, default=0, help="Number of AI agents (Monte Carlo Tree Search).")
+    parser.add_argument("-is", "--ismcts", type=int, default=0, help="Number of AI agents (Information Set MCTS).")
+    parser.add_argument("-n", "--rounds", type=int, default=10, help="Number of rounds (1-13).")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the games.")
+    parser.add_argument("--rows-per-shard", type=int, default=ROWS_PER_SHARD, help="Rows buffered per shard file.")
+    args = parser.parse_args()
+
+    if args.random + args.maxn + args.expectimax + args.montecarlo + args.ismcts == 0:
+        parser.error("at least one agent is needed")
+    game_args = (0, args.random, args.maxn, args.expectimax, args.montecarlo, args.rounds, 0, True, args.ismcts)
+    start = time.perf_counter()
+    manifest = generate(args.output, game_args, args.games, args.workers, args.seed, args.rows_per_shard)
+    elapsed = time.perf_counter() - start
+    plays = manifest["datasets"]["plays"]["rows"]
+    bids = manifest["datasets"]["bids"]["rows"]
+    print(f"{args.games} games, {plays} plays and {bids} bids in {elapsed:.2f}s ({(plays + bids) / elapsed:.0f} rows/s)")
@@ -0,0 +1,450 @@
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from ai import RandomAi
+from compact_state import to_compact_state
+from cards import card_str
+from game import BID, SpadesGame
+from observers import GameObserver
+from player import PlayerType
+from decision_service import DecisionService, configured_agent
+
+HUMAN_TIMEOUT = 60.0  # seconds a remote seat gets per turn before a random move is made for it
+LATENCY_WINDOW = 10000  # most recent turns kept per kind for percentiles
+LAG_INTERVAL = 0.05
+
+
+class TurnLatency:
+    """
+    Per-turn latency by kind ("ai bid", "human play", "loop lag", ...): totals over every turn
+    and percentiles over the most recent window of them.
+    """
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self.recent = {}
+        self.counts = {}
+        self.totals = {}
+        self.maxima = {}
+
+    def record(self, kind, seconds):
+        recent = self.recent.get(kind)
+        if recent is None:
+            recent = self.recent[kind] = deque(maxlen=self.window)
+            self.counts[kind] = 0
+            self.totals[kind] = 0.0
+            self.maxima[kind] = 0.0
+        recent.append(seconds)
+        self.counts[kind] += 1
+        self.totals[kind] += seconds
+        self.maxima[kind] = max(self.maxima[kind], seconds)
+
+    def summary(self):
+        rows = {}
+        for kind, recent in sorted(self.recent.items()):
+            ordered = sorted(recent)
+            percentile = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+            rows[kind] = {
+                "turns": self.counts[kind],
+                "mean_ms": self.totals[kind] / self.counts[kind] * 1000,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": self.maxima[kind] * 1000,
+            }
+        return rows
+
+
+class RemoteSeat:
+    """
+    A human seat on the other end of a connection speaking one JSON object per line. The
+    server sends events and prompts ({"event": "bid", "allowed": [...]} or {"event": "play",
+    "playable": [...]}) and the client answers a prompt with {"bid": n} or {"card": "10H"}.
+    A seat that times out or disconnects gets a random legal move and stays in the game.
+    """
+    def __init__(self, reader, writer, timeout=HUMAN_TIMEOUT):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.connected = True
+        self.fallback = RandomAi()
+        self.watcher = None  # task dropping the seat from its table if it leaves while waiting
+
+    def send(self, message):
+        if self.connected:
+            self.writer.write((json.dumps(message) + "\n").encode())
+
+    async def ask(self, prompt, field, valid):
+        self.send(prompt)
+        # One deadline for the whole prompt, so invalid answers do not buy the client more time
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while self.connected:
+            try:
+                await self.writer.drain()
+                line = await asyncio.wait_for(self.reader.readline(), max(0.0, deadline - loop.time()))
+            except (asyncio.TimeoutError, ConnectionError, ValueError):
+                line = b""
+            if not line:
+                self.connected = False
+                break
+            try:
+                value = json.loads(line)[field]
+            except (ValueError, KeyError, TypeError):
+                value = None
+            if value in valid:
+                return value
+            self.send({"event": "error", "message": f"expected {field} out of {valid}"})
+        return None
+
+    async def decide(self, kind, args):
+        if kind == BID:
+            hand, total_bid, total_bids, num_players, round_num = args
+            allowed = [bid for bid in range(round_num + 1)
+                       if (total_bids < num_players - 1 or total_bid + bid != round_num)]
+            answer = await self.ask({"event": "bid", "hand": hand, "allowed": allowed}, "bid", allowed)
+            return answer if answer is not None else self.fallback.bid(*args)
+        state = args[0]
+        scratch = to_compact_state(state)
+        playable = [card_str(card) for card in scratch.getLegalActions()]
+        hand = [card_str(card) for card in scratch.player_hands[scratch.curr_player_index]]
+        answer = await self.ask({"event": "play", "hand": hand, "playable": playable}, "card", playable)
+        return answer if answer is not None else self.fallback.play(state)
+
+    def close(self):
+        self.connected = False
+        self.writer.close()
+
+
+class RemoteObserver(GameObserver):
+    """
+    Sends every public game event, and each seat's own hand, to the table's remote seats.
+    """
+    def __init__(self, seats):
+        self.seats = seats  # {player id: RemoteSeat}
+
+    def broadcast(self, message):
+        for seat in self.seats.values():
+            seat.send(message)
+
+    def bidding_started(self, game):
+        for player in game.players:
+            if player.id in self.seats:
+                self.seats[player.id].send({"event": "round_started", "round": game.round, "hand": player.hand})
+
+    def bid_made(self, game, player, bid):
+        self.broadcast({"event": "bid_made", "player": player.name, "bid": bid})
+
+    def card_played(self, game, player, card):
+        self.broadcast({"event": "card_played", "player": player.name, "card": card})
+
+    def trick_won(self, game, winner, trick):
+        self.broadcast({"event": "trick_won", "player": winner.name})
+
+    def round_scored(self, game, player, bid, tricks_won, score):
+        self.broadcast({"event": "round_scored", "player": player.name, "bid": bid, "tricks": tricks_won, "score": score})
+
+    def game_ended(self, game, standings):
+        self.broadcast({"event": "game_ended", "standings": [{"player": p.name, "score": p.total_score} for p in standings]})
+
+
+_worker_agents = {}
+
+def _ai_decision(player_type, kind, args, mc_bidding=False, endgame=None):
+    """
+    Makes one AI decision in a pool worker, with that process's agent for player_type. Agents
+    are shared by every table and seat the worker serves, so they are the stateless ones of
+    configured_agent.
+    """
+    key = (player_type, mc_bidding, endgame)
+    agent = _worker_agents.get(key)
+    if agent is None:
+        num_players = args[3] if kind == BID else len(args[0].hands)
+        agent = _worker_agents[key] = configured_agent(player_type, mc_bidding, endgame, num_players)
+    return agent.bid(*args) if kind == BID else agent.play(*args)
+
+
+class TableServer:
+    """
+    Hosts many SpadesGame tables on one asyncio event loop. Every table drives its game through
+    SpadesGame.game_turns: remote seats answer over their connection, and AI decisions run in a
+    shared process pool, so a long search never stalls the loop or the other tables. Agents of
+    the types in inline_types (by default only the random agent, which decides in microseconds)
+    answer in the loop instead, saving the round trip to a worker. latency records the time
+    every turn took, from the request to the answer, and the loop's scheduling lag.
+
+    game_args are SpadesGame's positional arguments for every table (text output is always off);
+    remote seats take the manual seats of a table, which starts once they are all filled.
+    """
+    def __init__(self, game_args, workers=None, inline_types=(PlayerType.RANDOM,), human_timeout=HUMAN_TIMEOUT,
+                 service=None, turn_deadline=None):
+        self.game_args = list(game_args)
+        self.game_args[7] = True
+        self.num_manual = self.game_args[0]
+        self.mc_bidding = len(self.game_args) > 10 and self.game_args[10]
+        self.endgame = self.game_args[11] if len(self.game_args) > 11 else None
+        # A decision_service.DecisionService, when given, replaces the process pool and applies
+        # turn_deadline (seconds) to every AI turn it answers
+        self.service = service
+        self.turn_deadline = turn_deadline
+        self.executor = ProcessPoolExecutor(max_workers=workers) if service is None else None
+        self.inline_types = set(inline_types)
+        self.human_timeout = human_timeout
+        self.latency = TurnLatency()
+        self.tables_running = 0
+        self.games_played = 0
+        self.results = deque(maxlen=1000)
+        self._waiting = {}  # table name: remote seats joined so far
+        self._next_table = 0
+
+    def table_name(self):
+        self._next_table += 1
+        return f"table-{self._next_table}"
+
+    async def decide(self, game, player, kind, args, seats):
+        seat = seats.get(player.id)
+        if seat is not None:
+            return await seat.decide(kind, args), "human"
+        if player.type in self.inline_types:
+            # Let the other tables run between turns, or an all-inline table would hold the loop
+            await asyncio.sleep(0)
+            return game.decide(player, kind, args), "inline"
+        if self.service is not None:
+            deadline = None if self.turn_deadline is None else time.time() + self.turn_deadline
+            answer, _ = await self.service.request(player.type, kind, args, deadline)
+            return answer, "ai"
+        loop = asyncio.get_running_loop()
+        answer = await loop.run_in_executor(self.executor, _ai_decision, player.type, kind, args,
+                                            self.mc_bidding, self.endgame)
+        return answer, "ai"
+
+    async def play_table(self, seats=None, name=None, game_args=None):
+        """
+        Plays one game; seats are the RemoteSeats of the manual seats in order. Returns
+        SpadesGame.result().
+        """
+        seats = seats or []
+        name = name or self.table_name()
+        game = SpadesGame(*(game_args or self.game_args))
+        manual = [player for player in game.players if player.type == PlayerType.MANUAL]
+        by_id = {player.id: seat for player, seat in zip(manual, seats)}
+        # Only inline agents decide here; the others must not cost a local agent (a MaxNAi's
+        # transposition table alone is megabytes) just to receive the game's hooks
+        for player in game.players:
+            player.remote = player.id in by_id or player.type not in self.inline_types
+        game.observers.append(RemoteObserver(by_id))
+        for player in manual:
+            if player.id in by_id:
+                by_id[player.id].send({"event": "seated", "table": name, "seat": game.players.index(player),
+                                       "players": [p.name for p in game.players]})
+
+        self.tables_running += 1
+        try:
+            turns = game.game_turns()
+            answer = None
+            while True:
+                try:
+                    player, kind, args = turns.send(answer)
+                except StopIteration:
+                    break
+                start = time.perf_counter()
+                answer, source = await self.decide(game, player, kind, args, by_id)
+                self.latency.record(f"{source} {kind}", time.perf_counter() - start)
+        finally:
+            self.tables_running -= 1
+        self.games_played += 1
+        result = game.result()
+        self.results.append(result)
+        return result
+
+    def ai_game_args(self):
+        """
+        game_args for a table with random agents in the remote seats.
+        """
+        game_args = list(self.game_args)
+        game_args[1] += game_args[0]
+        game_args[0] = 0
+        return game_args
+
+    async def run_ai_table(self, num_games):
+        name = self.table_name()
+        game_args = self.ai_game_args()
+        for _ in range(num_games):
+            await self.play_table(name=name, game_args=game_args)
+
+    async def handle_client(self, reader, writer):
+        """
+        A connection first sends {"join": table name} to sit at that table, or {} for the next
+        table with an open seat, then plays through one game.
+        """
+        seat = RemoteSeat(reader, writer, self.human_timeout)
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.human_timeout)
+            request = json.loads(line) if line.strip() else {}
+            name = request.get("join") or next(iter(self._waiting), None) or self.table_name()
+        except (asyncio.TimeoutError, ConnectionError, ValueError, AttributeError):
+            seat.close()
+            return
+        waiting = self._waiting.setdefault(name, [])
+        waiting.append(seat)
+        if len(waiting) < self.num_manual:
+            seat.send({"event": "waiting", "table": name, "seats_open": self.num_manual - len(waiting)})
+            seat.watcher = asyncio.create_task(self.drop_on_disconnect(name, seat))
+            return
+        del self._waiting[name]
+        watchers = [other.watcher for other in waiting if other.watcher is not None]
+        for watcher in watchers:
+            watcher.cancel()
+        # The seats' readers must be free before the game asks them anything
+        await asyncio.gather(*watchers, return_exceptions=True)
+        try:
+            await self.play_table(waiting, name)
+        finally:
+            for seat in waiting:
+                seat.close()
+
+    async def drop_on_disconnect(self, name, seat):
+        """
+        Reads (and ignores) what a waiting seat sends until its table fills, which cancels this,
+        or until it disconnects, which frees its place at the table.
+        """
+        try:
+            while await seat.reader.readline():
+                pass
+        except (ConnectionError, ValueError):
+            pass
+        waiting = self._waiting.get(name)
+        if waiting is not None and seat in waiting:
+            waiting.remove(seat)
+            if not waiting:
+                del self._waiting[name]
+        seat.close()
+
+    async def watch_loop_lag(self, interval=LAG_INTERVAL):
+        """
+        Records how late the loop wakes a sleeper, which grows whenever a turn blocks it.
+        """
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.latency.record("loop lag", time.perf_counter() - start - interval)
+
+    def metrics(self):
+        metrics = {"tables_running": self.tables_running, "games_played": self.games_played,
+                   "latency": self.latency.summary()}
+        if self.service is not None:
+            metrics["service"] = self.service.metrics()
+        return metrics
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+async def bot_client(host, port, table=None, seed=None):
+    """
+    A stand-in remote player: joins a table and answers every prompt with a random legal
+    move. Returns the final standings.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write((json.dumps({"join": table} if table else {}) + "\n").encode())
+    standings = None
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        message = json.loads(line)
+        if message["event"] == "bid":
+            writer.write((json.dumps({"bid": rng.choice(message["allowed"])}) + "\n").encode())
+        elif message["event"] == "play":
+            writer.write((json.dumps({"card": rng.choice(message["playable"])}) + "\n").encode())
+        elif message["event"] == "game_ended":
+            standings = message["standings"]
+    writer.close()
+    return standings
+
+
+def print_metrics(server, elapsed):
+    metrics = server.metrics()
+    print(f"{elapsed:.1f}s: {metrics['tables_running']} tables running, {metrics['games_played']} games played")
+    print(f"  {'turn':<12} {'turns':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, row in metrics["latency"].items():
+        print(f"  {kind:<12} {row['turns']:>8} {row['mean_ms']:>9.2f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+              f"{row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    if "service" in metrics:
+        print("  service: " + ", ".join(f"{name} {value}" for name, value in metrics["service"].items()))
+
+
+async def main(args):
+    game_args = (args.manual, args.random, args.maxn, args.expectimax, args.montecarlo, args.rounds, 0, True,
+                 args.ismcts, False, args.mc_bid, args.endgame)
+    service = None
+    if args.service:
+        num_players = args.manual + args.random + args.maxn + args.expectimax + args.montecarlo + args.ismcts
+        service = DecisionService(args.workers, batch_size=args.batch, max_pending=args.max_pending,
+                                  mc_bidding=args.mc_bid, endgame=args.endgame, num_players=num_players)
+    server = TableServer(game_args, args.workers, human_timeout=args.human_timeout, service=service,
+                         turn_deadline=args.deadline)
+    start = time.perf_counter()
+    lag = asyncio.create_task(server.watch_loop_lag())
+
+    async def report():
+        while True:
+            await asyncio.sleep(args.report)
+            print_metrics(server, time.perf_counter() - start)
+
+    reporter = asyncio.create_task(report()) if args.report else None
+    try:
+        if args.manual:
+            listener = await asyncio.start_server(server.handle_client, args.host, args.port)
+            print(f"Serving tables with {args.manual} remote seat(s) on {args.host}:{args.port}")
+        work = []
+        if args.tables:
+            work += [server.run_ai_table(args.games) for _ in range(args.tables)]
+        if args.manual and args.bots:
+            work += [bot_client(args.host, args.port, seed=i) for i in range(args.bots)]
+        if work:
+            await asyncio.gather(*work)
+        elif args.manual:
+            await listener.serve_forever()
+    finally:
+        lag.cancel()
+        if reporter is not None:
+            reporter.cancel()
+        print_metrics(server, time.perf_counter() - start)
+        server.close()
+        if service is not None:
+            service.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Host many Spades tables on one asyncio event loop.")
+    parser.add_argument("-m", "--manual", type=int, default=1, help="Remote seats per table (0 for no listener).")
+    parser.add_argument("-r", "--random", type=int, default=0, help="AI agents (Random) per table.")
+    parser.add_argument("-x", "--maxn", type=int, default=0, help="AI agents (MaxN) per table.")
+    parser.add_argument("-e", "--expectimax", type=int, default=0, help="AI agents (Expectimax) per table.")
+    parser.add_argument("-mcts", "--montecarlo", type=int, default=0, help="AI agents (Monte Carlo Tree Search) per table.")
+    parser.add_argument("-is", "--ismcts", type=int, default=0, help="AI agents (Information Set MCTS) per table.")
+    parser.add_argument("-n", "--rounds", type=int, default=10, help="Number of rounds (1-13).")
+    parser.add_argument("-t", "--tables", type=int, default=0, help="AI-only tables to host alongside the listener.")
+    parser.add_argument("-g", "--games", type=int, default=1, help="Games played by each AI-only table.")
+    parser.add_argument("--bots", type=int, default=0, help="Connect this many random stand-in players to the listener.")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes for AI turns.")
+    parser.add_argument("--service", action="store_true", help="Answer AI turns with a pinned, pre-warmed DecisionService.")
+    parser.add_argument("--deadline", type=float, default=None, help="Seconds an AI turn may take (with --service).")
+    parser.add_argument("--batch", type=int, default=32, help="Most Expectimax turns coalesced into one batch (with --service).")
+    parser.add_argument("--max-pending", type=int, default=None, help="AI turns in flight before tables wait (with --service).")
+    parser.add_argument("-b", "--mc-bid", action="store_true", help="AI agents bid by Monte Carlo simulation (needs NumPy).")
+    parser.add_argument("--endgame", default=None, help="Endgame table file for the AI agents (needs NumPy).")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument("--human-timeout", type=float, default=HUMAN_TIMEOUT, help="Seconds a remote seat gets per turn.")
+    parser.add_argument("--report", type=float, default=0, help="Print metrics every this many seconds.")
+    args = parser.parse_args()
+    if args.manual + args.random + args.maxn + args.expectimax + args.montecarlo + args.ismcts < 2:
+        parser.error("a table needs at least two seats")
+    asyncio.run(main(args))
@@ -1,6 +1,9 @@
-from util import card_to_suit, card_to_rank
+from cards import CARD_BIT, CARD_IDS, CARD_STRS, CARD_STR_SUIT, cards_to_mask, drop_equivalent, trick_winner
+
+ALL_CARDS = frozenset(CARD_STRS)
+
 class GameState:
-    def __init__(self, round, player_hands, curr_player_index, cards_played_round, cards_played_trick, trump_broken, bids, tricks_won):
+    def __init__(self, round, player_hands, curr_player_index, cards_played_round, cards_played_trick, trump_broken, bids, tricks_won, voids=None):
         self.round = round
         self.player_hands = player_hands
         self.curr_player_index = curr_player_index
@@ -9,12 +12,22 @@ class GameState:
         self.trump_broken = trump_broken
         self.bids = bids
         self.tricks_won = tricks_won
+        # Suits each player has shown they are out of by not following suit this round
+        self.voids = voids if voids is not None else [set() for _ in player_hands]
     
     def getNumPlayers(self):
         return len(self.player_hands)
 
-    def getLegalActions(self):
+    def getLegalActions(self, distinct=False):
+        """
+        With distinct, cards equivalent to a lower playable card given cards_played_round are
+        left out (see cards.drop_equivalent).
+        """
         playable = playable_cards(self)
+        if distinct and playable:
+            trick = {card for card in self.cards_played_trick if card is not None}
+            kept = drop_equivalent(cards_to_mask(playable), cards_to_mask(self.cards_played_round - trick))
+            return [card for card in playable if kept & CARD_BIT[CARD_IDS[card]]]
         if len(playable) > 0:
             return playable
         else:
@@ -39,7 +52,8 @@ class GameState:
         new_cards_played_trick[self.curr_player_index] = cardPlayed
         new_tricks_won = self.tricks_won[:]
         if None not in new_cards_played_trick:
-            winner_index = self.score_trick(new_cards_played_trick, self.curr_player_index)
+            # The card just played completed the trick, so its leader is the next seat
+            winner_index = self.score_trick(new_cards_played_trick, (self.curr_player_index + 1) % len(self.player_hands))
             new_tricks_won[winner_index] += 1
             new_cards_played_trick = [None] * len(self.player_hands)
 
@@ -50,34 +64,14 @@ class GameState:
             (self.curr_player_index + 1) % len(self.player_hands),
             new_cards_played_round,
             new_cards_played_trick,
-            self.trump_broken or (card_to_suit(cardPlayed) == 'S'),
+            self.trump_broken or (CARD_STR_SUIT[cardPlayed] == 'S'),
             self.bids,
-            new_tricks_won
+            new_tricks_won,
+            self.voids
         )
     
     def score_trick(self, trick, starting_player_index):
-        starting_card = trick[starting_player_index]
-        starting_rank = card_to_rank(starting_card)
-
-        winning_suit = card_to_suit(starting_card)
-        winner_index = starting_player_index
-        winning_rank = starting_rank
-
-        for i in range(len(trick) - 1):
-            player_index = (starting_player_index + i + 1) % len(self.player_hands)
-            card = trick[player_index]
-            card_rank = card_to_rank(card)
-            card_suit = card_to_suit(card)
-
-            if card_suit == 'S':
-                if winning_suit != 'S' or card_rank > winning_rank:
-                    winner_index = player_index
-                    winning_suit = 'S'
-                    winning_rank = card_rank
-            elif card_suit == winning_suit and card_rank > winning_rank:
-                winner_index = player_index
-                winning_rank = card_rank
-        return winner_index
+        return trick_winner([CARD_IDS[card] for card in trick], starting_player_index)
 
     def clone(self):
         return GameState(
@@ -88,7 +82,8 @@ class GameState:
             self.cards_played_trick[:],
             self.trump_broken,
             self.bids[:],
-            self.tricks_won[:]
+            self.tricks_won[:],
+            [voids.copy() for voids in self.voids]
         )
 
 
@@ -100,32 +95,25 @@ class PlayerState:
         self.cards = cards if cards is not None else []
 
 
-def create_game_state(game, cards_played_trick, current_player_index, trump_broken):
-    player_hands = [player.hand for player in game.players] # Note if non-observable, other players hands should be hidden
-    player_bids = [player.bid_amount for player in game.players]
-    player_tricks_won = [player.trick_amount for player in game.players]
-    return GameState(game.round, player_hands, current_player_index, game.cards_played_round, cards_played_trick, trump_broken, player_bids, player_tricks_won)
-
 def playable_cards(gameState: GameState):
     player_hand = gameState.player_hands[gameState.curr_player_index]
     
     if player_hand is None:
-        all_cards = {f"{rank}{suit}" for rank in '23456789TJQKA' for suit in 'CDHS'}
-        played_cards = set(gameState.cards_played_round + gameState.cards_played_trick)
-        card_pool = list(all_cards - played_cards)
+        played_cards = gameState.cards_played_round.union(card for card in gameState.cards_played_trick if card is not None)
+        card_pool = list(ALL_CARDS - played_cards)
     else:
         card_pool = player_hand
 
     if all(card is None for card in gameState.cards_played_trick):
-        all_spades = all(card_to_suit(card) == 'S' for card in card_pool)
+        all_spades = all(CARD_STR_SUIT[card] == 'S' for card in card_pool)
         if not gameState.trump_broken and not all_spades:
-            card_pool = [card for card in card_pool if card_to_suit(card) != 'S']
+            card_pool = [card for card in card_pool if CARD_STR_SUIT[card] != 'S']
         return card_pool
     else:
         num_non_none = sum([1 for card in gameState.cards_played_trick if card is not None])
         start_index = (gameState.curr_player_index - num_non_none) % len(gameState.player_hands)
-        lead_suit = card_to_suit(gameState.cards_played_trick[start_index])
-        playable = [card for card in card_pool if card_to_suit(card) == lead_suit]
+        lead_suit = CARD_STR_SUIT[gameState.cards_played_trick[start_index]]
+        playable = [card for card in card_pool if CARD_STR_SUIT[card] == lead_suit]
         if len(playable) == 0:
             return card_pool
         else:
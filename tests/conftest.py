@@ -0,0 +1,24 @@
+import os
+import random
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cards import NO_CARD, NUM_CARDS
+from compact_state import CompactGameState
+
+
+@pytest.fixture
+def deal():
+    """
+    deal(num_players, round_size, seed) returns the start of a round as a CompactGameState, with
+    seat 0 to lead and every player bidding 1.
+    """
+    def deal(num_players=4, round_size=5, seed=0):
+        cards = random.Random(seed).sample(range(NUM_CARDS), num_players * round_size)
+        hands = [sum(1 << card for card in cards[seat * round_size:(seat + 1) * round_size])
+                 for seat in range(num_players)]
+        return CompactGameState(round_size, hands, 0, 0, [NO_CARD] * num_players, 0, 0, False,
+                                [1] * num_players, [0] * num_players)
+    return deal
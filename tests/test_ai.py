@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from ai import ExpectimaxAi, MaxNAi, RandomAi
+
+
+def test_seeded_playouts_replay(deal):
+    state = deal(4, 6, 4)
+    first, second, other = ExpectimaxAi(seed=7), ExpectimaxAi(seed=7), ExpectimaxAi(seed=8)
+    playouts = [[agent.simulate_random_playout(state) for _ in range(20)] for agent in (first, second, other)]
+    assert playouts[0] == playouts[1] != playouts[2]
+
+
+def test_seeded_batch_playouts_replay(deal):
+    pytest.importorskip("numpy")
+    state = deal(4, 6, 4)
+    action = state.getLegalActions()[0]
+    values = [ExpectimaxAi(seed=seed).batch_expected_utilities(state, action) for seed in (7, 7, 8)]
+    assert values[0] == values[1] != values[2]
+
+
+def test_seeded_agents_play_the_same_cards(deal):
+    for make in (lambda seed: RandomAi(seed), lambda seed: ExpectimaxAi(depth=2, seed=seed),
+                 lambda seed: MaxNAi(time_limit=0, seed=seed)):
+        for seed in range(3):
+            random.seed(seed)
+            first = [make(seed).play(deal(4, 8, game)) for game in range(4)]
+            random.seed(seed + 1)
+            assert [make(seed).play(deal(4, 8, game)) for game in range(4)] == first
+
+
+def test_evaluation_scores_a_finished_round_like_utility(deal):
+    from ai import evaluate_state
+    state = deal(4, 2, 0)
+    state.hands = [0] * 4
+    state.bids = [0, 1, 1, 2]
+    state.tricks_won = [0, 1, 0, 1]
+    assert evaluate_state(state) == MaxNAi().utility(state) == (10, 10, -1, -1)
+
+
+def test_iterative_deepening_ends_on_the_exhaustive_move(deal):
+    for seed in range(4):
+        state = deal(4, 4, seed)
+        records = []
+        deepening = MaxNAi(time_limit=30, seed=0)
+        deepening.recorder = records.append
+        assert deepening.play(state.clone()) == MaxNAi(time_limit=None).play(state.clone())
+        assert records[0]["depth"] == 16
+
+
+def test_depth_limited_search_plays_a_legal_card(deal):
+    from cards import CARD_STRS
+    state = deal(4, 13, 1)
+    card = MaxNAi(depth=4, time_limit=None).play(state.clone())
+    assert card in [CARD_STRS[action] for action in state.getLegalActions()]
@@ -0,0 +1,36 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai import MCTSAi
+from array_tree import ArrayTree
+
+
+def test_growing_keeps_every_node():
+    tree = ArrayTree(capacity=4)
+    tree.expand(0, [5, 7, 9])
+    tree.expand(2, [1, 2, 3, 4])
+    tree.backpropagate([0, 2, 6], 3, 2)
+    assert tree.size == 8 and len(tree.visits) >= 8
+    assert tree.root_visits() == {5: 0, 7: 3, 9: 0}
+    assert list(tree.parent[4:8]) == [2, 2, 2, 2] and list(tree.action[4:8]) == [1, 2, 3, 4]
+    assert tree.wins[6] == 2 and tree.visits[6] == 3
+
+
+def test_select_child_tries_unvisited_children_first():
+    tree = ArrayTree()
+    tree.expand(0, [0, 1, 2])
+    tree.backpropagate([0, 1], 1, 1)
+    assert tree.select_child(0) == 2
+    tree.backpropagate([0, 2], 1, 0)
+    tree.backpropagate([0, 3], 1, 0)
+    assert tree.select_child(0) == 1
+
+
+def test_array_search_counts_every_iteration(deal):
+    state = deal(4, 6, 7)
+    agent = MCTSAi(num_samples=400, budget='iterations', tree='array', seed=3)
+    card = agent.play(state.clone())
+    tree = agent.search_array(state.clone(), None)
+    assert sum(tree.root_visits().values()) == 400
+    assert card == MCTSAi(num_samples=400, budget='iterations', tree='array', seed=3).play(state.clone())
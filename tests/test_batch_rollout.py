@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai import ExpectimaxAi, MADE_BID
+from batch_rollout import batch_playouts_many, batch_random_playouts, batch_utilities, random_cards
+from rollout import random_playout
+
+
+def test_random_cards_are_uniform():
+    mask = 0b1011001000101
+    cards = random_cards(np.full(20000, mask, dtype=np.uint64), np.random.default_rng(0))
+    counts = np.bincount(cards, minlength=13)
+    assert set(np.flatnonzero(counts)) == {0, 2, 6, 9, 10, 12}
+    assert np.all(np.abs(counts[counts > 0] / 20000 - 1 / 6) < 0.015)
+
+
+def test_last_cards_play_out_like_the_scalar_rollout(deal):
+    for seed in range(20):
+        state = deal(4, 1, seed)
+        expected = random_playout(state, lambda terminal: tuple(terminal.tricks_won))
+        assert (batch_random_playouts(state, 8, np.random.default_rng(seed)) == expected).all()
+
+
+def test_batch_matches_scalar_playouts_on_average(deal):
+    state = deal(4, 6, 2)
+    state.play(state.getLegalActions()[0])
+    batch = batch_random_playouts(state, 20000, np.random.default_rng(1))
+    assert (batch.sum(axis=1) == 6).all()
+    rng = random.Random(1)
+    scalar = np.array([random_playout(state, lambda terminal: tuple(terminal.tricks_won), rng) for _ in range(20000)])
+    assert np.all(np.abs(batch.mean(axis=0) - scalar.mean(axis=0)) < 0.05)
+
+
+def test_batch_playouts_many_keeps_state_order(deal):
+    states = [deal(4, 3, 0), deal(4, 5, 1), deal(4, 3, 2)]
+    states[1].play(states[1].getLegalActions()[0])
+    outcomes = batch_playouts_many(states, 10, np.random.default_rng(0))
+    assert [outcome.sum(axis=1).tolist() for outcome in outcomes] == [[3] * 10, [5] * 10, [3] * 10]
+
+
+def test_batch_utilities_match_the_agents(deal):
+    state = deal(4, 5, 3)
+    state.bids = [0, 1, 2, 3]
+    tricks_won = batch_random_playouts(state, 50, np.random.default_rng(0))
+    utility = ExpectimaxAi().utility
+    for row, utilities in zip(tricks_won, batch_utilities(tricks_won, state.bids, MADE_BID)):
+        state.tricks_won = row.tolist()
+        assert tuple(utilities) == utility(state)
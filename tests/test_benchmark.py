@@ -0,0 +1,28 @@
+from benchmark import compare, make_positions, run_benchmarks
+
+
+def measurement(value, higher_is_better):
+    return {"value": value, "median": value, "unit": "", "higher_is_better": higher_is_better}
+
+
+def test_compare_flags_slowdowns_either_way_round():
+    baseline = {"results": {"successor": {"5": measurement(2.0, False)}, "game": {"5": measurement(10.0, True)}}}
+    report = {"results": {"successor": {"5": measurement(1.0, False), "7": measurement(1.0, False)},
+                          "game": {"5": measurement(8.0, True)}}}
+    rows, regressions = compare(report, baseline)
+    assert rows == [("successor", "5", 2.0, 1.0, 2.0), ("game", "5", 10.0, 8.0, 0.8)]
+    assert regressions == [rows[1]]
+    assert compare(report, baseline, tolerance=0.25)[1] == []
+
+
+def test_positions_are_seeded():
+    hands = [[compact.hands for _, compact in make_positions(6, 1, count=10)] for _ in range(2)]
+    assert hands[0] == hands[1]
+
+
+def test_report_holds_a_measurement_per_round_size():
+    report = run_benchmarks(["compact_successor"], [3, 5], repeat=1)
+    results = report["results"]["compact_successor"]
+    assert sorted(results) == ["3", "5"]
+    assert all(result["value"] > 0 and result["unit"] == "ops/s" for result in results.values())
+    assert compare(report, report)[1] == []
@@ -0,0 +1,36 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bidder import MonteCarloBidder, hand_shape
+from cards import cards_to_mask
+
+
+def test_hand_shape_ignores_spot_cards_and_side_suit_order():
+    hand = cards_to_mask(["AS", "3S", "KH", "4H", "9D"])
+    assert hand_shape(hand, 5, 4) == hand_shape(cards_to_mask(["AS", "7S", "KD", "2D", "9H"]), 5, 4)
+    assert hand_shape(hand, 5, 4) != hand_shape(cards_to_mask(["AH", "3H", "KS", "4S", "9D"]), 5, 4)
+    assert hand_shape(hand, 5, 4) != hand_shape(cards_to_mask(["AS", "3S", "QH", "4H", "9D"]), 5, 4)
+    assert hand_shape(hand, 5, 4) != hand_shape(hand, 5, 3)
+
+
+def test_certain_tricks_are_bid():
+    bidder = MonteCarloBidder(samples=256, seed=0)
+    distribution = bidder.trick_distribution(cards_to_mask(["AS"]), 1, 4)
+    assert distribution.tolist() == [0.0, 1.0]
+    assert bidder.bid(cards_to_mask(["AS"]), 0, 0, 4, 1) == 1
+    # Unless it is the dealer's bid that would make the bids add up
+    assert bidder.bid(cards_to_mask(["AS"]), 0, 3, 4, 1) == 0
+
+
+def test_shapes_are_simulated_once_and_saved(tmp_path):
+    bidder = MonteCarloBidder(samples=256, seed=0)
+    hands = [cards_to_mask(["AS", "KH", "2D"]), cards_to_mask(["AS", "KD", "3H"]), cards_to_mask(["2C", "3C", "4C"])]
+    bidder.precompute(hands, 3, 4)
+    assert (bidder.misses, bidder.hits) == (2, 1)
+    assert all(abs(distribution.sum() - 1) < 1e-9 for distribution in bidder.cache.values())
+    bidder.save(tmp_path / "bids.json")
+    loaded = MonteCarloBidder(seed=1)
+    loaded.load(tmp_path / "bids.json")
+    assert loaded.bid(hands[0], 1, 2, 4, 3) == bidder.bid(hands[0], 1, 2, 4, 3)
+    assert loaded.misses == 0 and loaded.hit_rate() == 1.0
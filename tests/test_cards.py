@@ -0,0 +1,44 @@
+import random
+from ai import MaxNAi
+from cards import CARD_BIT, CARD_IDS, NO_CARD, cards_to_mask, drop_equivalent, mask_to_cards
+from compact_state import CompactGameState
+
+
+def test_drop_equivalent_keeps_lowest_of_adjacent_ranks():
+    hand = cards_to_mask(["9H", "10H", "JH", "KH", "2C"])
+    assert mask_to_cards(drop_equivalent(hand, 0)) == ["9H", "KH", "2C"]
+
+
+def test_drop_equivalent_bridges_cards_out_of_play():
+    hand = cards_to_mask(["9H", "JH"])
+    assert mask_to_cards(drop_equivalent(hand, 0)) == ["9H", "JH"]
+    assert mask_to_cards(drop_equivalent(hand, CARD_BIT[CARD_IDS["10H"]])) == ["9H"]
+
+
+def test_drop_equivalent_keeps_suits_apart():
+    # AH and 2C are adjacent card ids but never equivalent
+    hand = cards_to_mask(["AH", "2C"])
+    assert drop_equivalent(hand, 0) == hand
+
+
+def test_card_in_current_trick_is_not_out_of_play():
+    # 10H is on the table, so whoever plays next can still beat it with JH but not with 9H
+    hands = [cards_to_mask(["9H", "JH", "2C"]), cards_to_mask(["3C", "4C"])]
+    trick = [NO_CARD, CARD_IDS["10H"]]
+    state = CompactGameState(2, hands, 0, CARD_BIT[CARD_IDS["10H"]], trick, 1, 1, False, [1, 1], [0, 0])
+    assert [mask_to_cards(1 << card)[0] for card in state.getLegalActions(True)] == ["9H", "JH"]
+
+
+def test_distinct_moves_leave_maxn_value_unchanged(deal):
+    for seed in range(10):
+        state = deal(3, 4, seed)
+        state.bids = [random.Random(seed).randint(0, 4) for _ in state.hands]
+        me = state.curr_player_index
+        values = []
+        for distinct in (False, True):
+            scratch = state.clone()
+            scratch.enable_zobrist()
+            agent = MaxNAi(depth=None, time_limit=None, distinct_moves=distinct)
+            _, root_utilities = agent.search_root(scratch, 12)
+            values.append(max(utility[me] for _, utility in root_utilities))
+        assert values[0] == values[1]
@@ -0,0 +1,80 @@
+import random
+import pytest
+
+
+def snapshot(state):
+    return (state.hands[:], state.curr_player_index, state.played_mask, state.trick[:], state.trick_size,
+            state.lead_index, state.trump_broken, state.tricks_won[:])
+
+
+@pytest.mark.parametrize("num_players,round_size", [(2, 7), (3, 6), (4, 5), (4, 13)])
+def test_undo_move_restores_every_ply(deal, num_players, round_size):
+    for seed in range(10):
+        state = deal(num_players, round_size, seed)
+        rng = random.Random(seed)
+        snapshots = []
+        while state.hands[state.curr_player_index]:
+            snapshots.append(snapshot(state))
+            state.do_move(rng.choice(state.getLegalActions()))
+        assert state.isTerminal()
+        assert sum(state.tricks_won) == round_size
+        for expected in reversed(snapshots):
+            state.undo_move()
+            assert snapshot(state) == expected
+
+
+def test_do_move_matches_generate_successor(deal):
+    for seed in range(10):
+        state = deal(4, 8, seed)
+        rng = random.Random(seed)
+        while state.hands[state.curr_player_index]:
+            action = rng.choice(state.getLegalActions())
+            successor = state.generateSuccessor(action)
+            state.do_move(action)
+            assert snapshot(state) == snapshot(successor)
+
+
+def test_zobrist_follows_moves_and_undo(deal):
+    from zobrist import zobrist_hash
+    for seed in range(10):
+        state = deal(4, 6, seed)
+        rng = random.Random(seed)
+        keys = [state.enable_zobrist()]
+        while state.hands[state.curr_player_index]:
+            state.do_move(rng.choice(state.getLegalActions()))
+            assert state.zobrist == zobrist_hash(state)
+            keys.append(state.zobrist)
+        for expected in reversed(keys[:-1]):
+            state.undo_move()
+            assert state.zobrist == expected
+
+
+
+@pytest.mark.parametrize("num_players,round_size", [(3, 6), (4, 13)])
+def test_game_state_round_trip_and_agreement(deal, num_players, round_size):
+    from cards import CARD_STRS, SUIT_MASKS
+    from compact_state import CompactGameState
+    for seed in range(5):
+        state = deal(num_players, round_size, seed)
+        rng = random.Random(seed)
+        state.void_masks = [SUIT_MASKS[seat % 4] if seat else 0 for seat in range(num_players)]
+        while state.hands[state.curr_player_index]:
+            game_state = state.to_game_state()
+            back = CompactGameState.from_game_state(game_state)
+            if state.trick_size:
+                assert snapshot(back) == snapshot(state)
+            else:
+                # lead_index only means something once the trick has a card in it
+                assert snapshot(back)[:5] + snapshot(back)[6:] == snapshot(state)[:5] + snapshot(state)[6:]
+            assert back.void_masks == state.void_masks
+            legal = state.getLegalActions()
+            assert game_state.getLegalActions() == [CARD_STRS[card] for card in legal]
+            assert ([CARD_STRS[card] for card in state.getLegalActions(distinct=True)] ==
+                    game_state.getLegalActions(distinct=True))
+            action = rng.choice(legal)
+            successor = CompactGameState.from_game_state(game_state.generateSuccessor(CARD_STRS[action]))
+            state.play(action)
+            # GameState hands the turn to the next seat even after a trick, so compare the rest
+            assert (successor.hands, successor.played_mask, successor.trick, successor.trump_broken,
+                    successor.tricks_won) == (state.hands, state.played_mask, state.trick, state.trump_broken,
+                                              state.tricks_won)
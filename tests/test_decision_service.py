@@ -0,0 +1,135 @@
+import asyncio
+import os
+import signal
+import time
+import pytest
+
+from cards import card_str
+from decision_service import DecisionService, ServiceBusy, WorkerLost
+from game import BID, PLAY
+from player import PlayerType
+
+
+@pytest.fixture
+def service():
+    services = []
+
+    def start(**kwargs):
+        kwargs.setdefault("workers", 1)
+        kwargs.setdefault("warm_types", ())
+        services.append(DecisionService(**kwargs))
+        return services[-1]
+
+    yield start
+    for started in services:
+        started.close()
+
+
+def legal_cards(state):
+    return {card_str(card) for card in state.getLegalActions()}
+
+
+def test_answers_bids_and_plays(service, deal):
+    svc = service()
+    state = deal(4, 5, 1)
+    card, stats = svc.submit(PlayerType.RANDOM, PLAY, (state,)).result(timeout=30)
+    assert card in legal_cards(state)
+    assert not stats["expired"]
+    assert svc.decide(PlayerType.RANDOM, BID, (["AS", "2H"], 0, 0, 4, 2)) in range(3)
+    assert svc.metrics()["completed"] == 2
+
+
+def test_full_service_pushes_back(service, deal):
+    svc = service(max_pending=1)
+    state = deal(4, 5, 2)
+    slow = svc.submit(PlayerType.MCTS, PLAY, (state,), deadline=time.time() + 0.5)
+    with pytest.raises(ServiceBusy):
+        svc.submit(PlayerType.RANDOM, PLAY, (state,), timeout=0.05)
+    assert slow.result(timeout=30)[0] in legal_cards(state)
+    # The slot is free again
+    assert svc.submit(PlayerType.RANDOM, PLAY, (state,), timeout=5).result(timeout=30)[0] in legal_cards(state)
+
+
+def test_past_deadline_gets_a_random_move(service, deal):
+    svc = service(max_pending=1)
+    state = deal(4, 5, 3)
+    card, stats = svc.submit(PlayerType.MCTS, PLAY, (state,), deadline=time.time() - 1).result(timeout=30)
+    assert card in legal_cards(state)
+    assert stats["expired"]
+
+    async def wait_behind(slow):
+        # No slot frees up before the deadline, so the waiting request expires instead
+        start = time.time()
+        card, stats = await svc.request(PlayerType.MCTS, PLAY, (state,), deadline=time.time() + 0.1)
+        assert time.time() - start < 0.4
+        await asyncio.wrap_future(slow)
+        return card, stats
+
+    slow = svc.submit(PlayerType.MCTS, PLAY, (state,), deadline=time.time() + 0.8)
+    card, stats = asyncio.run(wait_behind(slow))
+    assert card in legal_cards(state)
+    assert stats["expired"]
+    assert svc.metrics()["expired"] == 2
+
+
+def test_failing_request_fails_only_its_future(service, deal):
+    svc = service()
+    with pytest.raises(AttributeError):
+        svc.submit(PlayerType.EXPECTIMAX, PLAY, (None,)).result(timeout=30)
+    state = deal(4, 5, 4)
+    assert svc.submit(PlayerType.RANDOM, PLAY, (state,)).result(timeout=30)[0] in legal_cards(state)
+    metrics = svc.metrics()
+    assert metrics["failed"] == 1
+    assert metrics["in_flight"] == 0
+
+
+def test_failing_request_in_a_batch(service, deal):
+    svc = service(workers=1, warm_types=(PlayerType.EXPECTIMAX,))
+    states = [deal(4, 3, seed) for seed in range(3)]
+    # Held back until the worker is free, so all four go out as one batch
+    blocker = svc.submit(PlayerType.MCTS, PLAY, (states[0],), deadline=time.time() + 0.3)
+    futures = [svc.submit(PlayerType.EXPECTIMAX, PLAY, (state,)) for state in states]
+    bad = svc.submit(PlayerType.EXPECTIMAX, PLAY, (None,))
+    blocker.result(timeout=30)
+    for state, future in zip(states, futures):
+        assert future.result(timeout=30)[0] in legal_cards(state)
+    with pytest.raises(AttributeError):
+        bad.result(timeout=30)
+
+
+def test_dead_worker_is_replaced(service, deal):
+    svc = service()
+    state = deal(4, 5, 5)
+    busy = svc.submit(PlayerType.MCTS, PLAY, (state,), deadline=time.time() + 5)
+    time.sleep(0.2)
+    os.kill(svc.processes[0].pid, signal.SIGKILL)
+    with pytest.raises(WorkerLost):
+        busy.result(timeout=30)
+    assert svc.submit(PlayerType.RANDOM, PLAY, (state,)).result(timeout=60)[0] in legal_cards(state)
+    metrics = svc.metrics()
+    assert metrics["restarts"] == 1
+    assert metrics["in_flight"] == 0
+
+
+def test_dead_worker_is_noticed_while_others_reply(service, deal):
+    svc = service(workers=2)
+    state = deal(4, 5, 6)
+    busy = svc.submit(PlayerType.MCTS, PLAY, (state,), deadline=time.time() + 30)
+    time.sleep(0.2)
+    victim, = [index for index, assigned in enumerate(svc.assigned) if assigned]
+    os.kill(svc.processes[victim].pid, signal.SIGKILL)
+    # Keep the surviving worker answering throughout
+    start = time.time()
+    while not busy.done() and time.time() - start < 10:
+        svc.decide(PlayerType.RANDOM, BID, (["AS", "2H"], 0, 0, 4, 2))
+    with pytest.raises(WorkerLost):
+        busy.result(timeout=0)
+    assert svc.metrics()["restarts"] == 1
+
+
+def test_shared_agents_keep_no_tree():
+    from decision_service import configured_agent
+    for player_type in (PlayerType.MCTS, PlayerType.ISMCTS):
+        agent = configured_agent(player_type)
+        assert not agent.reuse_tree
+        assert agent.recorder is None
@@ -0,0 +1,69 @@
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai import MaxNAi
+from cards import NUM_RANKS, SUIT_MASKS, TRUMP_SUIT
+from compact_state import CompactGameState
+from endgame import EndgameTable
+
+
+def with_bids(state, seed):
+    rng = random.Random(seed)
+    state.bids = [rng.randint(0, state.round) for _ in state.hands]
+    return state
+
+
+def maxn_utilities(state):
+    """
+    Utilities of every root move under a plain, exhaustive MaxN search.
+    """
+    agent = MaxNAi(depth=None, time_limit=None, distinct_moves=False)
+    scratch = state.clone()
+    scratch.enable_zobrist()
+    cards_left = sum(hand.bit_count() for hand in scratch.hands)
+    _, root_utilities = agent.search_root(scratch, cards_left)
+    return dict(root_utilities)
+
+
+@pytest.mark.parametrize("num_players,round_size", [(2, 4), (3, 3), (4, 3)])
+def test_table_matches_exact_maxn(tmp_path, deal, num_players, round_size):
+    table = EndgameTable(str(tmp_path / "endgame.npy"), num_players, max_tricks=round_size, size_bits=12)
+    for seed in range(8):
+        state = with_bids(deal(num_players, round_size, seed), seed)
+        me = state.curr_player_index
+        utilities = maxn_utilities(state)
+        best = max(utility[me] for utility in utilities.values())
+        assert table.utilities(state)[me] == best
+        assert utilities[table.best_move(state)][me] == best
+
+
+def test_table_persists_across_opens(tmp_path, deal):
+    path = str(tmp_path / "endgame.npy")
+    state = with_bids(deal(4, 3, 1), 1)
+    table = EndgameTable(path, 4, max_tricks=3, size_bits=12)
+    expected = table.tricks(state)
+    table.flush()
+    reopened = EndgameTable(path, 4, max_tricks=3, size_bits=12, read_only=True)
+    assert reopened.lookup(state) == expected
+    assert reopened.table_hits == 1
+
+
+def test_swapping_non_trump_suits_shares_an_entry(tmp_path, deal):
+    table = EndgameTable(str(tmp_path / "endgame.npy"), 4, max_tricks=3, size_bits=12)
+    state = with_bids(deal(4, 3, 2), 2)
+    first, second = [suit for suit in range(len(SUIT_MASKS)) if suit != TRUMP_SUIT][:2]
+
+    def swap(mask):
+        a = (mask & SUIT_MASKS[first]) >> (first * NUM_RANKS)
+        b = (mask & SUIT_MASKS[second]) >> (second * NUM_RANKS)
+        rest = mask & ~SUIT_MASKS[first] & ~SUIT_MASKS[second]
+        return rest | a << (second * NUM_RANKS) | b << (first * NUM_RANKS)
+
+    swapped = CompactGameState(state.round, [swap(hand) for hand in state.hands], state.curr_player_index, 0,
+                               state.trick[:], 0, state.lead_index, state.trump_broken, state.bids[:],
+                               state.tricks_won[:])
+    expected = table.tricks(state)
+    table.front.clear()
+    assert table.lookup(swapped) == expected
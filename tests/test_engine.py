@@ -0,0 +1,44 @@
+from engine import run_game
+from observers import GameObserver
+
+
+class EventCounter(GameObserver):
+    def __init__(self):
+        self.cards = self.tricks = self.rounds = 0
+        self.scores = {}
+        self.standings = None
+
+    def card_played(self, game, player, card):
+        self.cards += 1
+
+    def trick_won(self, game, winner, trick):
+        self.tricks += 1
+
+    def round_ended(self, game):
+        self.rounds += 1
+
+    def round_scored(self, game, player, bid, tricks_won, score):
+        self.scores[player.id] = self.scores.get(player.id, 0) + score
+
+    def game_ended(self, game, standings):
+        self.standings = [player.id for player in standings]
+
+
+def test_headless_game_prints_nothing_and_reports_to_observers(capsys):
+    counter = EventCounter()
+    result = run_game(num_random=3, num_rounds=4, observers=[counter], seed=5, num_agents_min_max=1)
+    assert capsys.readouterr().out == ""
+    assert (counter.cards, counter.tricks, counter.rounds) == (4 * (4 + 3 + 2 + 1), 4 + 3 + 2 + 1, 4)
+    assert {player["id"]: player["score"] for player in result["players"]} == counter.scores
+    assert result["standings"] == counter.standings
+    assert sorted(player["type"] for player in result["players"]) == ["MaxN", "Random", "Random", "Random"]
+
+
+def test_seeded_games_replay():
+    assert run_game(num_rounds=5, seed=11) == run_game(num_rounds=5, seed=11)
+
+
+def test_rounds_below_the_skip_are_not_played():
+    counter = EventCounter()
+    run_game(num_rounds=5, observers=[counter], seed=2, skip_rounds_below=2)
+    assert (counter.rounds, counter.tricks) == (3, 5 + 4 + 3)
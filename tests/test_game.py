@@ -0,0 +1,69 @@
+from ai import RandomAi
+from game import SpadesGame
+
+
+class HookRecorder(RandomAi):
+    def __init__(self):
+        super().__init__(seed=0)
+        self.calls = []
+
+    def new_game(self, num_players, seat):
+        self.calls.append(("game", num_players, seat))
+
+    def new_round(self, round_num, hand):
+        self.calls.append(("round", round_num, len(hand)))
+
+    def card_observed(self, player_index, card, lead_card):
+        self.calls.append(("card", player_index))
+
+    def trick_completed(self, trick, starting_player_index, winner_index):
+        self.calls.append(("trick", winner_index))
+
+
+def test_each_player_keeps_one_agent_that_sees_the_whole_game():
+    game = SpadesGame(0, 4, 0, 0, 0, 3, 0, True)
+    agents = [HookRecorder() for _ in game.players]
+    for player, agent in zip(game.players, agents):
+        player.ai = agent
+    game.play_game()
+    assert [player.getAI() for player in game.players] == agents
+    for seat, agent in enumerate(agents):
+        kinds = [call[0] for call in agent.calls]
+        assert agent.calls[0] == ("game", 4, seat)
+        assert [call for call in agent.calls if call[0] == "round"] == [("round", 3, 3), ("round", 2, 2), ("round", 1, 1)]
+        assert kinds.count("card") == 4 * (3 + 2 + 1) and kinds.count("trick") == 3 + 2 + 1
+    # Cards and tricks are public, so after the deal every agent hears the same story
+    assert all(agent.calls[1:] == agents[0].calls[1:] for agent in agents)
+
+
+class StateChecker(RandomAi):
+    """
+    Checks every state it is asked to play against the players' own view of the game.
+    """
+    def __init__(self, game):
+        super().__init__(seed=1)
+        self.game = game
+        self.decisions = 0
+
+    def play(self, state):
+        from cards import CARD_IDS, cards_to_mask
+        players = self.game.players
+        assert state.hands == [cards_to_mask(player.hand) for player in players]
+        assert state.bids == [player.bid_amount for player in players]
+        assert state.tricks_won == [player.trick_amount for player in players]
+        assert state.round == self.game.round
+        card = super().play(state)
+        assert CARD_IDS[card] in state.getLegalActions()
+        # The state is the agent's own copy
+        state.play(CARD_IDS[card])
+        self.decisions += 1
+        return card
+
+
+def test_agents_get_the_canonical_state_of_the_round():
+    game = SpadesGame(0, 4, 0, 0, 0, 4, 0, True)
+    checkers = [StateChecker(game) for _ in game.players]
+    for player, checker in zip(game.players, checkers):
+        player.ai = checker
+    game.play_game()
+    assert sum(checker.decisions for checker in checkers) == 4 * (4 + 3 + 2 + 1)
@@ -0,0 +1,103 @@
+import pytest
+
+from ai import ISMCTSAi, MCTSAi
+from cards import CARD_IDS
+
+
+def test_tree_is_reused_for_the_same_seat(deal):
+    agent = MCTSAi(num_samples=300, budget='iterations', seed=1)
+    state = deal(4, 5, 1)
+    card = CARD_IDS[agent.play(state.clone())]
+    state.play(card)
+    # The opponents follow the most searched line
+    node = next(child for child in agent._root_node.children if child.action == card)
+    while state.curr_player_index != 0:
+        node = max(node.children, key=lambda child: child.visits)
+        state.play(node.action)
+    assert agent.reroot(state.clone()) is not None
+
+
+def test_tree_is_not_reused_for_another_seat(deal):
+    agent = MCTSAi(num_samples=300, budget='iterations', seed=1)
+    state = deal(4, 5, 1)
+    state.play(CARD_IDS[agent.play(state.clone())])
+    # The same agent is asked next for seat 1
+    assert state.curr_player_index == 1
+    assert agent.reroot(state.clone()) is None
+
+
+@pytest.mark.parametrize("options", [{"parallel": "root"}, {"tree": "array"}, {"reuse_tree": True}])
+def test_ismcts_rejects_options_it_cannot_honour(options):
+    with pytest.raises(ValueError):
+        ISMCTSAi(**options)
+
+
+def test_ismcts_plays_a_legal_card(deal):
+    from cards import CARD_STRS
+    agent = ISMCTSAi(num_samples=200, budget='iterations', seed=1)
+    state = deal(4, 5, 2)
+    assert agent.play(state.clone()) in [CARD_STRS[card] for card in state.getLegalActions()]
+
+
+def test_leaf_parallel_leaves_no_batch_running(deal, monkeypatch):
+    import ai
+    submitted = []
+    pool = ai.get_search_pool(2)
+
+    class RecordingPool:
+        def submit(self, *args):
+            future = pool.submit(*args)
+            submitted.append(future)
+            return future
+
+    monkeypatch.setattr(ai, "get_search_pool", lambda workers: RecordingPool())
+    agent = MCTSAi(time_limit=0.2, parallel='leaf', workers=2, leaf_batch=64, reuse_tree=False, seed=1)
+    state = deal(4, 8, 3)
+    for _ in range(2):
+        agent.play(state.clone())
+        assert submitted and all(future.done() for future in submitted)
+
+
+@pytest.mark.parametrize("parallel", ["root", "leaf"])
+def test_parallel_search_with_a_count_budget_replays(deal, parallel):
+    state = deal(4, 6, 5)
+    searches = []
+    for _ in range(2):
+        agent = MCTSAi(num_samples=100, budget='iterations', parallel=parallel, workers=2, leaf_batch=4,
+                       reuse_tree=False, seed=2)
+        card = agent.play(state.clone())
+        searches.append((card, agent.last_search["rollouts"]))
+    assert searches[0] == searches[1]
+    # Root-parallel counts every worker's iterations, leaf-parallel every worker's batch
+    assert searches[0][1] == (200 if parallel == "root" else 100 * 2 * 4)
+
+
+def test_ismcts_ignores_the_opponents_actual_hands(deal):
+    state = deal(4, 6, 3)
+    state.play(state.getLegalActions()[0])
+    swapped = state.clone()
+    # Seat 1 to move; the cards of seats 2 and 3 trade places, which seat 1 cannot tell apart
+    swapped.hands[2], swapped.hands[3] = state.hands[3], state.hands[2]
+    cards = [ISMCTSAi(num_samples=300, budget='iterations', seed=4).play(position.clone())
+             for position in (state, swapped)]
+    assert cards[0] == cards[1]
+
+
+@pytest.mark.parametrize("budget", ["iterations", "rollouts"])
+def test_count_budgets_replay_exactly(deal, budget):
+    state = deal(4, 7, 8)
+    searches = []
+    for _ in range(2):
+        agent = MCTSAi(num_samples=250, budget=budget, reuse_tree=False, seed=9)
+        card = agent.play(state.clone())
+        stats = dict(agent.last_search)
+        del stats["seconds"], stats["iterations_per_second"]
+        searches.append((card, stats))
+    assert searches[0] == searches[1]
+    assert searches[0][1][budget] == 250
+
+
+def test_anytime_budget_runs_its_iterations_past_the_time_limit(deal):
+    agent = MCTSAi(num_samples=200, time_limit=0, budget='anytime', reuse_tree=False, seed=1)
+    agent.play(deal(4, 7, 8))
+    assert agent.last_search["iterations"] == 200
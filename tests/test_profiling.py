@@ -0,0 +1,38 @@
+import io
+import json
+import pickle
+
+from game import SpadesGame
+from profiling import DecisionProfile, json_lines_writer
+
+
+def record(round_size, seconds, **stats):
+    return dict(agent="MCTSAi", round=round_size, action="2S", seconds=seconds, **stats)
+
+
+def test_profile_aggregates_by_round_and_merges():
+    out = io.StringIO()
+    first = DecisionProfile(keep_records=True, callback=json_lines_writer(out))
+    first(record(3, 0.5, nodes=10, playouts=100, depth=4, visit_share=0.5))
+    first(record(3, 1.5, nodes=30, playouts=300, depth=6, visit_share=1.0))
+    second = DecisionProfile(keep_records=True, callback=json_lines_writer(out))
+    second(record(5, 1.0, nodes=5, tt_hits=1, tt_probes=4))
+    # As it comes back from a simulation worker
+    second = pickle.loads(pickle.dumps(second))
+    assert second.callback is None
+    summary = first.merge(second).summary()
+    assert summary[3]["decisions"] == 2 and summary[3]["mean_seconds"] == 1.0
+    assert summary[3]["max_depth"] == 6 and summary[3]["playouts_per_second"] == 200
+    assert summary[5]["tt_hit_rate"] == 0.25 and summary[5]["visit_share"] is None
+    assert summary["all"]["decisions"] == 3 and summary["all"]["visit_share"] == 0.75
+    assert [json.loads(line)["round"] for line in out.getvalue().splitlines()] == [3, 3, 5]
+    assert len(first.records) == 3
+
+
+def test_profiled_game_records_every_ai_move():
+    game = SpadesGame(0, 2, 1, 0, 0, 2, 0, True, 0, True)
+    game.play_game()
+    # Two rounds of one and two cards: three moves per player
+    assert sorted(game.profiles) == [0, 1, 2]
+    assert all(profile.summary()["all"]["decisions"] == 3 for profile in game.profiles.values())
+    assert {profile.agent for profile in game.profiles.values()} == {"RandomAi", "MaxNAi"}
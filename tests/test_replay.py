@@ -0,0 +1,62 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai import RandomAi
+from compact_state import playable_mask
+from player import PlayerType
+from replay import ReplayDataset
+from selfplay import generate
+
+# Two random and two MaxN agents, three rounds, no text
+GAME_ARGS = (0, 2, 2, 0, 0, 3, 0, True)
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("corpus"))
+    generate(directory, GAME_ARGS, 4, workers=2, rows_per_shard=16, seed=2)
+    return directory
+
+
+def test_dataset_reads_back_every_shard(corpus):
+    plays = ReplayDataset(corpus)
+    shards = np.concatenate([np.load(f"{corpus}/{shard['file']}") for shard in plays.manifest["datasets"]["plays"]["shards"]])
+    assert len(plays) == len(shards) == 4 * 4 * (3 + 2 + 1) and len(plays.shards) > 2
+    assert all(plays[i] == shards[i] for i in range(len(plays)))
+    assert plays[-1] == shards[-1]
+    with pytest.raises(IndexError):
+        plays[len(plays)]
+    assert len(ReplayDataset(corpus, "bids")) == 4 * 3 * 4
+
+
+def test_batches_cover_every_record_once(corpus):
+    plays = ReplayDataset(corpus)
+    in_order = list(plays.batches(10, shuffle=False))
+    assert [len(batch) for batch in in_order] == [10] * 9 + [6]
+    assert (np.concatenate(in_order) == np.concatenate(list(plays.shards))).all()
+    key = lambda records: sorted(zip(*(records[field].tolist() for field in ("game", "round", "player", "action"))))
+    shuffled = np.concatenate(list(plays.batches(10, seed=3)))
+    assert key(shuffled) == key(np.concatenate(in_order)) and len(set(key(shuffled))) == len(plays)
+    assert [len(batch) for batch in plays.batches(10, seed=3, drop_last=True)] == [10] * 9
+
+
+def test_records_rebuild_the_position_played(corpus):
+    plays = ReplayDataset(corpus)
+    for i in range(len(plays)):
+        record = plays[i]
+        state = plays.state(i)
+        assert state.curr_player_index == record["player"]
+        assert playable_mask(state) == record["legal"]
+    with pytest.raises(ValueError):
+        ReplayDataset(corpus, "bids").state(0)
+
+
+def test_relabel_answers_the_positions_of_one_agent(corpus):
+    plays = ReplayDataset(corpus)
+    indices = plays.agent_indices(PlayerType.MAXN)
+    assert len(indices) == len(plays) // 2
+    assert all(plays[int(i)]["agent"] == 2 for i in indices)
+    actions = plays.relabel(RandomAi(seed=0), indices)
+    for index, action in zip(indices, actions):
+        assert plays[int(index)]["legal"] >> np.uint64(action) & np.uint64(1)
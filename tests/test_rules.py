@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from cards import CARD_IDS, CARD_STRS, trick_winner
+from engine import run_game
+from observers import GameObserver
+
+
+def reference_winner(trick, starting_player_index):
+    """
+    The rule as players state it: the highest spade if any was played, else the highest card
+    of the suit led.
+    """
+    rank = lambda card: "23456789TJQKA".index(card[:-1].replace("10", "T"))
+    spades = [i for i, card in enumerate(trick) if card[-1] == "S"]
+    lead_suit = trick[starting_player_index][-1]
+    contenders = spades or [i for i, card in enumerate(trick) if card[-1] == lead_suit]
+    return max(contenders, key=lambda i: rank(trick[i]))
+
+
+def test_strength_table_resolves_tricks_by_the_rules():
+    rng = random.Random(0)
+    for _ in range(20000):
+        num_players = rng.choice([2, 3, 4, 5])
+        trick = rng.sample(CARD_STRS, num_players)
+        starting_player_index = rng.randrange(num_players)
+        expected = reference_winner(trick, starting_player_index)
+        assert trick_winner([CARD_IDS[card] for card in trick], starting_player_index) == expected
+
+
+class RoundLog(GameObserver):
+    def __init__(self):
+        self.rows = []
+
+    def round_scored(self, game, player, bid, tricks_won, score):
+        self.rows.append((game.round, bid, tricks_won, score))
+
+
+def test_batch_games_follow_spades_game_rules():
+    np = pytest.importorskip("numpy")
+    from engine import batch_random_games
+    num_rounds = 3
+    games = batch_random_games(20000, num_rounds=num_rounds, seed=0)
+    bids, tricks, scores = games["bids"], games["tricks"], games["scores"]
+    round_sizes = np.arange(num_rounds, 0, -1)
+    assert (tricks.sum(axis=2) == round_sizes).all()
+    assert (bids.sum(axis=2) != round_sizes).all()
+    assert ((bids >= 0) & (bids <= round_sizes[:, None])).all()
+    assert (scores == np.where(tricks == bids, bids + 10, -bids).sum(axis=1)).all()
+
+    log = RoundLog()
+    for seed in range(400):
+        run_game(num_random=4, num_rounds=num_rounds, observers=[log], seed=seed)
+    rows = np.array(log.rows)
+    for r, round_size in enumerate(round_sizes):
+        played = rows[rows[:, 0] == round_size]
+        assert (played[:, 3] == np.where(played[:, 2] == played[:, 1], played[:, 1] + 10, -played[:, 1])).all()
+        # Same bids and the same chance of making them as the real game, up to sampling noise
+        assert abs(played[:, 1].mean() - bids[:, r].mean()) < 0.1
+        assert abs((played[:, 2] == played[:, 1]).mean() - (tricks[:, r] == bids[:, r]).mean()) < 0.06
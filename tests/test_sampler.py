@@ -0,0 +1,67 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from cards import SUIT_MASKS, cards_to_mask, mask_to_ids
+from sampler import DealSampler
+
+SPADES, HEARTS = SUIT_MASKS[0], SUIT_MASKS[1]
+
+
+def consistent_deals(unseen, hand_sizes, void_masks, observer):
+    """
+    Every deal of unseen to the seats other than observer, by brute force.
+    """
+    seats = [seat for seat in range(len(hand_sizes)) if seat != observer]
+    deals = []
+
+    def deal_to(index, left, hands):
+        if index == len(seats):
+            deals.append(tuple(hands))
+            return
+        seat = seats[index]
+        for cards in itertools.combinations(mask_to_ids(left), hand_sizes[seat]):
+            hand = sum(1 << card for card in cards)
+            if hand & void_masks[seat] == 0:
+                hands[seat] = hand
+                deal_to(index + 1, left & ~hand, hands)
+        hands[seat] = 0
+
+    deal_to(0, unseen, [0] * len(hand_sizes))
+    return deals
+
+
+@pytest.mark.parametrize("void_masks", [[0, 0, 0], [0, SPADES, 0], [0, SPADES, HEARTS]])
+def test_deals_are_uniform_over_every_consistent_deal(void_masks):
+    unseen = cards_to_mask(["2S", "3S", "4S", "2H", "3H", "4H"])
+    hand_sizes = [2, 2, 2]
+    expected = set(consistent_deals(unseen, hand_sizes, void_masks, 0))
+    sampler = DealSampler(unseen, hand_sizes, void_masks, 0, random.Random(0))
+    draws = 300 * len(expected)
+    counts = Counter(tuple(deal) for deal in sampler.sample(draws))
+    assert set(counts) == expected
+    # Pearson's chi-squared statistic, far below the level a non-uniform sampler would reach
+    mean = draws / len(expected)
+    chi2 = sum((count - mean) ** 2 / mean for count in counts.values())
+    assert chi2 < 3 * len(expected) + 30
+
+
+def test_sampled_hands_keep_sizes_and_voids(deal):
+    rng = random.Random(1)
+    for seed in range(30):
+        state = deal(4, 13, seed)
+        for _ in range(rng.randrange(1, 30)):
+            state.play(rng.choice(state.getLegalActions()))
+        state.void_masks = [SUIT_MASKS[rng.randrange(4)] & ~state.hands[seat] if rng.random() < 0.5 else 0
+                            for seat in range(4)]
+        observer = state.curr_player_index
+        sampler = DealSampler.from_state(state, rng=rng)
+        hidden = sum(state.hands[seat] for seat in range(4) if seat != observer)
+        for dealt in sampler.sample(20):
+            assert dealt[observer] == 0
+            assert sum(dealt) == hidden
+            for seat in sampler.seats:
+                assert dealt[seat].bit_count() == state.hand_size(seat)
+                assert dealt[seat] & state.void_masks[seat] == 0
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from selfplay import ShardWriter, bid_dtype, generate
+
+# Four random agents, three rounds, no text
+GAME_ARGS = (0, 4, 0, 0, 0, 3, 0, True)
+
+
+def test_shard_writer_splits_rows_into_complete_shards(tmp_path):
+    writer = ShardWriter(str(tmp_path), "bids", bid_dtype(), rows_per_shard=7)
+    rows = [(game, 3, game % 4, 1, game % 4, 0, 0, game, 0b1011, 1, 2, 1, 11) for game in range(20)]
+    for row in rows:
+        writer.append(row)
+    writer.flush()
+    writer.flush()
+    assert writer.shards == [{"file": f"bids-{i:05d}.npy", "rows": rows} for i, rows in enumerate((7, 7, 6))]
+    assert sorted(os.listdir(tmp_path)) == ["bids-00000.npy", "bids-00001.npy", "bids-00002.npy"]
+    written = np.concatenate([np.load(tmp_path / shard["file"]) for shard in writer.shards])
+    assert written.tolist() == rows
+
+
+def test_generated_rows_follow_the_games(tmp_path):
+    manifest = generate(str(tmp_path), GAME_ARGS, 3, rows_per_shard=10, seed=1)
+    plays = np.concatenate([np.load(tmp_path / shard["file"]) for shard in manifest["datasets"]["plays"]["shards"]])
+    bids = np.concatenate([np.load(tmp_path / shard["file"]) for shard in manifest["datasets"]["bids"]["shards"]])
+    assert manifest["datasets"]["plays"]["rows"] == len(plays) == 3 * 4 * (3 + 2 + 1)
+    assert manifest["datasets"]["bids"]["rows"] == len(bids) == 3 * 3 * 4
+    for row in plays:
+        action = np.uint64(1) << np.uint64(row["action"])
+        assert row["legal"] & action and row["legal"] & ~row["hands"][row["player"]] == 0
+        assert row["score"] == (row["bid"] + 10 if row["tricks"] == row["bid"] else -row["bid"])
+    for row in bids:
+        assert row["legal"] >> row["action"] & 1 and row["action"] == row["bid"]
+    # Every round's tricks add up to its size, once per seat
+    for game in range(3):
+        for round_size in (1, 2, 3):
+            outcome = bids[(bids["game"] == game) & (bids["round"] == round_size)]
+            assert outcome["tricks"].sum() == round_size and sorted(outcome["player"]) == [0, 1, 2, 3]
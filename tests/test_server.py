@@ -0,0 +1,90 @@
+import asyncio
+from ai import MaxNAi
+from observers import GameObserver
+from server import TableServer
+
+
+class GameCapture(GameObserver):
+    def __init__(self):
+        self.games = []
+
+    def game_ended(self, game, standings):
+        self.games.append(game)
+
+
+def test_pool_served_seats_have_no_local_agent():
+    capture = GameCapture()
+    # Four MaxN seats decided by the pool, one round of one card
+    server = TableServer((0, 0, 4, 0, 0, 1, 0, True, 0, False, False, None, [capture]), workers=1)
+    try:
+        result = asyncio.run(server.play_table())
+    finally:
+        server.close()
+    assert len(result["players"]) == 4
+    game, = capture.games
+    assert all(player.remote and player.ai is None for player in game.players)
+
+
+def test_inline_seats_keep_their_agents():
+    capture = GameCapture()
+    server = TableServer((0, 2, 0, 0, 0, 1, 0, True, 0, False, False, None, [capture]), workers=1)
+    try:
+        asyncio.run(server.play_table())
+    finally:
+        server.close()
+    game, = capture.games
+    assert all(not player.remote and player.ai is not None for player in game.players)
+
+
+def test_maxn_allocates_its_table_on_the_first_search(deal):
+    agent = MaxNAi(time_limit=None)
+    assert agent._tt is None
+    agent.play(deal(4, 2, 0))
+    assert agent._tt is not None
+
+
+async def serve_remote_table(server, clients):
+    listener = await asyncio.start_server(server.handle_client, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        return await asyncio.wait_for(asyncio.gather(*(client(port) for client in clients)), 60)
+    finally:
+        listener.close()
+        await listener.wait_closed()
+
+
+def test_remote_seats_play_a_table_over_tcp():
+    from server import bot_client
+    # Two remote seats and two inline random agents, three rounds
+    server = TableServer((2, 2, 0, 0, 0, 3, 0, True), workers=1)
+    try:
+        standings = asyncio.run(serve_remote_table(
+            server, [lambda port, seed=seed: bot_client("127.0.0.1", port, seed=seed) for seed in range(2)]))
+    finally:
+        server.close()
+    assert standings[0] == standings[1] and sorted(row["player"] for row in standings[0]) == [f"Player {i}" for i in range(4)]
+    assert server.games_played == 1
+    summary = server.latency.summary()
+    assert summary["human play"]["turns"] == 2 * (3 + 2 + 1) and summary["human bid"]["turns"] == 2 * 3
+
+
+def test_silent_seat_gets_moves_played_for_it():
+    import json
+
+    async def silent_client(port):
+        # Joins, then never answers a prompt
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"{}\n")
+        events = []
+        while line := await reader.readline():
+            events.append(json.loads(line)["event"])
+        writer.close()
+        return events
+
+    server = TableServer((1, 3, 0, 0, 0, 2, 0, True), workers=1, human_timeout=0.05)
+    try:
+        events, = asyncio.run(serve_remote_table(server, [silent_client]))
+    finally:
+        server.close()
+    assert server.games_played == 1
+    assert events[0] == "seated" and "bid" in events
@@ -0,0 +1,16 @@
+from tournament import run_tournament
+
+# Four random agents, three rounds, no text
+GAME_ARGS = (0, 4, 0, 0, 0, 3, 0, True)
+
+
+def test_seeded_tournament_replays():
+    assert run_tournament(GAME_ARGS, 6, 1, seed=3) == run_tournament(GAME_ARGS, 6, 1, seed=3)
+
+
+def test_workers_share_out_every_game():
+    stats = run_tournament(GAME_ARGS, 5, 2, seed=3)
+    assert sorted(stats) == [0, 1, 2, 3]
+    assert all(data["games_played"] == 5 for data in stats.values())
+    assert sum(data["total_standing"] for data in stats.values()) == 5 * (1 + 2 + 3 + 4)
+    assert stats == run_tournament(GAME_ARGS, 5, 2, seed=3)
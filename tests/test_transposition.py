@@ -0,0 +1,41 @@
+from transposition import TranspositionTable
+
+
+def test_clear_resets_every_slot():
+    table = TranspositionTable(4)
+    fresh = vars(TranspositionTable(4)).copy()
+    for search in range(3):
+        table.new_search()
+        for key in range(40):
+            table.store(key * 7919, (key,), key % 5)
+            table.lookup(key * 31)
+    table.clear()
+    assert vars(table) == fresh
+
+
+def test_store_keeps_the_deeper_result_of_a_search():
+    table = TranspositionTable(4)
+    table.new_search()
+    table.store(3, "deep", 5)
+    table.store(3 + table.size, "shallow", 2)
+    assert table.lookup(3, 5) == "deep"
+    assert table.lookup(3, 6) is None
+    table.new_search()
+    table.store(3 + table.size, "new", 2)
+    assert table.lookup(3 + table.size) == "new"
+
+
+def test_maxn_values_do_not_depend_on_the_table(deal):
+    from ai import MaxNAi
+    for seed in range(3):
+        state = deal(4, 4, seed)
+        state.play(state.getLegalActions()[0])
+        results = []
+        for size_bits in (1, 16):
+            agent = MaxNAi(time_limit=None, tt_size_bits=size_bits, distinct_moves=False)
+            root = state.clone()
+            root.enable_zobrist()
+            agent.tt.new_search()
+            cards_left = sum(root.hand_size(i) for i in range(4))
+            results.append(agent.search_root(root, cards_left)[1])
+        assert results[0] == results[1]
@@ -0,0 +1,66 @@
+import random
+from concurrent.futures import ProcessPoolExecutor
+from game import SpadesGame
+
+
+def play_games(game_args, num_games, seed, first_game=0):
+    """
+    Plays num_games games with SpadesGame(*game_args) and returns the per-player aggregates.
+    Runs inside a worker process, so it seeds the global RNG used by the deck and agents.
+    """
+    random.seed(seed)
+    aggregated_stats = {}
+    for i in range(num_games):
+        game = SpadesGame(*game_args)
+        if not game.text_disable:
+            print("Game:", first_game + i + 1)
+        sorted_score_players = game.play_game()
+        single_game_stats = {player.id: (standing + 1, player.total_score) for standing, player in enumerate(sorted_score_players)}
+        game_stats = {
+            player_id: {"total_standing": standing, "total_score": score, "games_played": 1}
+            for player_id, (standing, score) in single_game_stats.items()
+        }
+        for player_id, profile in game.profiles.items():
+            game_stats[player_id]["profile"] = profile
+        merge_stats(aggregated_stats, game_stats)
+    return aggregated_stats
+
+
+def merge_stats(aggregated_stats, game_stats):
+    for player_id, data in game_stats.items():
+        if player_id not in aggregated_stats:
+            aggregated_stats[player_id] = {"total_standing": 0, "total_score": 0, "games_played": 0}
+        aggregated_stats[player_id]["total_standing"] += data["total_standing"]
+        aggregated_stats[player_id]["total_score"] += data["total_score"]
+        aggregated_stats[player_id]["games_played"] += data["games_played"]
+        if "profile" in data:
+            if "profile" in aggregated_stats[player_id]:
+                aggregated_stats[player_id]["profile"].merge(data["profile"])
+            else:
+                aggregated_stats[player_id]["profile"] = data["profile"]
+    return aggregated_stats
+
+
+def run_tournament(game_args, num_games, workers=1, seed=None):
+    """
+    Shards num_games across a process pool and merges the aggregates of every shard.
+    Each shard gets its own seed drawn from seed, so a seeded run is reproducible for a fixed worker count.
+    """
+    seed_rng = random.Random(seed)
+    workers = max(1, min(workers, num_games))
+    shard_sizes = [num_games // workers + (1 if i < num_games % workers else 0) for i in range(workers)]
+    shard_starts = [sum(shard_sizes[:i]) for i in range(workers)]
+    shard_seeds = [seed_rng.getrandbits(64) for _ in range(workers)]
+
+    aggregated_stats = {}
+    if workers == 1:
+        return merge_stats(aggregated_stats, play_games(game_args, num_games, shard_seeds[0]))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(play_games, game_args, size, shard_seed, start)
+            for size, shard_seed, start in zip(shard_sizes, shard_seeds, shard_starts)
+        ]
+        for future in futures:
+            merge_stats(aggregated_stats, future.result())
+    return aggregated_stats
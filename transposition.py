@@ -0,0 +1,56 @@
+class TranspositionTable:
+    """
+    Fixed-size hash table from Zobrist keys to search results.
+    Each key maps to a single slot. A store replaces the slot's entry when the slot is empty,
+    holds the same position, was written by an earlier search, or covers a subtree no larger
+    than the new one, so the most expensive results of the current search survive.
+    """
+    def __init__(self, size_bits=18):
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.keys = [None] * self.size
+        self.values = [None] * self.size
+        self.drafts = [0] * self.size
+        self.generations = [0] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.probes = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def lookup(self, key, draft=0):
+        """
+        Returns the value stored for key if it was searched at least draft plies deep, else None.
+        """
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] == key and self.drafts[index] >= draft:
+            self.hits += 1
+            return self.values[index]
+        return None
+
+    def store(self, key, value, draft):
+        index = key & self.mask
+        stored_key = self.keys[index]
+        if stored_key == key:
+            replace = draft >= self.drafts[index]
+        else:
+            replace = stored_key is None or self.generations[index] != self.generation or self.drafts[index] <= draft
+        if replace:
+            self.keys[index] = key
+            self.values[index] = value
+            self.drafts[index] = draft
+            self.generations[index] = self.generation
+
+    def clear(self):
+        """
+        Empties the table and resets it to the state of a new one.
+        """
+        self.keys[:] = [None] * self.size
+        self.values[:] = [None] * self.size
+        self.drafts[:] = [0] * self.size
+        self.generations[:] = [0] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.probes = 0
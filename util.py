@@ -1,3 +1,5 @@
+from cards import CARD_STR_RANK, CARD_STR_SUIT
+
 def get_valid_input(prompt, valid_inputs):
     while True:
         user_input = input(prompt)
@@ -11,17 +13,7 @@ def get_valid_int_input(prompt, min_val, max_val):
     return int(get_valid_input(prompt, valid_inputs))
 
 def card_to_rank(card):
-    rank_str = card[:-1]
-    if rank_str == 'J':
-        return 11
-    elif rank_str == 'Q':
-        return 12
-    elif rank_str == 'K':
-        return 13
-    elif rank_str == 'A':
-        return 14
-    else:
-        return int(rank_str)
+    return CARD_STR_RANK[card]
 
 def card_to_suit(card):
-    return card[-1]
\ No newline at end of file
+    return CARD_STR_SUIT[card]
@@ -0,0 +1,39 @@
+import random
+from cards import NO_CARD, NUM_CARDS, mask_to_ids
+
+MAX_PLAYERS = 20  # game.py allows up to four seats of each of the five player types
+
+_key_rng = random.Random(0x5AADE5)
+
+def _keys(count):
+    return [_key_rng.getrandbits(64) for _ in range(count)]
+
+HAND_KEYS = [_keys(NUM_CARDS) for _ in range(MAX_PLAYERS)]
+TRICK_KEYS = [_keys(NUM_CARDS) for _ in range(MAX_PLAYERS)]
+TRICKS_WON_KEYS = [_keys(NUM_CARDS + 1) for _ in range(MAX_PLAYERS)]
+BID_KEYS = [_keys(NUM_CARDS + 1) for _ in range(MAX_PLAYERS)]
+TURN_KEYS = _keys(MAX_PLAYERS)
+TRUMP_BROKEN_KEY = _keys(1)[0]
+
+
+def zobrist_hash(state):
+    """
+    Hashes everything that decides the rest of a round: who holds which cards, the cards in the
+    current trick, tricks won, bids, the player to move and whether trump is broken.
+    """
+    h = TURN_KEYS[state.curr_player_index]
+    if state.trump_broken:
+        h ^= TRUMP_BROKEN_KEY
+    for player, hand in enumerate(state.hands):
+        keys = HAND_KEYS[player]
+        for card in mask_to_ids(hand):
+            h ^= keys[card]
+    for player, card in enumerate(state.trick):
+        if card != NO_CARD:
+            h ^= TRICK_KEYS[player][card]
+    for player, won in enumerate(state.tricks_won):
+        h ^= TRICKS_WON_KEYS[player][won]
+    for player, bid in enumerate(state.bids):
+        if bid is not None:
+            h ^= BID_KEYS[player][bid]
+    return h